@@ -0,0 +1,100 @@
+"""
+시맨틱 답변 캐시
+질의 임베딩이 충분히 비슷하고(코사인 유사도 >= threshold) 같은 청크가 검색된 질문이면
+LLM 을 다시 호출하지 않고 저장된 답변과 출처를 반환합니다.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+def chunk_key(docs):
+    """검색된 청크 ID 집합 (순서 무관)"""
+    ids = []
+    for doc in docs:
+        chunk_id = doc.metadata.get("chunk_id") or getattr(doc, "id", None) or str(hash(doc.page_content))
+        ids.append(chunk_id)
+    return frozenset(ids)
+
+
+class SemanticAnswerCache:
+    def __init__(self, threshold=0.95, maxsize=256, ttl=3600):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # 청크 ID 집합 -> OrderedDict(entry_id -> (정규화된 질의 벡터, 결과, 만료 시각))
+        self._groups = {}
+        # LRU 순서 (entry_id -> 청크 ID 집합)
+        self._order = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, query_vector, docs):
+        """캐시된 결과 또는 None"""
+        key = chunk_key(docs)
+        query = self._normalize(query_vector)
+        now = time.monotonic()
+        with self._lock:
+            group = self._groups.get(key)
+            best_id, best_score = None, -1.0
+            if group:
+                for entry_id, (vector, result, expires) in list(group.items()):
+                    if expires < now:
+                        self._remove(entry_id)
+                        continue
+                    score = float(np.dot(vector, query))
+                    if score > best_score:
+                        best_id, best_score = entry_id, score
+            if best_id is not None and best_score >= self.threshold:
+                self.hits += 1
+                self._order.move_to_end(best_id)
+                print(f"[LOG] 답변 캐시 사용 (유사도 {best_score:.3f})")
+                return self._groups[key][best_id][1]
+            self.misses += 1
+            return None
+
+    def store(self, query_vector, docs, result):
+        key = chunk_key(docs)
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            expires = time.monotonic() + self.ttl
+            self._groups.setdefault(key, OrderedDict())[entry_id] = (self._normalize(query_vector), result, expires)
+            self._order[entry_id] = key
+            while len(self._order) > self.maxsize:
+                self._remove(next(iter(self._order)))
+
+    def _remove(self, entry_id):
+        key = self._order.pop(entry_id, None)
+        group = self._groups.get(key)
+        if group is not None:
+            group.pop(entry_id, None)
+            if not group:
+                del self._groups[key]
+
+    def clear(self):
+        with self._lock:
+            self._groups.clear()
+            self._order.clear()
+
+    def __len__(self):
+        return len(self._order)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._order),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -6,12 +6,14 @@ import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from rag_engine import RagEngine
+from doc_loader import source_extensions
 
 st.set_page_config(page_title="사내 문서 검색기", layout="wide")
 
 @st.cache_resource
 def get_engine():
-    return RagEngine()
+    # 문서 파싱은 CPU 코어 수만큼 프로세스 병렬 처리
+    return RagEngine(parse_workers=os.cpu_count())
 
 try:
     engine = get_engine()
@@ -29,7 +31,7 @@ with st.sidebar:
     if os.path.exists(doc_folder):
         doc_files = []
         for file in os.listdir(doc_folder):
-            if file.lower().endswith(('.docx', '.txt', '.hwp')):
+            if file.lower().endswith(source_extensions()):
                 doc_files.append(file)
 
         if doc_files:
@@ -45,6 +47,12 @@ with st.sidebar:
 
     st.markdown("---")
 
+    with st.expander("📊 캐시 통계"):
+        for name, stats in engine.cache_stats().items():
+            st.caption(f"{name}: hit {stats['hits']} / miss {stats['misses']} (적중률 {stats['hit_rate']:.0%}, {stats['size']}개 저장)")
+        context = engine.context_stats()
+        st.caption(f"컨텍스트 압축: {context['queries']}개 질의, {context['tokens_saved']} 토큰 절약")
+
     if st.button("문서 데이터 갱신 (인덱싱)"):
         with st.spinner("문서를 읽고 인덱싱 중입니다..."):
             # Define paths to scan
@@ -52,10 +60,14 @@ with st.sidebar:
                 os.path.join(os.path.dirname(__file__), "doc")
             ]
 
-            docs = engine.load_documents(target_paths)
-            if docs:
-                engine.create_index(docs)
-                st.success(f"인덱싱 완료! ({len(docs)}개 문서)")
+            # 새로 추가/변경된 파일만 다시 파싱·임베딩 (매니페스트 기반)
+            summary = engine.update_index(target_paths)
+            indexed = summary["added"] + summary["changed"] + summary["unchanged"]
+            if indexed:
+                st.success(
+                    f"인덱싱 완료! ({indexed}개 문서 - 신규 {summary['added']}, "
+                    f"변경 {summary['changed']}, 삭제 {summary['removed']})"
+                )
             else:
                 st.warning("문서를 찾을 수 없거나 텍스트를 추출할 수 없습니다.")
 
@@ -72,29 +84,34 @@ if prompt := st.chat_input("규정에 대해 물어보세요 (예: 육아 휴직
         st.markdown(prompt)
 
     with st.chat_message("assistant"):
-        with st.spinner("문서 검색 및 답변 생성 중..."):
-            try:
-                response = engine.ask(prompt)
-                answer = response.get("result", "죄송합니다. 답변을 생성하지 못했습니다.")
-                sources = response.get("source_documents", [])
-                
+        try:
+            # 출처를 먼저 받고, 답변은 LLM 토큰이 생성되는 대로 표시
+            stream = engine.ask_stream(prompt)
+            with st.spinner("문서 검색 중..."):
+                sources = next(stream)["source_documents"]
+
+            answer = st.write_stream(
+                event["content"] for event in stream if event["type"] == "token"
+            )
+            if not answer:
+                answer = "죄송합니다. 답변을 생성하지 못했습니다."
                 st.markdown(answer)
 
-                if sources:
-                    st.markdown("---")
-                    st.markdown("### 📚 참고 문서 및 인용 내용")
+            if sources:
+                st.markdown("---")
+                st.markdown("### 📚 참고 문서 및 인용 내용")
+
+                for i, doc in enumerate(sources, 1):
+                    source_name = doc.metadata.get("source", "Unknown")
+                    content = doc.page_content
 
-                    for i, doc in enumerate(sources, 1):
-                        source_name = doc.metadata.get("source", "Unknown")
-                        content = doc.page_content
+                    # 인용 내용 표시 (최대 300자)
+                    preview = content[:300] + "..." if len(content) > 300 else content
 
-                        # 인용 내용 표시 (최대 300자)
-                        preview = content[:300] + "..." if len(content) > 300 else content
+                    with st.expander(f"📄 {i}. {source_name}"):
+                        st.text(preview)
+                        st.caption(f"전체 길이: {len(content)} 글자")
 
-                        with st.expander(f"📄 {i}. {source_name}"):
-                            st.text(preview)
-                            st.caption(f"전체 길이: {len(content)} 글자")
-                
-                st.session_state.messages.append({"role": "assistant", "content": answer})
-            except Exception as e:
-                st.error(f"오류 발생: {e}")
+            st.session_state.messages.append({"role": "assistant", "content": answer})
+        except Exception as e:
+            st.error(f"오류 발생: {e}")
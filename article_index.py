@@ -0,0 +1,160 @@
+"""
+조/장 번호 -> 청크 ID 직접 조회 색인
+"15조에 대해 알려줘", "인사규정 제5장" 같은 질의는 벡터 검색 없이 해당 조문 청크를 바로 찾습니다.
+청크 metadata 의 chapter / article 값(chunking.RegulationTextSplitter)으로 만들며 JSON 으로 저장합니다.
+질의에 규정 이름(문서 title)이 있으면 그 문서의 조문만 후보로 남기고, 후보 순위는 엔진이 질의 유사도로 정합니다.
+"""
+import json
+import os
+import re
+
+from langchain_core.documents import Document
+
+from chunking import article_number
+
+# 2: 청크별 문서 title 저장 (질의에 언급된 규정으로 후보 한정)
+ARTICLE_INDEX_VERSION = 2
+
+# 번호 뒤에 올 수 있는 조사/단어 ("15조에", "15조 내용") - "1조원", "3조각" 처럼 다른 단어의 일부는 제외
+_NUMBER_END = r"(?=$|[^가-힣]|(?:에서|에는|에|의|은|는|을|를|이|가|와|과|도|만|부터|까지|항|내용|관련|규정))"
+# 장은 "제" 가 있어야 인정 ("증명서 2장 발급" 같은 수량 표현 제외), 조는 "제" 가 없으면 앞이 단어 경계여야 함
+QUERY_CHAPTER_PATTERN = re.compile(r"제\s*(\d+)\s*장" + _NUMBER_END)
+QUERY_ARTICLE_PATTERN = re.compile(r"(?:제\s*|(?<![\w.,]))(\d+)\s*조(?:\s*의\s*(\d+))?" + _NUMBER_END)
+TITLE_WORD_PATTERN = re.compile(r"[가-힣A-Za-z]{2,}")
+
+
+def default_article_index_path(persist_directory):
+    """./chroma_db -> ./chroma_db_articles.json"""
+    return os.path.abspath(persist_directory).rstrip("\\/") + "_articles.json"
+
+
+def parse_article_query(query):
+    """질의에서 장/조 번호 추출 -> (chapter, article), 없으면 None"""
+    chapter = QUERY_CHAPTER_PATTERN.search(query)
+    article = QUERY_ARTICLE_PATTERN.search(query)
+    return (
+        str(int(chapter.group(1))) if chapter else None,
+        article_number(article.group(1), article.group(2)) if article else None,
+    )
+
+
+def title_key(title):
+    """문서 title 에서 질의와 비교할 이름 ("2024_인사규정(개정)" -> "인사규정"), 없으면 None"""
+    words = TITLE_WORD_PATTERN.findall(title or "")
+    return max(words, key=len) if words else None
+
+
+class ArticleIndex:
+    def __init__(self, path):
+        self.path = path
+        # 번호 -> 문서 순서대로의 청크 ID 목록 (같은 ID 는 한 번만)
+        self.chapters = {}
+        self.articles = {}
+        # 청크 ID -> 문서 title (질의에 언급된 규정으로 후보 한정)
+        self.titles = {}
+
+    def __len__(self):
+        return sum(len(ids) for ids in self.articles.values())
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != ARTICLE_INDEX_VERSION:
+            return False
+        self.chapters = data.get("chapters", {})
+        self.articles = data.get("articles", {})
+        self.titles = data.get("titles", {})
+        return True
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": ARTICLE_INDEX_VERSION, "chapters": self.chapters, "articles": self.articles,
+                       "titles": self.titles}, f, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        self.chapters = {}
+        self.articles = {}
+        self.titles = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def add(self, chunks):
+        """청크 metadata 의 장/조 번호 등록 (부칙 조문은 본칙 번호와 겹치므로 제외)"""
+        self.add_metadata([chunk.metadata for chunk in chunks])
+
+    def add_metadata(self, metadatas):
+        """청크 metadata 목록 등록. 이미 등록된 청크 ID 는 이전 항목을 지우고 다시 등록"""
+        metadatas = [meta for meta in metadatas if meta and meta.get("chunk_id")]
+        self.remove(meta["chunk_id"] for meta in metadatas)
+        seen = set()
+        for meta in metadatas:
+            chunk_id = meta["chunk_id"]
+            if chunk_id in seen or meta.get("supplementary"):
+                continue
+            seen.add(chunk_id)
+            if meta.get("chapter"):
+                self.chapters.setdefault(meta["chapter"], []).append(chunk_id)
+            if meta.get("article"):
+                self.articles.setdefault(meta["article"], []).append(chunk_id)
+            if (meta.get("chapter") or meta.get("article")) and meta.get("title"):
+                self.titles[chunk_id] = meta["title"]
+
+    def remove(self, chunk_ids):
+        stale = set(chunk_ids)
+        if not stale:
+            return
+        for table in (self.chapters, self.articles):
+            for number in list(table):
+                ids = [chunk_id for chunk_id in table[number] if chunk_id not in stale]
+                if ids:
+                    table[number] = ids
+                else:
+                    del table[number]
+        for chunk_id in stale:
+            self.titles.pop(chunk_id, None)
+
+    def lookup(self, query):
+        """
+        질의의 조 번호(없으면 장 번호)에 해당하는 청크 ID 목록, 번호가 없거나 색인에 없으면 []
+        질의에 규정 이름이 있으면 그 문서의 청크만 반환 (해당 문서에 번호가 없으면 [])
+        """
+        chapter, article = parse_article_query(query)
+        if article:
+            ids = self.articles.get(article, [])
+            if chapter:
+                in_chapter = set(self.chapters.get(chapter, []))
+                ids = [chunk_id for chunk_id in ids if chunk_id in in_chapter] or ids
+        elif chapter:
+            ids = self.chapters.get(chapter, [])
+        else:
+            return []
+        return self._scope_to_titles(query, list(dict.fromkeys(ids)))
+
+    def _scope_to_titles(self, query, ids):
+        """질의에 언급된 문서 title 의 청크만 남김 (언급된 title 이 없으면 그대로)"""
+        compact = re.sub(r"\s+", "", query)
+        mentioned = set()
+        for title in set(self.titles.values()):
+            key = title_key(title)
+            if key and len(key) >= 3 and key in compact:
+                mentioned.add(title)
+        if not mentioned:
+            return ids
+        return [chunk_id for chunk_id in ids if self.titles.get(chunk_id) in mentioned]
+
+
+def fetch_chunks(vectorstore, chunk_ids):
+    """Chroma 에서 ID 로 청크를 직접 가져옴 (요청한 순서 유지, 중복 ID 는 한 번만)"""
+    chunk_ids = list(dict.fromkeys(chunk_ids))
+    if not chunk_ids:
+        return []
+    result = vectorstore.get(ids=chunk_ids, include=["documents", "metadatas"])
+    by_id = {
+        chunk_id: Document(page_content=text, metadata=meta or {}, id=chunk_id)
+        for chunk_id, text, meta in zip(result["ids"], result["documents"], result["metadatas"])
+    }
+    return [by_id[chunk_id] for chunk_id in chunk_ids if chunk_id in by_id]
@@ -0,0 +1,80 @@
+"""
+비동기 질의 API (RagEngine / HybridRagEngine 공용 mixin)
+임베딩/Chroma 검색은 스레드 풀에서, Ollama 호출은 비동기로 실행하여 동시 요청이 겹쳐 처리되도록 합니다.
+"""
+import asyncio
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncQAMixin:
+    """
+    엔진에 aask / asearch 를 추가합니다.
+    사용하는 엔진 속성: vectorstore, load_index, _retrieve, embedding_model, metrics, llm
+    답변 캐시/프롬프트 구성/결과 저장은 ask() 와 같은 단계(_cached_answer, _build_prompt, _finish_answer)를 사용합니다.
+    """
+
+    def _init_async(self, max_concurrent_llm=2, search_workers=4):
+        # 동시에 실행되는 LLM 호출 수 상한 (로컬 모델 과부하 방지, 이벤트 루프 단위)
+        self.max_concurrent_llm = max_concurrent_llm
+        self._search_executor = ThreadPoolExecutor(max_workers=search_workers, thread_name_prefix="rag-search")
+        self._llm_semaphores = weakref.WeakKeyDictionary()
+
+    def _llm_semaphore(self):
+        """현재 이벤트 루프에 묶인 LLM 세마포어"""
+        loop = asyncio.get_running_loop()
+        semaphore = self._llm_semaphores.get(loop)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(self.max_concurrent_llm)
+            self._llm_semaphores[loop] = semaphore
+        return semaphore
+
+    async def _run_blocking(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._search_executor, func, *args)
+
+    async def _ensure_index(self):
+        if self.vectorstore:
+            return True
+        # Chroma 클라이언트 생성은 최초 1회뿐이며 호출 스레드에서 바로 수행
+        return self.load_index()
+
+    async def aembed_queries(self, queries):
+        """여러 질의를 한 번에 임베딩하여 질의 캐시에 채움 (배치 요청 전처리)"""
+        return await self._run_blocking(self.embedding_model.embed_queries, queries)
+
+    async def asearch(self, query, k=5, filters=None):
+        """검색만 수행 (LLM 호출 없음)"""
+        if not await self._ensure_index():
+            return []
+        return await self._run_blocking(self._retrieve, query, k, filters)
+
+    async def aask(self, query, k=5, filters=None):
+        """비동기 질의응답. 반환 형식은 ask() 와 동일"""
+        if not await self._ensure_index():
+            return {"query": query, "result": "문서가 인덱싱되지 않았습니다. 먼저 문서를 로드해주세요.", "source_documents": []}
+
+        print(f"[LOG] 질의(비동기): {query}")
+        start = time.time()
+        self.metrics.inc("queries_total", mode="async")
+
+        docs = await self._run_blocking(self._retrieve, query, k, filters)
+        query_vector = await self._run_blocking(self.embedding_model.embed_query, query)
+        cached = self._cached_answer(query, query_vector, docs, "async", start)
+        if cached is not None:
+            return cached
+
+        prompt_text, context_report = self._build_prompt(query, docs)
+        semaphore = self._llm_semaphore()
+        wait_start = time.time()
+        async with semaphore:
+            # 동시 LLM 호출 상한에 걸려 기다린 시간
+            self.metrics.observe("stage_seconds", time.time() - wait_start, stage="llm_queue")
+            print(f"[LOG] LLM 호출 시작 (대기 {time.time() - wait_start:.2f}초)")
+            llm_start = time.time()
+            message = await self.llm.ainvoke(prompt_text)
+            self.metrics.record_llm(message, time.time() - llm_start)
+            print(f"[LOG] LLM 응답 완료 ({time.time() - llm_start:.2f}초)")
+
+        return self._finish_answer(query, query_vector, docs, message.content, context_report, "async", start)
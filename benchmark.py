@@ -0,0 +1,292 @@
+"""
+검색/인덱싱 성능 벤치마크
+합성 한국어 규정 문서(청크 수 지정)를 만들어 단계별 지연 시간 p50/p95/p99 를 측정하고 JSON 으로 저장합니다.
+LLM 은 고정 응답 stub(FakeListChatModel)으로 대체하므로 Ollama 없이 실행됩니다.
+
+측정 단계:
+    parse         - 파일 하나 파싱 (doc_loader.load_file)
+    chunk         - 문서 하나 조문 단위 분할
+    embed         - 청크 batch_size 개 임베딩 (빈 임베딩 캐시에서 시작)
+    index_build   - 전체 인덱스 생성 1회 (임베딩 캐시 사용)
+    vector_search - 질의 임베딩 + Chroma 검색
+    bm25_search   - BM25 검색 (하이브리드 엔진)
+    fusion        - BM25 + Vector 결과 결합 (하이브리드 엔진)
+    ask           - 검색 + 컨텍스트 구성 + LLM stub 호출 (캐시를 비운 상태)
+
+사용 예:
+    python benchmark.py --chunks 1000 --queries 200 --output bench.json
+    python benchmark.py --chunks 100000 --hash-embeddings --baseline bench.json   # 이전 결과 대비 회귀 확인
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# 합성 규정 문서 어휘: (조문 제목, 관련 용어)
+TOPICS = [
+    ("휴가", ["연차", "병가", "경조사", "휴가일수", "사용계획"]),
+    ("휴직", ["육아휴직", "질병휴직", "복직", "휴직기간", "신청서"]),
+    ("출장", ["출장비", "숙박비", "일비", "교통비", "정산"]),
+    ("급여", ["기본급", "수당", "상여금", "지급일", "원천징수"]),
+    ("복무", ["근무시간", "출근", "퇴근", "유연근무", "재택근무"]),
+    ("징계", ["견책", "감봉", "정직", "해임", "징계위원회"]),
+    ("교육", ["직무교육", "교육비", "이수", "사내강사", "교육계획"]),
+    ("보안", ["정보보안", "비밀번호", "보안점검", "외부저장매체", "출입통제"]),
+    ("채용", ["공개채용", "서류전형", "면접", "수습기간", "임용"]),
+    ("평가", ["근무평정", "성과평가", "다면평가", "이의신청", "평가등급"]),
+    ("복리후생", ["건강검진", "학자금", "경조금", "사내대출", "동호회"]),
+    ("계약", ["계약체결", "입찰", "수의계약", "계약보증금", "검수"]),
+]
+SUBJECTS = ["직원", "소속 부서장", "인사담당자", "위원회", "회사", "신청인"]
+VERBS = ["신청하여야 한다", "승인할 수 있다", "지급한다", "보고하여야 한다", "따로 정한다", "제한할 수 있다"]
+ARTICLES_PER_CHAPTER = 10
+ARTICLES_PER_FILE = 50
+STAGES = ("parse", "chunk", "embed", "index_build", "vector_search", "bm25_search", "fusion", "ask")
+
+
+def topic_particle(word):
+    """받침이 있으면 '은', 없으면 '는'"""
+    return "은" if (ord(word[-1]) - 0xAC00) % 28 else "는"
+
+
+def make_sentence(rng, title, terms):
+    subject = rng.choice(SUBJECTS)
+    return (f"{subject}{topic_particle(subject)} {rng.choice(terms)}에 관하여 {rng.randint(1, 30)}일 이내에 "
+            f"{title} 관련 사항을 {rng.choice(VERBS)}.")
+
+
+def make_corpus(out_dir, n_chunks, seed=0):
+    """조문 하나가 청크 하나가 되도록 합성 규정 .txt 파일 생성, 파일 경로 목록 반환"""
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for file_no, start in enumerate(range(0, n_chunks, ARTICLES_PER_FILE)):
+        lines = [f"합성 규정 {file_no + 1}", "개정 2024.01.01."]
+        for article in range(1, min(ARTICLES_PER_FILE, n_chunks - start) + 1):
+            if article % ARTICLES_PER_CHAPTER == 1:
+                chapter = article // ARTICLES_PER_CHAPTER + 1
+                lines.append(f"제{chapter}장 {rng.choice(TOPICS)[0]}")
+            title, terms = rng.choice(TOPICS)
+            body = " ".join(make_sentence(rng, title, terms) for _ in range(rng.randint(3, 6)))
+            lines.append(f"제{article}조({title}) {body}")
+        path = os.path.join(out_dir, f"규정_{file_no + 1:05d}.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+        paths.append(path)
+    return paths
+
+
+def make_queries(n_queries, seed=0):
+    rng = random.Random(seed + 1)
+    queries = []
+    for _ in range(n_queries):
+        title, terms = rng.choice(TOPICS)
+        queries.append(f"{rng.choice(terms)} {title} {rng.choice(['절차', '기준', '기간', '방법'])}은?")
+    return queries
+
+
+def summarize(samples):
+    """초 단위 측정값 -> ms 단위 p50/p95/p99/평균"""
+    values = np.asarray(samples, dtype=np.float64) * 1000
+    return {
+        "count": len(values),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "mean_ms": round(float(values.mean()), 3),
+    }
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = {}
+
+    @contextlib.contextmanager
+    def measure(self, stage):
+        start = time.perf_counter()
+        yield
+        self.samples.setdefault(stage, []).append(time.perf_counter() - start)
+
+    def report(self):
+        return {stage: summarize(self.samples[stage]) for stage in STAGES if stage in self.samples}
+
+
+def create_engine(name, persist_directory, hash_embeddings, quantize=False):
+    from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+    if name == "hybrid":
+        from hybrid_rag_engine import HybridRagEngine
+        engine = HybridRagEngine(persist_directory=persist_directory, quantize=quantize)
+    else:
+        from rag_engine import RagEngine
+        engine = RagEngine(persist_directory=persist_directory, quantize=quantize)
+    if hash_embeddings:
+        # 모델 없이 검색/색인 경로만 측정 (텍스트 해시 기반 768차원 벡터)
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        engine._embedding_base = DeterministicFakeEmbedding(size=768)
+    # LLM stub: Ollama 호출 없이 고정 응답
+    engine.llm = FakeListChatModel(responses=["벤치마크 응답입니다."])
+    return engine
+
+
+def run_benchmark(args):
+    from doc_loader import load_file
+    from fusion import fuse
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="rag_bench_")
+    timer = StageTimer()
+    result = {}
+    # 단계별 [LOG] 출력은 측정에서 제외 (--verbose 로 표시)
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    try:
+        print(f"[LOG] 합성 코퍼스 생성: {args.chunks}개 청크 ({workdir})")
+        paths = make_corpus(os.path.join(workdir, "docs"), args.chunks, seed=args.seed)
+        queries = make_queries(args.queries, seed=args.seed)
+        engine = create_engine(args.engine, os.path.join(workdir, "chroma_db"), args.hash_embeddings, args.quantize)
+
+        with quiet:
+            documents = []
+            chunks = []
+            for path in paths:
+                with timer.measure("parse"):
+                    doc = load_file(path)
+                documents.append(doc)
+                with timer.measure("chunk"):
+                    chunks.extend(engine._split_documents([doc]))
+
+            texts = [chunk.page_content for chunk in chunks]
+            for i in range(0, len(texts), args.batch_size):
+                with timer.measure("embed"):
+                    engine.embedding_model.embed_documents(texts[i:i + args.batch_size])
+
+            with timer.measure("index_build"):
+                engine.create_index(documents)
+
+            hybrid = hasattr(engine, "bm25_index")
+            depth = engine.fusion_depth if hybrid else args.k
+            for query in queries:
+                engine.embedding_model.query_cache.clear()
+                with timer.measure("vector_search"):
+                    vector_results = [
+                        (doc, -distance)
+                        for doc, distance in engine._vector_search(engine.embedding_model.embed_query(query), depth)
+                    ]
+                if hybrid:
+                    with timer.measure("bm25_search"):
+                        bm25_results = engine.bm25_index.search(query, k=depth)
+                    with timer.measure("fusion"):
+                        fuse([bm25_results, vector_results], [engine.bm25_weight, engine.vector_weight],
+                             engine.fusion, engine.rrf_k)
+
+            for query in queries[:args.ask_queries]:
+                # 검색/답변/질의 임베딩 캐시를 비워 매번 전체 경로 측정
+                engine.embedding_model.query_cache.clear()
+                engine._on_index_changed()
+                with timer.measure("ask"):
+                    engine.ask(query)
+
+        result = {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                "engine": args.engine,
+                "chunks": len(chunks),
+                "files": len(paths),
+                "queries": len(queries),
+                "k": args.k,
+                "batch_size": args.batch_size,
+                "hash_embeddings": args.hash_embeddings,
+                "quantize": args.quantize,
+                "seed": args.seed,
+            },
+            "stages": timer.report(),
+        }
+    finally:
+        if not args.keep and not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result, baseline, tolerance):
+    """기준 결과 대비 p95 가 tolerance 비율 이상 느려진 단계 목록"""
+    regressions = []
+    for stage, current in result["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous or not previous["p95_ms"]:
+            continue
+        ratio = current["p95_ms"] / previous["p95_ms"]
+        if ratio > 1 + tolerance:
+            regressions.append({"stage": stage, "baseline_p95_ms": previous["p95_ms"],
+                                "p95_ms": current["p95_ms"], "ratio": round(ratio, 2)})
+    return regressions
+
+
+def print_report(result):
+    print(f"\n{'단계':<14}{'횟수':>8}{'p50(ms)':>12}{'p95(ms)':>12}{'p99(ms)':>12}")
+    for stage, s in result["stages"].items():
+        print(f"{stage:<14}{s['count']:>8}{s['p50_ms']:>12.2f}{s['p95_ms']:>12.2f}{s['p99_ms']:>12.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="검색/인덱싱 지연 시간 벤치마크")
+    parser.add_argument("--engine", choices=["rag", "hybrid"], default="hybrid")
+    parser.add_argument("--chunks", type=int, default=1000, help="합성 청크 수 (1k~100k)")
+    parser.add_argument("--queries", type=int, default=200, help="검색 단계 측정 질의 수")
+    parser.add_argument("--ask-queries", type=int, default=50, help="ask 단계 측정 질의 수")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=32, help="embed 단계 배치 크기")
+    parser.add_argument("--hash-embeddings", action="store_true", help="임베딩 모델 대신 해시 벡터 사용")
+    parser.add_argument("--quantize", action="store_true", help="실험적: int8 선형 탐색 + 정확 재계산으로 벡터 검색 (HNSW 와 비교용)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="결과 JSON 경로")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON (p95 회귀 시 종료 코드 1)")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="허용 p95 증가 비율")
+    parser.add_argument("--workdir", help="코퍼스/인덱스 작업 폴더 (기본: 임시 폴더, 종료 시 삭제)")
+    parser.add_argument("--keep", action="store_true", help="임시 작업 폴더 유지")
+    parser.add_argument("--verbose", action="store_true", help="엔진 [LOG] 출력 표시")
+    args = parser.parse_args(argv)
+
+    result = run_benchmark(args)
+    print_report(result)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        result["regressions"] = regressions
+        for r in regressions:
+            print(f"[회귀] {r['stage']}: p95 {r['baseline_p95_ms']:.2f}ms -> {r['p95_ms']:.2f}ms (x{r['ratio']})")
+        if not regressions:
+            print("회귀 없음")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.output}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
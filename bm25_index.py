@@ -0,0 +1,462 @@
+"""
+디스크 기반 BM25 역색인
+postings / 문서 빈도(df) / 청크 길이를 파일로 저장하고 로드 시 memory-map 합니다.
+
+디렉토리 구성:
+    meta.json        - 용어 사전(term -> [offset, df]), 청크 ID, 삭제 표시(tombstone), 토크나이저 식별자
+    postings_doc.u32 - 모든 용어의 posting 문서 번호 (용어별로 연속 배치)
+    postings_tf.u32  - posting 별 용어 빈도
+    doclens.u32      - 청크별 토큰 수
+    chunks.jsonl     - 청크 원문과 메타데이터 (chunks.idx 의 오프셋으로 임의 접근)
+    fields.json      - 메타데이터 값 -> 청크 번호 목록 (검색 필터용, 없으면 로드 시 chunks.jsonl 에서 재구성)
+    delta.jsonl      - 마지막 병합 이후 추가된 청크 (로드 시 메모리 색인으로 재구성)
+
+추가된 청크는 delta 세그먼트에, 삭제된 청크는 tombstone 으로 기록되고
+delta/삭제 비율이 커지면 save() 시점에 본 세그먼트로 병합(compaction)됩니다.
+"""
+import json
+import math
+import mmap
+import os
+from collections import Counter
+
+import numpy as np
+from langchain_core.documents import Document
+
+from metadata_filter import match_value, normalize_filters
+
+INDEX_VERSION = 1
+# 필터 색인에서 제외하는 메타데이터 (청크마다 값이 달라 필터로 쓰지 않음)
+UNFILTERED_FIELDS = ("chunk_id",)
+
+
+def default_tokenizer(text):
+    """BM25Retriever 기본 전처리와 동일한 공백 기준 토크나이저"""
+    return text.split()
+
+
+def filter_fields(metadata):
+    """필터 색인 대상 (필드, 값) 목록 - 문자열/숫자/불리언 값만"""
+    return [
+        (field, value) for field, value in metadata.items()
+        if field not in UNFILTERED_FIELDS and isinstance(value, (str, int, float, bool))
+    ]
+
+
+def default_index_dir(persist_directory):
+    """Chroma 저장 경로 옆에 BM25 색인 경로 지정 (./chroma_db -> ./chroma_db_bm25)"""
+    return os.path.abspath(persist_directory).rstrip("\\/") + "_bm25"
+
+
+class BM25Index:
+    def __init__(self, index_dir, tokenizer=None, k1=1.5, b=0.75, compact_ratio=0.2):
+        self.index_dir = index_dir
+        self.tokenizer = tokenizer or default_tokenizer
+        # meta.json 에 기록되는 토크나이저 식별자 (korean_tokenizer.CachedTokenizer.id)
+        self.tokenizer_id = getattr(self.tokenizer, "id", "whitespace-1")
+        # 다른 버전/토크나이저로 만든 색인이 있어 load() 가 실패했는지 (재생성 필요)
+        self.outdated = False
+        self.k1 = k1
+        self.b = b
+        # delta 또는 삭제 청크가 본 세그먼트의 이 비율을 넘으면 save() 때 병합
+        self.compact_ratio = compact_ratio
+        self._reset()
+
+    # ------------------------------------------------------------------
+    # 상태 관리
+    # ------------------------------------------------------------------
+    def _reset(self):
+        self._release_maps()
+        # 본 세그먼트 (memory-mapped)
+        self._terms = {}
+        self._ids = []
+        self._post_doc = np.zeros(0, dtype=np.uint32)
+        self._post_tf = np.zeros(0, dtype=np.uint32)
+        self._main_lens = np.zeros(0, dtype=np.uint32)
+        self._chunk_offsets = np.zeros(1, dtype=np.uint64)
+        self._chunks_file = None
+        self._chunks_mm = None
+        # delta 세그먼트 (메모리)
+        self._delta_records = []
+        self._delta_postings = {}
+        self._delta_lens = []
+        # 공통
+        self._fields = {}
+        self._slot_of = {}
+        self._deleted = set()
+        self._live_len = 0
+
+    def _release_maps(self):
+        """Windows 에서 파일 교체가 가능하도록 열려 있는 mmap 해제"""
+        for name in ("_post_doc", "_post_tf", "_main_lens", "_chunk_offsets"):
+            arr = getattr(self, name, None)
+            mm = getattr(arr, "_mmap", None)
+            if mm is not None:
+                setattr(self, name, None)
+                mm.close()
+        if getattr(self, "_chunks_mm", None) is not None:
+            self._chunks_mm.close()
+            self._chunks_mm = None
+        if getattr(self, "_chunks_file", None) is not None:
+            self._chunks_file.close()
+            self._chunks_file = None
+
+    @property
+    def _n_main(self):
+        return len(self._ids)
+
+    def __len__(self):
+        return len(self._slot_of)
+
+    def __contains__(self, chunk_id):
+        return chunk_id in self._slot_of
+
+    def chunk_ids(self):
+        """살아 있는 청크 ID 집합"""
+        return set(self._slot_of)
+
+    def exists(self):
+        return os.path.exists(os.path.join(self.index_dir, "meta.json"))
+
+    def close(self):
+        self._reset()
+
+    # ------------------------------------------------------------------
+    # 로드 / 저장
+    # ------------------------------------------------------------------
+    def _path(self, name, base=None):
+        return os.path.join(base or self.index_dir, name)
+
+    def _map_array(self, name, dtype, length):
+        if length == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(self._path(name), dtype=dtype, mode="r", shape=(length,))
+
+    def load(self):
+        """디스크 색인 로드. 색인이 없으면 False 반환"""
+        if not self.exists():
+            return False
+
+        self._reset()
+        self.outdated = False
+        with open(self._path("meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION:
+            print(f"[LOG] BM25 색인 버전 불일치 ({meta.get('version')}), 재생성이 필요합니다.")
+            self.outdated = True
+            return False
+        # tokenizer 필드가 없는 색인은 공백 토크나이저로 만든 것
+        if meta.get("tokenizer", "whitespace-1") != self.tokenizer_id:
+            print(f"[LOG] BM25 토크나이저 불일치 ({meta.get('tokenizer', 'whitespace-1')} -> {self.tokenizer_id}), "
+                  f"재생성이 필요합니다.")
+            self.outdated = True
+            return False
+
+        self._terms = meta["terms"]
+        self._ids = meta["ids"]
+        n_main = len(self._ids)
+        n_postings = meta["n_postings"]
+
+        self._post_doc = self._map_array("postings_doc.u32", np.uint32, n_postings)
+        self._post_tf = self._map_array("postings_tf.u32", np.uint32, n_postings)
+        self._main_lens = self._map_array("doclens.u32", np.uint32, n_main)
+        self._chunk_offsets = self._map_array("chunks.idx", np.uint64, n_main + 1)
+        if n_main:
+            self._chunks_file = open(self._path("chunks.jsonl"), "rb")
+            self._chunks_mm = mmap.mmap(self._chunks_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self._deleted = set(meta.get("deleted", []))
+        self._load_fields(n_main)
+        for slot, chunk_id in enumerate(self._ids):
+            if slot not in self._deleted:
+                self._slot_of[chunk_id] = slot
+                self._live_len += int(self._main_lens[slot])
+
+        delta_path = self._path("delta.jsonl")
+        if os.path.exists(delta_path):
+            with open(delta_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self._add_record(json.loads(line))
+
+        print(f"[LOG] BM25 색인 로드: {len(self)}개 청크, {len(self._terms)}개 용어")
+        return True
+
+    def _load_fields(self, n_main):
+        fields_path = self._path("fields.json")
+        if os.path.exists(fields_path):
+            with open(fields_path, "r", encoding="utf-8") as f:
+                for field, entries in json.load(f).items():
+                    self._fields[field] = {value: list(slots) for value, slots in entries}
+            return
+        # 이전 버전 색인: 본 세그먼트 메타데이터로 재구성 (다음 병합 때 파일로 저장됨)
+        for slot in range(n_main):
+            self._index_fields(slot, self._read_main_record(slot)["metadata"])
+
+    def _index_fields(self, slot, metadata):
+        for field, value in filter_fields(metadata):
+            self._fields.setdefault(field, {}).setdefault(value, []).append(slot)
+
+    def save(self):
+        """변경 사항 저장. delta/삭제가 많으면 본 세그먼트로 병합"""
+        os.makedirs(self.index_dir, exist_ok=True)
+        threshold = max(1, int(self._n_main * self.compact_ratio))
+        if len(self._delta_records) > threshold or len(self._deleted) > threshold \
+                or not self.exists() or self.outdated:
+            self._compact()
+            return
+
+        with open(self._path("delta.jsonl.tmp"), "w", encoding="utf-8") as f:
+            for record in self._live_delta_records():
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(self._path("delta.jsonl.tmp"), self._path("delta.jsonl"))
+        self._write_meta(self.index_dir, self._terms, self._ids, len(self._post_doc),
+                         sorted(s for s in self._deleted if s < self._n_main))
+
+    def _write_meta(self, base, terms, ids, n_postings, deleted):
+        meta = {
+            "version": INDEX_VERSION,
+            "tokenizer": self.tokenizer_id,
+            "k1": self.k1,
+            "b": self.b,
+            "n_postings": n_postings,
+            "ids": ids,
+            "deleted": deleted,
+            "terms": terms,
+        }
+        tmp = self._path("meta.json.tmp", base)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp, self._path("meta.json", base))
+
+    def _live_records(self):
+        for slot, chunk_id in enumerate(self._ids):
+            if slot not in self._deleted:
+                yield self._read_main_record(slot)
+        yield from self._live_delta_records()
+
+    def _live_delta_records(self):
+        for offset, record in enumerate(self._delta_records):
+            if self._slot_of.get(record["id"]) == self._n_main + offset:
+                yield record
+
+    def _compact(self):
+        """살아있는 모든 청크로 본 세그먼트를 다시 작성"""
+        records = list(self._live_records())
+        self._write_segment(records)
+        self.load()
+
+    def _write_segment(self, records):
+        os.makedirs(self.index_dir, exist_ok=True)
+        tmp_dir = self.index_dir + ".tmp"
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        postings = {}
+        fields = {}
+        doclens = np.zeros(len(records), dtype=np.uint32)
+        offsets = np.zeros(len(records) + 1, dtype=np.uint64)
+        ids = []
+        with open(self._path("chunks.jsonl", tmp_dir), "wb") as f:
+            for slot, record in enumerate(records):
+                tokens = self.tokenizer(record["text"])
+                doclens[slot] = len(tokens)
+                for term, tf in Counter(tokens).items():
+                    postings.setdefault(term, []).append((slot, tf))
+                for field, value in filter_fields(record["metadata"]):
+                    fields.setdefault(field, {}).setdefault(value, []).append(slot)
+                line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+                f.write(line)
+                offsets[slot + 1] = offsets[slot] + len(line)
+                ids.append(record["id"])
+
+        terms = {}
+        post_doc = []
+        post_tf = []
+        for term in sorted(postings):
+            entries = postings[term]
+            terms[term] = [len(post_doc), len(entries)]
+            for slot, tf in entries:
+                post_doc.append(slot)
+                post_tf.append(tf)
+
+        np.asarray(post_doc, dtype=np.uint32).tofile(self._path("postings_doc.u32", tmp_dir))
+        np.asarray(post_tf, dtype=np.uint32).tofile(self._path("postings_tf.u32", tmp_dir))
+        doclens.tofile(self._path("doclens.u32", tmp_dir))
+        offsets.tofile(self._path("chunks.idx", tmp_dir))
+        with open(self._path("fields.json", tmp_dir), "w", encoding="utf-8") as f:
+            json.dump({field: [[value, slots] for value, slots in values.items()] for field, values in fields.items()},
+                      f, ensure_ascii=False)
+        with open(self._path("delta.jsonl", tmp_dir), "w", encoding="utf-8"):
+            pass
+        self._write_meta(tmp_dir, terms, ids, len(post_doc), [])
+
+        # 기존 mmap 을 닫은 뒤 파일 교체 (meta.json 을 마지막에 교체)
+        self._release_maps()
+        for name in ("postings_doc.u32", "postings_tf.u32", "doclens.u32",
+                     "chunks.jsonl", "chunks.idx", "fields.json", "delta.jsonl", "meta.json"):
+            os.replace(self._path(name, tmp_dir), self._path(name))
+        os.rmdir(tmp_dir)
+
+    # ------------------------------------------------------------------
+    # 갱신
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _to_record(doc):
+        chunk_id = doc.metadata.get("chunk_id")
+        if not chunk_id:
+            raise ValueError("BM25 색인에 추가할 청크에 metadata['chunk_id']가 없습니다.")
+        return {"id": chunk_id, "text": doc.page_content, "metadata": doc.metadata}
+
+    def build(self, documents):
+        """전체 청크로 색인을 새로 생성하고 저장"""
+        self._reset()
+        self._write_segment([self._to_record(doc) for doc in documents])
+        self.load()
+
+    def add_documents(self, documents):
+        """청크 추가 (같은 chunk_id 가 있으면 교체). save() 호출 시 디스크 반영"""
+        for doc in documents:
+            record = self._to_record(doc)
+            if record["id"] in self._slot_of:
+                self.delete([record["id"]])
+            self._add_record(record)
+
+    def _add_record(self, record):
+        slot = self._n_main + len(self._delta_records)
+        tokens = self.tokenizer(record["text"])
+        for term, tf in Counter(tokens).items():
+            self._delta_postings.setdefault(term, []).append((slot, tf))
+        self._delta_records.append(record)
+        self._delta_lens.append(len(tokens))
+        self._index_fields(slot, record["metadata"])
+        self._slot_of[record["id"]] = slot
+        self._live_len += len(tokens)
+
+    def delete(self, chunk_ids):
+        """청크 삭제 (tombstone 기록). save() 호출 시 디스크 반영"""
+        for chunk_id in chunk_ids:
+            slot = self._slot_of.pop(chunk_id, None)
+            if slot is None:
+                continue
+            self._deleted.add(slot)
+            self._live_len -= self._doc_len(slot)
+
+    # ------------------------------------------------------------------
+    # 검색
+    # ------------------------------------------------------------------
+    def _doc_len(self, slot):
+        if slot < self._n_main:
+            return int(self._main_lens[slot])
+        return self._delta_lens[slot - self._n_main]
+
+    def _read_main_record(self, slot):
+        start = int(self._chunk_offsets[slot])
+        end = int(self._chunk_offsets[slot + 1])
+        return json.loads(self._chunks_mm[start:end].decode("utf-8"))
+
+    def _record(self, slot):
+        if slot < self._n_main:
+            return self._read_main_record(slot)
+        return self._delta_records[slot - self._n_main]
+
+    def _term_postings(self, term):
+        """용어의 (문서 번호 배열, 빈도 배열, 문서 길이 배열) 반환 - 본 세그먼트 + delta"""
+        slots = []
+        tfs = []
+        lens = []
+        entry = self._terms.get(term)
+        if entry:
+            offset, df = entry
+            main_slots = self._post_doc[offset:offset + df]
+            slots.append(main_slots)
+            tfs.append(self._post_tf[offset:offset + df])
+            lens.append(self._main_lens[main_slots])
+        delta = self._delta_postings.get(term)
+        if delta:
+            delta_slots = np.fromiter((s for s, _ in delta), dtype=np.uint32, count=len(delta))
+            slots.append(delta_slots)
+            tfs.append(np.fromiter((tf for _, tf in delta), dtype=np.uint32, count=len(delta)))
+            lens.append(np.asarray(self._delta_lens, dtype=np.uint32)[delta_slots - self._n_main])
+        if not slots:
+            return None
+        return np.concatenate(slots), np.concatenate(tfs), np.concatenate(lens)
+
+    def _filter_slots(self, filters):
+        """필터를 만족하는 청크 번호 배열 (필터가 없으면 None). 필드별 값 목록만 확인하고 청크 원문은 읽지 않음"""
+        filters = normalize_filters(filters)
+        if not filters:
+            return None
+        allowed = None
+        for field, condition in filters.items():
+            values = self._fields.get(field, {})
+            parts = [slots for value, slots in values.items() if match_value(value, condition)]
+            if match_value(None, condition):
+                # 필드가 없는 청크도 조건을 만족 ($ne, $nin)
+                universe = np.arange(self._n_main + len(self._delta_records), dtype=np.uint32)
+                with_field = np.fromiter((s for slots in values.values() for s in slots), dtype=np.uint32)
+                parts.append(np.setdiff1d(universe, with_field))
+            slots = np.unique(np.concatenate(parts).astype(np.uint32)) if parts else np.zeros(0, dtype=np.uint32)
+            allowed = slots if allowed is None else np.intersect1d(allowed, slots, assume_unique=True)
+            if len(allowed) == 0:
+                break
+        return allowed
+
+    def search_ids(self, query, k=5, filters=None):
+        """
+        (chunk 슬롯, 점수) 목록을 점수 내림차순으로 반환. 비용은 매칭 posting 수에 비례
+        filters 가 있으면 메타데이터 필터를 만족하는 청크만 점수 계산
+        """
+        n_docs = len(self)
+        if n_docs == 0:
+            return []
+        allowed = self._filter_slots(filters)
+        if allowed is not None and len(allowed) == 0:
+            return []
+        avgdl = max(self._live_len / n_docs, 1e-9)
+
+        deleted = np.fromiter(self._deleted, dtype=np.uint32, count=len(self._deleted)) if self._deleted else None
+        slot_parts = []
+        score_parts = []
+        for term in set(self.tokenizer(query)):
+            postings = self._term_postings(term)
+            if postings is None:
+                continue
+            slots, tfs, lens = postings
+            if deleted is not None:
+                # 삭제/교체된 청크의 posting 을 먼저 제외 (df 가 살아 있는 청크 수 n_docs 를 넘으면 IDF 가 음수)
+                keep = ~np.isin(slots, deleted)
+                slots, tfs, lens = slots[keep], tfs[keep], lens[keep]
+            df = len(slots)
+            if df == 0:
+                continue
+            idf = math.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            tf = tfs.astype(np.float32)
+            norm = self.k1 * (1.0 - self.b + self.b * lens.astype(np.float32) / avgdl)
+            slot_parts.append(slots)
+            score_parts.append(idf * tf * (self.k1 + 1.0) / (tf + norm))
+
+        if not slot_parts:
+            return []
+        slots = np.concatenate(slot_parts)
+        scores = np.concatenate(score_parts)
+        if allowed is not None:
+            keep = np.isin(slots, allowed)
+            slots = slots[keep]
+            scores = scores[keep]
+        if len(slots) == 0:
+            return []
+
+        unique_slots, inverse = np.unique(slots, return_inverse=True)
+        totals = np.bincount(inverse, weights=scores)
+        k = min(k, len(unique_slots))
+        top = np.argpartition(-totals, k - 1)[:k]
+        top = top[np.argsort(-totals[top])]
+        return [(int(unique_slots[i]), float(totals[i])) for i in top]
+
+    def search(self, query, k=5, filters=None):
+        """BM25 검색 결과를 (Document, 점수) 목록으로 반환"""
+        results = []
+        for slot, score in self.search_ids(query, k, filters=filters):
+            record = self._record(slot)
+            results.append((Document(page_content=record["text"], metadata=record["metadata"]), score))
+        return results
@@ -0,0 +1,130 @@
+"""
+청크 관련 공용 유틸리티
+엔진 간에 동일한 chunk_id 규칙과 조/장 단위 분할기를 공유하기 위한 모듈
+"""
+import hashlib
+import re
+
+from langchain_core.documents import Document
+
+
+def make_chunk_id(source, index, text):
+    """출처, 출처 내 순번, 본문으로부터 안정적인 청크 ID 생성"""
+    key = f"{source}\x00{index}\x00{text}".encode("utf-8")
+    return hashlib.sha1(key).hexdigest()[:20]
+
+
+def assign_chunk_ids(chunks):
+    """
+    각 청크의 metadata["chunk_id"]를 채우고 ID 목록을 반환합니다.
+    같은 문서를 다시 인덱싱해도 같은 ID가 나오므로 Chroma/BM25에서 중복 없이 덮어쓸 수 있습니다.
+    출처는 파일 경로(metadata["path"]) 기준이라 다른 폴더의 같은 이름 파일도 ID 가 겹치지 않습니다.
+    """
+    counters = {}
+    ids = []
+    for chunk in chunks:
+        source = chunk.metadata.get("path") or chunk.metadata.get("source", "")
+        index = counters.get(source, 0)
+        counters[source] = index + 1
+        chunk_id = make_chunk_id(source, index, chunk.page_content)
+        chunk.metadata["chunk_id"] = chunk_id
+        ids.append(chunk_id)
+    return ids
+
+
+# 규정 문서 구조: "제2장 인사", "제15조(휴가)", "제15조의2(특별휴가)"
+CHAPTER_PATTERN = re.compile(r"^[ \t]*제\s*(\d+)\s*장(?:[ \t]+([^\n]{0,40}?))?[ \t]*$", re.MULTILINE)
+ARTICLE_PATTERN = re.compile(r"^[ \t]*제\s*(\d+)\s*조(?:\s*의\s*(\d+))?[ \t]*\(([^)\n]{1,40})\)", re.MULTILINE)
+# 부칙 (이후 조문은 본칙 조 번호와 겹치므로 supplementary 로 구분)
+SUPPLEMENT_PATTERN = re.compile(r"^[ \t]*부[ \t]*칙[ \t]*(?:<[^>\n]*>|\([^)\n]*\))?[ \t]*$", re.MULTILINE)
+
+
+def article_number(number, branch=None):
+    """조 번호 문자열 ("15", 가지 조문은 "15의2")"""
+    return f"{int(number)}의{int(branch)}" if branch else str(int(number))
+
+
+def split_sections(text):
+    """
+    본문을 장/조/부칙 제목 위치에서 나누어 (본문, 구조 메타데이터) 목록을 반환합니다.
+    장·부칙 제목 줄은 바로 뒤 조문과 같은 구간에 붙이며, 조문 제목이 하나도 없으면 None 을 반환합니다.
+    """
+    headings = []
+    for match in CHAPTER_PATTERN.finditer(text):
+        headings.append((match.start(), "chapter", match))
+    for match in ARTICLE_PATTERN.finditer(text):
+        headings.append((match.start(), "article", match))
+    for match in SUPPLEMENT_PATTERN.finditer(text):
+        headings.append((match.start(), "supplement", match))
+    if not any(kind == "article" for _, kind, _ in headings):
+        return None
+    headings.sort(key=lambda item: item[0])
+
+    sections = []
+    chapter = {}
+    preamble = text[:headings[0][0]].strip()
+    if preamble:
+        sections.append((preamble, {}))
+
+    pending_start = None
+    for i, (start, kind, match) in enumerate(headings):
+        end = headings[i + 1][0] if i + 1 < len(headings) else len(text)
+        if kind == "article":
+            meta = dict(chapter, article=article_number(match.group(1), match.group(2)),
+                        article_title=match.group(3).strip())
+        else:
+            if kind == "chapter":
+                chapter = {"chapter": str(int(match.group(1)))}
+                if match.group(2):
+                    chapter["chapter_title"] = match.group(2).strip()
+            else:
+                chapter = {"supplementary": True}
+            # 장/부칙 제목은 다음 조문 구간의 시작으로 사용
+            pending_start = start
+            if i + 1 < len(headings) and headings[i + 1][1] == "article":
+                continue
+            meta = dict(chapter)
+        body = text[pending_start if pending_start is not None else start:end].strip()
+        pending_start = None
+        if body:
+            sections.append((body, meta))
+    return sections
+
+
+class RegulationTextSplitter:
+    """
+    조/장 단위 청크 분할기
+    제N조 경계에서 자르고 장/조 번호를 metadata 에 기록합니다 (chapter, chapter_title, article, article_title,
+    부칙 조문은 supplementary=True).
+    조문이 chunk_size 보다 길면 같은 메타데이터로 다시 나누고, 조문 구조가 없는 문서는 기존 방식으로 분할합니다.
+    """
+
+    def __init__(self, chunk_size=2000, chunk_overlap=300, separators=None):
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+        self.chunk_size = chunk_size
+        self.fallback = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            separators=separators or ["\n\n", "\n", ".", " ", ""]
+        )
+
+    def split_documents(self, documents):
+        chunks = []
+        for doc in documents:
+            chunks.extend(self.split_document(doc))
+        return chunks
+
+    def split_document(self, doc):
+        sections = split_sections(doc.page_content)
+        if sections is None:
+            return self.fallback.split_documents([doc])
+
+        chunks = []
+        for body, meta in sections:
+            metadata = dict(doc.metadata, **meta)
+            if len(body) <= self.chunk_size:
+                chunks.append(Document(page_content=body, metadata=metadata))
+                continue
+            for part in self.fallback.split_text(body):
+                chunks.append(Document(page_content=part, metadata=dict(metadata)))
+        return chunks
@@ -0,0 +1,121 @@
+"""
+LLM 컨텍스트 압축
+검색된 청크가 토큰 예산을 넘을 때만 문장 단위로 나누어 질의와 관련된 문장을 먼저 남기고,
+남은 예산은 나머지 문장을 문서 순서대로 채웁니다. chunk_overlap 으로 겹친 문장은 제외합니다.
+질의마다 절약한 토큰 수를 보고합니다.
+"""
+import math
+import re
+import threading
+
+from langchain_core.documents import Document
+
+# 줄바꿈 또는 문장 끝(다. 요. . ? !) 뒤에서 분할
+SENTENCE_PATTERN = re.compile(r"[^\n]*?(?:[.?!。](?=\s)|\n|$)")
+HANGUL_PATTERN = re.compile(r"[가-힣]")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+def estimate_tokens(text):
+    """토큰 수 추정 (한글은 약 1.5자, 그 외는 약 4자당 1토큰)"""
+    hangul = len(HANGUL_PATTERN.findall(text))
+    return math.ceil(hangul / 1.5 + (len(text) - hangul) / 4)
+
+
+def split_sentences(text):
+    """문장 목록 (빈 문장 제외, 앞뒤 공백 제거)"""
+    return [s.strip() for s in SENTENCE_PATTERN.findall(text) if s.strip()]
+
+
+def char_bigrams(text):
+    text = WHITESPACE_PATTERN.sub("", text)
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+class ContextCompressor:
+    """
+    max_tokens: context 전체 토큰 예산 (None 이면 압축하지 않음)
+    token_counter: 토큰 수 계산 함수 (기본: estimate_tokens)
+    """
+
+    def __init__(self, max_tokens=1500, token_counter=None):
+        self.max_tokens = max_tokens
+        self.token_counter = token_counter or estimate_tokens
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def compress(self, query, docs):
+        """(압축된 Document 목록, 보고서) 반환. 원본 docs 는 바꾸지 않음 (출처 표시는 원본 사용)"""
+        before = sum(self.token_counter(doc.page_content) for doc in docs)
+        if self.max_tokens is None or not docs or before <= self.max_tokens:
+            # 예산 안이면 그대로 사용 (조문 전체가 필요한 "15조 알려줘" 같은 질의에서 항을 잃지 않음)
+            return list(docs), self._report(before, before)
+
+        query_grams = char_bigrams(query)
+        candidates = []
+        # 질의와 겹치지 않는 문장: 관련 문장을 넣고 남은 예산을 문서 순서대로 채움
+        fillers = []
+        sentences = []
+        for rank, doc in enumerate(docs):
+            doc_sentences = split_sentences(doc.page_content)
+            sentences.append(doc_sentences)
+            scores = [len(char_bigrams(sentence) & query_grams) for sentence in doc_sentences]
+            matched = any(scores)
+            for i, (sentence, score) in enumerate(zip(doc_sentences, scores)):
+                if not matched:
+                    # 의미 검색으로만 찾은 청크: 앞 문장부터 낮은 우선순위로 포함
+                    score = 0.1 / (i + 1)
+                elif i == 0:
+                    # 조문 제목 등 첫 줄은 맥락 유지를 위해 가산점
+                    score += 0.5
+                if score > 0:
+                    candidates.append((-score, rank, i, sentence))
+                else:
+                    fillers.append((0, rank, i, sentence))
+
+        # 관련도 높은 문장부터 예산 안에서 선택, 다른 청크와 겹치는 문장(chunk_overlap)은 제외
+        candidates.sort()
+        selected = set()
+        kept_text = {}
+        used = 0
+        for _, rank, i, sentence in candidates + fillers:
+            source = docs[rank].metadata.get("path") or docs[rank].metadata.get("source", "")
+            if sentence in kept_text.get(source, ""):
+                continue
+            tokens = self.token_counter(sentence)
+            if used + tokens > self.max_tokens:
+                continue
+            used += tokens
+            selected.add((rank, i))
+            kept_text[source] = kept_text.get(source, "") + "\n" + sentence
+
+        compressed = []
+        for rank, doc in enumerate(docs):
+            kept = [sentence for i, sentence in enumerate(sentences[rank]) if (rank, i) in selected]
+            if kept:
+                compressed.append(Document(page_content="\n".join(kept), metadata=doc.metadata))
+        if not compressed:
+            # 문장 하나가 예산보다 긴 경우: 1순위 청크 앞부분만 사용
+            head = docs[0].page_content[:int(self.max_tokens * 1.5)]
+            compressed = [Document(page_content=head, metadata=docs[0].metadata)]
+        after = sum(self.token_counter(doc.page_content) for doc in compressed)
+        report = self._report(before, after)
+        print(f"[LOG] 컨텍스트 압축: {before} -> {after} 토큰 (절약 {report['tokens_saved']})")
+        return compressed, report
+
+    def _report(self, before, after):
+        with self._lock:
+            self.queries += 1
+            self.tokens_before += before
+            self.tokens_after += after
+        return {"tokens_before": before, "tokens_after": after, "tokens_saved": before - after}
+
+    def stats(self):
+        return {
+            "queries": self.queries,
+            "tokens_before": self.tokens_before,
+            "tokens_after": self.tokens_after,
+            "tokens_saved": self.tokens_before - self.tokens_after,
+        }
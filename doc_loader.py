@@ -0,0 +1,395 @@
+"""
+문서 파일 로더 (RagEngine / HybridRagEngine 공용)
+파일 하나를 Document 로 변환하는 load_file 과 프로세스 풀 기반 병렬 로딩을 제공합니다.
+
+형식별 로더는 register_loader 로 등록합니다. 로더는 (본문 블록 iterator, 파서 이름)을 반환하며
+블록(문단, 표 행, PDF 페이지 등)은 생성되는 대로 이어 붙입니다. 새 형식은 이 파일에 로더 하나만 추가하면
+두 엔진과 collect_source_files 가 함께 인식합니다.
+확장자가 없거나 등록되지 않은 파일도 파일 시그니처(sniff_format)가 로더의 signature 와 맞으면 인덱싱합니다.
+"""
+import os
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from langchain_core.documents import Document
+
+from hwp_loader import extract_hwp_text
+from index_manifest import file_hash
+from text_cache import TextCache
+
+# 추출 결과가 달라지도록 파서를 고치면 올려서 텍스트 캐시를 무효화
+PARSER_VERSION = 1
+
+# 확장자 -> Loader (register_loader 로 등록)
+LOADERS = {}
+
+# 파일 앞부분 시그니처 -> 컨테이너 형식 (확장자와 실제 형식이 다른 파일 판별용)
+FILE_SIGNATURES = (
+    (b"PK\x03\x04", "zip"),                          # HWPX, DOCX (XLSX 등 다른 ZIP 도 있음)
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "ole"),  # HWP 5.0 (DOC/XLS 등 다른 OLE2 도 있음)
+    (b"%PDF", "pdf"),
+)
+
+# "개정 2023. 5. 1.", "<개정 2023.05.01>", "시행일: 2024-01-01" 등
+REVISION_DATE_PATTERN = re.compile(r"(?:개정|시행|제정)\D{0,6}?(\d{4})\s*[.\-/년]\s*(\d{1,2})\s*[.\-/월]\s*(\d{1,2})")
+
+
+class Loader:
+    """
+    형식 하나의 본문 추출기
+    extract(file_path, prefer) -> (본문 블록 iterator, 파서 이름)
+    cached: 추출 결과를 텍스트 캐시에 저장할지 (TXT/MD 처럼 그대로 읽는 형식은 False)
+    """
+
+    def __init__(self, name, extensions, extract, cached=False, signature=None):
+        self.name = name
+        self.extensions = extensions
+        self.extract = extract
+        self.cached = cached
+        # sniff_format 결과 중 이 로더가 처리하는 형식 (문자열 하나 또는 여러 개)
+        self.signature = (signature,) if isinstance(signature, str) else tuple(signature or ())
+
+
+def register_loader(name, extensions, cached=False, signature=None):
+    """형식별 로더 등록 데코레이터 (signature: 확장자를 모를 때 sniff_format 결과로 선택, 예: "pdf" 또는 ("hwpx", "hwp5"))"""
+    def decorator(extract):
+        loader = Loader(name, tuple(extensions), extract, cached=cached, signature=signature)
+        for ext in loader.extensions:
+            LOADERS[ext] = loader
+        return extract
+    return decorator
+
+
+def source_extensions():
+    """인덱싱 대상 확장자 (등록된 로더 기준)"""
+    return tuple(LOADERS)
+
+
+def sniff_format(file_path):
+    """
+    파일 시그니처로 형식 판별
+    ZIP/OLE2 는 내부 구조까지 확인: "docx", "hwpx", "hwp5", 그 외 "zip" / "ole", PDF 는 "pdf", 모르면 None
+    """
+    with open(file_path, "rb") as f:
+        head = f.read(8)
+    kind = next((kind for magic, kind in FILE_SIGNATURES if head.startswith(magic)), None)
+    try:
+        if kind == "zip":
+            with zipfile.ZipFile(file_path) as zf:
+                names = zf.namelist()
+            if "word/document.xml" in names:
+                return "docx"
+            if any(name.lower().startswith("contents/section") for name in names):
+                return "hwpx"
+        elif kind == "ole":
+            import olefile
+            with olefile.OleFileIO(file_path) as ole:
+                if ole.exists("FileHeader"):
+                    return "hwp5"
+    except Exception:
+        # 손상된 컨테이너, olefile 미설치: 컨테이너 형식까지만 판별
+        pass
+    return kind
+
+
+def resolve_loader(file_path):
+    """확장자로 로더 선택, 등록되지 않은 확장자는 시그니처로 선택 (없으면 None)"""
+    loader = LOADERS.get(os.path.splitext(file_path)[1].lower())
+    if loader is not None:
+        return loader
+    try:
+        kind = sniff_format(file_path)
+    except OSError:
+        return None
+    for candidate in set(LOADERS.values()):
+        if kind and kind in candidate.signature:
+            return candidate
+    return None
+
+
+def collect_source_files(doc_paths, extensions=None):
+    """
+    파일/폴더 경로 목록에서 인덱싱 대상 파일의 절대 경로 목록 반환
+    extensions 를 지정하지 않으면 등록되지 않은 확장자의 파일도 시그니처로 로더를 찾을 수 있으면 포함
+    """
+    if isinstance(doc_paths, str):
+        doc_paths = [doc_paths]
+    sniff = extensions is None
+    extensions = extensions or source_extensions()
+
+    def accepted(file_path):
+        if file_path.lower().endswith(extensions):
+            return True
+        return sniff and resolve_loader(file_path) is not None
+
+    files = []
+    for path in doc_paths:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                for name in names:
+                    if accepted(os.path.join(root, name)):
+                        files.append(os.path.abspath(os.path.join(root, name)))
+        elif os.path.isfile(path) and accepted(path):
+            files.append(os.path.abspath(path))
+    return sorted(set(files))
+
+
+def read_docx_text(file_path):
+    """DOCX 문단(세로쓰기 처리)과 표를 텍스트로 변환"""
+    from docx import Document as DocxDocument
+    doc = DocxDocument(file_path)
+
+    text_parts = []
+
+    # 문단 읽기 (세로쓰기 처리)
+    buffer = []
+    for para in doc.paragraphs:
+        para_text = para.text.strip()
+        if para_text:
+            # 한 글자만 있는 경우 버퍼에 모으기
+            if len(para_text) <= 2:
+                buffer.append(para_text)
+            else:
+                # 버퍼에 모인 내용 먼저 추가
+                if buffer:
+                    text_parts.append(''.join(buffer))
+                    buffer = []
+                text_parts.append(para_text)
+
+    # 남은 버퍼 처리
+    if buffer:
+        text_parts.append(''.join(buffer))
+
+    # 표(table) 읽기
+    for table in doc.tables:
+        for row in table.rows:
+            row_text = []
+            for cell in row.cells:
+                cell_text = cell.text.strip()
+                if cell_text:
+                    row_text.append(cell_text)
+            if row_text:
+                text_parts.append(' | '.join(row_text))
+
+    return '\n'.join(text_parts)
+
+
+def find_revision_date(text):
+    """본문의 제정/개정/시행 날짜 중 가장 최근 날짜 (YYYYMMDD 정수, 없으면 None)"""
+    dates = []
+    for year, month, day in REVISION_DATE_PATTERN.findall(text):
+        if 1 <= int(month) <= 12 and 1 <= int(day) <= 31:
+            dates.append(int(year) * 10000 + int(month) * 100 + int(day))
+    return max(dates) if dates else None
+
+
+def document_metadata(file_path, text):
+    """
+    검색 필터용 문서 메타데이터
+    source(파일명), path(절대 경로), file_type(확장자), title(확장자 뺀 파일명), department(상위 폴더명),
+    revision_date(YYYYMMDD)
+    """
+    name = os.path.basename(file_path)
+    title, ext = os.path.splitext(name)
+    metadata = {
+        "source": name,
+        "path": os.path.abspath(file_path),
+        "file_type": ext.lstrip(".").lower(),
+        "title": title,
+        "department": os.path.basename(os.path.dirname(os.path.abspath(file_path))),
+    }
+    revision_date = find_revision_date(text)
+    if revision_date:
+        metadata["revision_date"] = revision_date
+    return metadata
+
+
+@register_loader("docx", [".docx"], cached=True, signature="docx")
+def load_docx(file_path, prefer=None):
+    return [read_docx_text(file_path)], "docx"
+
+
+@register_loader("txt", [".txt"])
+def load_txt(file_path, prefer=None):
+    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+        return [f.read()], "txt"
+
+
+@register_loader("md", [".md"])
+def load_md(file_path, prefer=None):
+    with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+        return [f.read()], "md"
+
+
+@register_loader("hwp", [".hwp", ".hwpx"], cached=True, signature=("hwpx", "hwp5"))
+def load_hwp(file_path, prefer=None):
+    """HWPX -> HWP5 -> pyhwp 순서, prefer(이전 성공 방식) 또는 파일 시그니처에 맞는 방식을 먼저 시도"""
+    if prefer is None:
+        prefer = {"zip": "hwpx", "hwpx": "hwpx", "ole": "hwp5", "hwp5": "hwp5"}.get(sniff_format(file_path))
+    text, strategy = extract_hwp_text(file_path, prefer=prefer)
+    return [text], strategy
+
+
+@register_loader("pdf", [".pdf"], cached=True, signature="pdf")
+def load_pdf(file_path, prefer=None):
+    """PDF 텍스트 레이어를 페이지 단위로 추출 (pypdf 필요, 스캔 이미지 PDF 는 텍스트 없음)"""
+    from pypdf import PdfReader
+    reader = PdfReader(file_path)
+    return (page.extract_text() or "" for page in reader.pages), "pdf"
+
+
+def extract_text(file_path, prefer=None):
+    """등록된 로더로 본문 추출 -> (텍스트, 사용한 파서 이름)"""
+    loader = resolve_loader(file_path)
+    if loader is None:
+        return "", None
+    blocks, parser = loader.extract(file_path, prefer)
+    return "\n".join(block for block in blocks if block and block.strip()), parser
+
+
+def load_file(file_path, cache_dir=None, prefer=None):
+    """
+    파일 하나를 Document 로 변환합니다. 텍스트가 없거나 실패하면 None.
+    cache_dir 가 있으면 내용 해시 기준 텍스트 캐시를 사용하여 같은 파일은 다시 파싱하지 않습니다.
+    """
+    return _load_with_stats(file_path, cache_dir, prefer)[0]
+
+
+def _load_with_stats(file_path, cache_dir=None, prefer=None):
+    """
+    load_file 본체: (Document 또는 None, 파싱 통계) 반환
+    프로세스 풀에서 실행되므로 모듈 최상위 함수로 유지합니다.
+    """
+    start = time.time()
+    stat = _empty_stat(file_path)
+    doc = None
+    try:
+        stat["bytes"] = os.path.getsize(file_path)
+        loader = resolve_loader(file_path)
+        if loader is None:
+            raise ValueError("지원하지 않는 형식")
+        stat["format"] = loader.name
+
+        cache = TextCache(cache_dir, PARSER_VERSION) if cache_dir and loader.cached else None
+        digest = file_hash(file_path) if cache else None
+        entry = cache.get(digest) if cache else None
+        if entry is not None:
+            text, parser = entry["text"], entry["parser"]
+            stat["cached"] = True
+        else:
+            text, parser = extract_text(file_path, prefer=prefer)
+            if cache:
+                # 텍스트가 없는 파일도 기록 (다음 재인덱싱 때 실패할 파싱을 반복하지 않음)
+                cache.put(digest, text, parser)
+
+        stat["chars"] = len(text)
+        if text.strip():
+            metadata = document_metadata(file_path, text)
+            if os.path.splitext(file_path)[1].lower() not in loader.extensions:
+                # 시그니처로 찾은 파일: 확장자 대신 실제 형식으로 필터링
+                metadata["file_type"] = loader.name
+            metadata["parser"] = parser
+            doc = Document(page_content=text, metadata=metadata)
+    except Exception as e:
+        stat["error"] = True
+        print(f"Error loading {file_path}: {e}")
+    stat["seconds"] = time.time() - start
+    return doc, stat
+
+
+def _empty_stat(file_path, error=False):
+    return {"format": os.path.splitext(file_path)[1].lower().lstrip(".") or "unknown",
+            "bytes": 0, "chars": 0, "cached": False, "error": error, "seconds": 0.0}
+
+
+class IngestStats:
+    """형식별 파싱 통계 (파일 수, 오류/빈 문서 수, 캐시 사용 수, 처리량)"""
+
+    def __init__(self):
+        self.formats = {}
+
+    def record(self, stat, loaded):
+        entry = self.formats.setdefault(stat["format"], {
+            "files": 0, "errors": 0, "empty": 0, "cached": 0, "bytes": 0, "chars": 0, "seconds": 0.0,
+        })
+        entry["files"] += 1
+        entry["errors"] += stat["error"]
+        entry["empty"] += not loaded and not stat["error"]
+        entry["cached"] += stat["cached"]
+        entry["bytes"] += stat["bytes"]
+        entry["chars"] += stat["chars"]
+        entry["seconds"] += stat["seconds"]
+
+    def report(self):
+        """형식별 통계 + 처리량 (MB/초, 파일/초 - 워커 합산 파싱 시간 기준)"""
+        report = {}
+        for fmt, entry in self.formats.items():
+            seconds = entry["seconds"]
+            report[fmt] = dict(
+                entry,
+                seconds=round(seconds, 3),
+                mb_per_sec=round(entry["bytes"] / 1e6 / seconds, 2) if seconds else None,
+                files_per_sec=round(entry["files"] / seconds, 2) if seconds else None,
+            )
+        return report
+
+    def clear(self):
+        self.formats = {}
+
+
+def resolve_workers(workers, n_files):
+    """워커 수 결정: None 이면 CPU 코어 수, 파일 수보다 많이 띄우지 않음"""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    return max(1, min(workers, n_files))
+
+
+def iter_documents(file_paths, workers=None, text_cache=None, stats=None):
+    """
+    파일 목록을 파싱하여 (경로, Document 또는 None, 오류 여부)를 완료되는 순서대로 yield 합니다.
+    Document 가 None 이고 오류가 아니면 정상적으로 열었지만 텍스트가 없는 파일입니다.
+    workers > 1 이면 프로세스 풀에서 병렬 파싱하며, 한 파일의 실패가 전체를 중단시키지 않습니다.
+    text_cache(TextCache)가 있으면 추출 텍스트를 재사용하고 파일별 성공한 HWP 추출 방식을 기록합니다.
+    stats(IngestStats)가 있으면 형식별 파싱 시간/오류 수를 누적합니다.
+    """
+    workers = resolve_workers(workers, len(file_paths))
+    cache_dir = text_cache.cache_dir if text_cache else None
+    strategies = text_cache.load_strategies() if text_cache else {}
+    try:
+        for path, doc, stat in _iter_parsed(file_paths, workers, cache_dir, strategies):
+            if stats is not None:
+                stats.record(stat, doc is not None)
+            if text_cache and doc is not None and stat["format"] == "hwp":
+                text_cache.remember(path, doc.metadata.get("parser"))
+            yield path, doc, stat["error"]
+    finally:
+        if text_cache:
+            text_cache.save_strategies()
+        if stats is not None and file_paths:
+            print(f"[LOG] 형식별 파싱 통계: {stats.report()}")
+
+
+def _iter_parsed(file_paths, workers, cache_dir, strategies):
+    if workers <= 1:
+        for path in file_paths:
+            yield (path,) + _load_with_stats(path, cache_dir, strategies.get(path))
+        return
+
+    start = time.time()
+    print(f"[LOG] 병렬 문서 파싱 시작: {len(file_paths)}개 파일, 워커 {workers}개")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(_load_with_stats, path, cache_dir, strategies.get(path)): path
+            for path in file_paths
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                yield (path,) + future.result()
+            except Exception as e:
+                # 워커 프로세스 비정상 종료 등 load_file 밖에서 난 오류
+                print(f"Error loading {path}: {e}")
+                yield path, None, _empty_stat(path, error=True)
+    print(f"[LOG] 병렬 문서 파싱 완료 ({time.time() - start:.2f}초)")
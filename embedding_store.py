@@ -0,0 +1,281 @@
+"""
+배치/캐시 임베딩 계층
+청크 텍스트 해시(SHA-1)를 키로 벡터를 디스크에 저장하여 같은 텍스트는 다시 임베딩하지 않습니다.
+
+저장 구조 (모델별 폴더):
+    meta.json   - 모델 이름, 벡터 차원
+    keys.bin    - 20바이트 SHA-1 키 (행 순서대로 이어붙임)
+    vectors.f32 - float32 벡터 행렬 (memory-map 으로 로드)
+    write.lock  - 여러 프로세스가 같은 캐시에 추가할 때 쓰는 파일 잠금
+"""
+import contextlib
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+KEY_SIZE = 20
+
+
+def text_key(text):
+    return hashlib.sha1(text.encode("utf-8")).digest()
+
+
+def default_cache_dir(persist_directory, model_name):
+    """Chroma 저장 경로 옆 embedding_cache/<모델명> (같은 모델을 쓰는 엔진끼리 공유)"""
+    parent = os.path.dirname(os.path.abspath(persist_directory))
+    slug = re.sub(r"[^0-9A-Za-z._-]+", "_", model_name)
+    return os.path.join(parent, "embedding_cache", slug)
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """프로세스 간 배타 잠금 (Windows: msvcrt, 그 외: fcntl). 다른 프로세스가 풀 때까지 대기"""
+    with open(path, "a+b") as f:
+        if os.name == "nt":
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class EmbeddingStore:
+    """내용 주소 기반(content-addressed) float32 벡터 저장소"""
+
+    def __init__(self, cache_dir, model_name=""):
+        self.cache_dir = cache_dir
+        self.model_name = model_name
+        self.dim = None
+        self._rows = {}
+        self._vectors = None
+        self._pending = {}
+        self._load()
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def _load(self):
+        meta_path = self._path("meta.json")
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("model") != self.model_name:
+            print(f"[LOG] 임베딩 캐시 모델 불일치 ({meta.get('model')}), 캐시를 초기화합니다.")
+            for name in ("meta.json", "keys.bin", "vectors.f32"):
+                if os.path.exists(self._path(name)):
+                    os.remove(self._path(name))
+            return
+        self.dim = meta["dim"]
+        self._map()
+
+    def _map(self):
+        """keys.bin / vectors.f32 를 다시 읽어 행 번호 사전과 memmap 구성"""
+        self._release()
+        keys = b""
+        if os.path.exists(self._path("keys.bin")):
+            with open(self._path("keys.bin"), "rb") as f:
+                keys = f.read()
+        vec_bytes = os.path.getsize(self._path("vectors.f32")) if os.path.exists(self._path("vectors.f32")) else 0
+        # 쓰기 도중 중단된 경우를 대비해 키와 벡터가 모두 있는 행까지만 사용
+        n = min(len(keys) // KEY_SIZE, vec_bytes // (4 * self.dim))
+        self._rows = {keys[i * KEY_SIZE:(i + 1) * KEY_SIZE]: i for i in range(n)}
+        if n:
+            self._vectors = np.memmap(self._path("vectors.f32"), dtype=np.float32, mode="r", shape=(n, self.dim))
+
+    def _release(self):
+        mm = getattr(self._vectors, "_mmap", None)
+        self._vectors = None
+        if mm is not None:
+            mm.close()
+
+    def __len__(self):
+        return len(self._rows) + len(self._pending)
+
+    def __contains__(self, key):
+        return key in self._rows or key in self._pending
+
+    def get(self, key):
+        if key in self._pending:
+            return self._pending[key]
+        return self._vectors[self._rows[key]]
+
+    def put(self, key, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        if self.dim is None:
+            self.dim = int(vector.shape[0])
+        self._pending[key] = vector
+
+    def flush(self):
+        """
+        대기 중인 벡터를 파일 끝에 추가
+        다른 프로세스(서버 + 인덱싱 스크립트 등)와 행이 어긋나지 않도록 파일 잠금 안에서
+        현재 행 수를 다시 확인하고, 이미 다른 프로세스가 기록한 키는 건너뜀
+        """
+        if not self._pending:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._release()
+        with file_lock(self._path("write.lock")):
+            if not os.path.exists(self._path("meta.json")):
+                with open(self._path("meta.json"), "w", encoding="utf-8") as f:
+                    json.dump({"model": self.model_name, "dim": self.dim}, f, ensure_ascii=False)
+
+            written = self._truncate_to_complete_rows()
+            keys = [key for key in self._pending if key not in written]
+            if keys:
+                matrix = np.stack([self._pending[key] for key in keys]).astype(np.float32)
+                # 벡터를 먼저 쓰고 키를 나중에 써서 키가 있는 행은 항상 벡터가 존재하도록 함
+                with open(self._path("vectors.f32"), "ab") as f:
+                    matrix.tofile(f)
+                with open(self._path("keys.bin"), "ab") as f:
+                    f.write(b"".join(keys))
+        self._pending = {}
+        self._map()
+
+    def _truncate_to_complete_rows(self):
+        """
+        (잠금 안에서 호출) 쓰기 도중 중단되어 남은 불완전한 행을 잘라 키/벡터 행 수를 맞추고 기록된 키 집합 반환
+        남겨 두면 이후 추가되는 행이 모두 한 칸씩 어긋남
+        """
+        keys = b""
+        if os.path.exists(self._path("keys.bin")):
+            with open(self._path("keys.bin"), "rb") as f:
+                keys = f.read()
+        vec_bytes = os.path.getsize(self._path("vectors.f32")) if os.path.exists(self._path("vectors.f32")) else 0
+        n = min(len(keys) // KEY_SIZE, vec_bytes // (4 * self.dim))
+        if len(keys) != n * KEY_SIZE:
+            with open(self._path("keys.bin"), "r+b") as f:
+                f.truncate(n * KEY_SIZE)
+        if vec_bytes != n * 4 * self.dim:
+            with open(self._path("vectors.f32"), "r+b") as f:
+                f.truncate(n * 4 * self.dim)
+        return {keys[i * KEY_SIZE:(i + 1) * KEY_SIZE] for i in range(n)}
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    HuggingFaceEmbeddings 등을 감싸는 임베딩 래퍼
+    - 캐시에 없는 텍스트만 임베딩
+    - 토큰 길이순으로 정렬 후 배치를 구성하여 패딩 낭비 감소
+    """
+
+    def __init__(self, base, cache_dir, model_name="", batch_size=32, max_batch_tokens=4096,
+                 query_cache=None):
+        # base: Embeddings 객체 또는 처음 임베딩할 때 호출할 생성 함수 (모델 지연 로딩)
+        if isinstance(base, Embeddings):
+            self._base, self._base_factory = base, None
+        else:
+            self._base, self._base_factory = None, base
+        self._base_lock = threading.Lock()
+        self.batch_size = batch_size
+        # 배치 하나의 (최대 토큰 길이 x 배치 크기) 상한
+        self.max_batch_tokens = max_batch_tokens
+        self.store = EmbeddingStore(cache_dir, model_name)
+        self._lock = threading.Lock()
+        # 질의 임베딩 LRU/TTL 캐시 (query_cache.TTLCache), 반복 질의는 모델 호출 생략
+        self.query_cache = query_cache
+
+    @property
+    def base(self):
+        if self._base is None:
+            with self._base_lock:
+                if self._base is None:
+                    self._base = self._base_factory()
+        return self._base
+
+    def _token_lengths(self, texts):
+        """토크나이저가 있으면 토큰 수, 없으면 글자 수 (모델 최대 길이로 잘림)"""
+        client = getattr(self.base, "_client", None)
+        tokenizer = getattr(client, "tokenizer", None)
+        max_len = getattr(client, "max_seq_length", None)
+        if tokenizer is None:
+            lengths = [len(text) for text in texts]
+            if max_len:
+                lengths = [min(length, max_len) for length in lengths]
+            return lengths
+        encoded = tokenizer(texts, add_special_tokens=True, truncation=bool(max_len), max_length=max_len)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def _batches(self, texts):
+        """길이순 정렬 후 배치 크기/토큰 예산 안에서 묶음"""
+        lengths = self._token_lengths(texts)
+        order = sorted(range(len(texts)), key=lambda i: lengths[i])
+        batch = []
+        for i in order:
+            # 정렬되어 있으므로 현재 텍스트가 배치 내 최대 길이
+            if batch and (len(batch) >= self.batch_size
+                          or (len(batch) + 1) * lengths[i] > self.max_batch_tokens):
+                yield batch
+                batch = []
+            batch.append(i)
+        if batch:
+            yield batch
+
+    def embed_documents(self, texts):
+        keys = [text_key(text) for text in texts]
+        with self._lock:
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in self.store and key not in missing:
+                    missing[key] = text
+
+            if missing:
+                miss_keys = list(missing)
+                miss_texts = [missing[key] for key in miss_keys]
+                for batch in self._batches(miss_texts):
+                    vectors = self.base.embed_documents([miss_texts[i] for i in batch])
+                    for i, vector in zip(batch, vectors):
+                        self.store.put(miss_keys[i], vector)
+                self.store.flush()
+            print(f"[LOG] 임베딩: {len(texts)}개 중 {len(texts) - len(missing)}개 캐시 사용, {len(missing)}개 새로 계산")
+
+            return [self.store.get(key).tolist() for key in keys]
+
+    def embed_queries(self, texts):
+        """
+        여러 질의를 한 번의 모델 호출로 임베딩 (HTTP 배치 요청용)
+        결과는 질의 캐시에 채워 두어 이후 검색 단계의 embed_query 가 바로 적중하도록 합니다.
+        """
+        if self.query_cache is None:
+            return [self.base.embed_query(text) for text in texts]
+        vectors = {text: self.query_cache.get(text) for text in texts}
+        missing = [text for text, vector in vectors.items() if vector is None]
+        if missing:
+            for text, vector in zip(missing, self.base.embed_documents(missing)):
+                self.query_cache.put(text, vector)
+                vectors[text] = vector
+        return [list(vectors[text]) for text in texts]
+
+    def embed_query(self, text):
+        if self.query_cache is None:
+            return self.base.embed_query(text)
+        vector = self.query_cache.get(text)
+        if vector is None:
+            vector = self.base.embed_query(text)
+            self.query_cache.put(text, vector)
+        return list(vector)
@@ -0,0 +1,575 @@
+"""
+RagEngine / HybridRagEngine 공용 기반 클래스
+문서 파싱 -> 조문 단위 분할 -> 벡터/int8/조문 색인 갱신(전체·증분)과
+질의 경로(검색 캐시 -> 조문 조회 -> 후보 검색 -> 재순위화, 답변 캐시 -> 컨텍스트 압축 -> LLM -> 지표)를 한 곳에 둡니다.
+
+엔진은 프롬프트(prompt_template)와 LLM(_create_llm)만 정하고, 검색 방식이 다르면 아래 훅을 재정의합니다.
+    _search_candidates(query, k, filters) - 조문 색인에 없는 질의의 후보 검색 (기본: 벡터 검색)
+    _index_chunks / _remove_chunks / _clear_indexes / _save_indexes / _load_indexes
+        - 보조 색인 추가/삭제/초기화/저장/로드 (HybridRagEngine 은 BM25 색인을 연결)
+"""
+import os
+import time
+
+from langchain_core.prompts import PromptTemplate
+
+from answer_cache import SemanticAnswerCache
+from article_index import ArticleIndex, default_article_index_path, fetch_chunks
+from async_api import AsyncQAMixin
+from chunking import RegulationTextSplitter, assign_chunk_ids
+from context_budget import ContextCompressor
+from doc_loader import PARSER_VERSION, IngestStats, collect_source_files, iter_documents
+from embedding_store import CachedEmbeddings, default_cache_dir
+from index_manifest import IndexManifest, default_manifest_path, file_stat
+from metadata_filter import filter_key, matches, to_chroma_where
+from metrics import Metrics, debug, debug_enabled
+from query_cache import TTLCache
+from reranker import CrossEncoderReranker
+from retrievers import EngineRetriever
+from startup import StartupTimer
+from text_cache import TextCache, default_text_cache_dir
+from vector_index import QuantizedIndex, default_quantized_dir, hnsw_params, rescore, tune_collection
+
+# 무거운 모듈(langchain_huggingface, langchain_ollama, langchain_chroma)은
+# 처음 필요할 때 import 하여 앱/스크립트 시작 시간을 줄입니다.
+
+EMBEDDING_MODEL = "jhgan/ko-sroberta-multitask"
+
+NOT_INDEXED_MESSAGE = "문서가 인덱싱되지 않았습니다. 먼저 문서를 로드해주세요."
+
+
+class BaseRagEngine(AsyncQAMixin):
+    # 하위 엔진에서 지정 ({context}, {question} 을 받는 프롬프트)
+    prompt_template = None
+
+    def __init__(self, persist_directory="./chroma_db", parse_workers=1, cache_size=256, cache_ttl=3600,
+                 answer_threshold=0.95, max_concurrent_llm=2, search_workers=4,
+                 rerank=False, rerank_candidates=30, rerank_top_n=3, rerank_budget=1.0, context_tokens=1500,
+                 hnsw_m=None, hnsw_ef_construction=None, hnsw_ef_search=None,
+                 quantize=False, rescore_candidates=100):
+        self.persist_directory = persist_directory
+        # 문서 파싱 프로세스 수 (1: 순차 처리, None: CPU 코어 수)
+        # Windows(spawn)에서 병렬 파싱 시 호출 스크립트에 if __name__ == "__main__" 가드 필요
+        self.parse_workers = parse_workers
+        # 단계별 초기화 시간 기록 (engine.startup.report())
+        self.startup = StartupTimer()
+        # 청크 텍스트 해시 기반 디스크 캐시 + 토큰 길이순 배치 (같은 텍스트는 재임베딩하지 않음)
+        # 모델 가중치는 처음 임베딩할 때 로드
+        self.embedding_model = CachedEmbeddings(
+            lambda: self.startup.lazy(self, "_embedding_base", "embedding_model", self._create_embeddings),
+            cache_dir=default_cache_dir(persist_directory, EMBEDDING_MODEL),
+            model_name=EMBEDDING_MODEL,
+            batch_size=32,
+            # 반복 질의는 임베딩 모델 호출 생략
+            query_cache=TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        )
+        self._embedding_base = None
+        # LLM 클라이언트는 처음 답변을 생성할 때 생성 (검색만 하는 요청은 비용 없음)
+        self._llm = None
+        self.vectorstore = None
+        # top-k 검색 결과 캐시 (인덱스가 바뀌면 _on_index_changed()에서 비움)
+        self.retrieval_cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        # 최종 답변 캐시: 질의 임베딩 코사인 유사도 >= answer_threshold 이고 같은 청크가 검색되면 LLM 생략
+        self.answer_cache = SemanticAnswerCache(threshold=answer_threshold, maxsize=cache_size, ttl=cache_ttl)
+        # 증분 인덱싱용 파일 매니페스트 (chroma_db 옆 chroma_db_manifest.json)
+        self.manifest = IndexManifest(default_manifest_path(persist_directory))
+        # 조/장 번호 -> 청크 ID 직접 조회 색인 (chroma_db_articles.json)
+        self.article_index = ArticleIndex(default_article_index_path(persist_directory))
+        # 추출 텍스트 캐시 (내용이 같은 파일은 재인덱싱 때 HWP/DOCX 파싱 생략)
+        self.text_cache = TextCache(default_text_cache_dir(persist_directory), PARSER_VERSION)
+        # 형식별 파싱 처리량/오류 수 (engine.ingest_stats.report())
+        self.ingest_stats = IngestStats()
+        # 선택: cross-encoder 재순위화 (후보 rerank_candidates 개 -> 상위 rerank_top_n 개만 LLM 에 전달)
+        self.rerank_candidates = rerank_candidates
+        self.rerank_top_n = rerank_top_n
+        self.reranker = CrossEncoderReranker(
+            budget=rerank_budget, cache_size=cache_size * 16, cache_ttl=cache_ttl, startup=self.startup
+        ) if rerank else None
+        # LLM 컨텍스트 토큰 예산: 질의 관련 문장만 남기고 겹친 문장 제거 (None 이면 청크 전체 사용)
+        self.context_compressor = ContextCompressor(max_tokens=context_tokens)
+        # 질의 단계별 지연 시간/카운터 (metrics.prometheus() 또는 metrics.snapshot())
+        self.metrics = Metrics()
+        # HNSW 파라미터 (None 이면 코퍼스 크기별 기본값, M/ef_construction 은 컬렉션을 처음 채울 때 적용)
+        self.hnsw = {"m": hnsw_m, "ef_construction": hnsw_ef_construction, "ef_search": hnsw_ef_search}
+        # 선택(실험적): int8 양자화 보조 색인 (필터 없는 벡터 검색을 int8 선형 탐색 + 상위 rescore_candidates 개 정확 재계산으로 처리)
+        # Chroma HNSW 색인은 그대로 유지되므로 메모리 절감은 없음
+        self.rescore_candidates = rescore_candidates
+        self.quantized_index = QuantizedIndex(default_quantized_dir(persist_directory)) if quantize else None
+        self._build_pipeline()
+        # 비동기 API: 검색 스레드 풀 크기, 동시 LLM 호출 상한
+        self._init_async(max_concurrent_llm=max_concurrent_llm, search_workers=search_workers)
+
+    # ------------------------------------------------------------------
+    # 모델 / 프롬프트
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _create_embeddings():
+        from langchain_huggingface import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(
+            model_name=EMBEDDING_MODEL,
+            encode_kwargs={"batch_size": 32}
+        )
+
+    def _create_llm(self):
+        raise NotImplementedError
+
+    @property
+    def llm(self):
+        return self.startup.lazy(self, "_llm", "llm", self._create_llm)
+
+    @llm.setter
+    def llm(self, value):
+        self._llm = value
+
+    def _build_pipeline(self):
+        """
+        프롬프트/리트리버를 한 번만 생성하여 재사용
+        답변은 ask / ask_stream / aask 만 생성합니다 (검색 캐시, 필터, 컨텍스트 압축, 답변 캐시, 지표를 모두 거침).
+        retriever 는 외부 LangChain 체인용 검색 어댑터로, _retrieve() 와 같은 경로(캐시/필터/지표)를 사용합니다.
+        """
+        self.prompt = PromptTemplate(
+            template=self.prompt_template, input_variables=["context", "question"]
+        )
+        self.retriever = EngineRetriever(search_fn=self._retrieve, k=5)
+
+    # ------------------------------------------------------------------
+    # 벡터DB
+    # ------------------------------------------------------------------
+    def _open_vectorstore(self, expected_chunks=None):
+        """expected_chunks: 새 컬렉션의 HNSW 기본값을 고를 청크 수 (기존 컬렉션은 저장된 청크 수 사용)"""
+        from langchain_chroma import Chroma
+        with self.startup.measure("vectorstore"):
+            vectorstore = Chroma(
+                persist_directory=self.persist_directory,
+                embedding_function=self.embedding_model,
+                collection_configuration={"hnsw": hnsw_params(expected_chunks or 0, **self.hnsw)}
+            )
+            count = vectorstore._collection.count()
+            tune_collection(vectorstore._collection, hnsw_params(max(count, expected_chunks or 0), **self.hnsw))
+            return vectorstore
+
+    def _create_collection(self, n_chunks):
+        """
+        첫 빌드(create_index 또는 빈 인덱스에 대한 update_index): 추가할 청크 수에 맞는 HNSW 설정으로 컬렉션 생성
+        M / ef_construction 은 생성 후 바꿀 수 없으므로 기본 설정으로 열린 빈 컬렉션이면 지우고 다시 만듭니다.
+        """
+        params = hnsw_params(n_chunks, **self.hnsw)
+        if self.vectorstore is not None:
+            current = (self.vectorstore._collection.configuration or {}).get("hnsw") or {}
+            if all(current.get(name) == params[name] for name in ("max_neighbors", "ef_construction")):
+                return
+            self.vectorstore.delete_collection()
+        self.vectorstore = self._open_vectorstore(expected_chunks=n_chunks)
+
+    def _vector_search(self, query_vector, k, filters=None):
+        """
+        (Document, L2 거리) 목록
+        int8 색인이 있고 필터가 없으면 근사 거리로 후보를 고른 뒤 원본 벡터로 정확히 재계산
+        """
+        if self.quantized_index is not None and len(self.quantized_index) and not filters:
+            with self.metrics.span("quantized_search"):
+                candidates = self.quantized_index.search(query_vector, max(k, self.rescore_candidates))
+            with self.metrics.span("rescore"):
+                return rescore(self.vectorstore, query_vector, candidates, k)
+        return self.vectorstore.similarity_search_by_vector_with_relevance_scores(
+            query_vector, k=k, filter=to_chroma_where(filters))
+
+    # ------------------------------------------------------------------
+    # 문서 로드 / 분할
+    # ------------------------------------------------------------------
+    def load_documents(self, doc_paths, workers=None):
+        """
+        doc_paths: List of file or directory paths
+        workers: 파싱 프로세스 수 (None 이면 생성자 설정값, 1 이면 순차 처리)
+        """
+        return [doc for _, doc in self._iter_loaded(collect_source_files(doc_paths), workers)]
+
+    def _iter_loaded(self, file_paths, workers=None, failed=None):
+        """
+        파싱이 끝나는 순서대로 (경로, Document) yield, 실패/빈 파일은 건너뜀
+        failed(set)가 있으면 파싱 중 오류가 난 파일 경로를 모음
+        """
+        if workers is None:
+            workers = self.parse_workers
+        for file_path, doc, error in iter_documents(file_paths, workers, text_cache=self.text_cache,
+                                                    stats=self.ingest_stats):
+            if error and failed is not None:
+                failed.add(file_path)
+            if doc is not None:
+                print(f"Loaded: {file_path}")
+                yield file_path, doc
+
+    def _split_documents(self, documents):
+        # 제N조 경계에서 분할하고 장/조 번호를 metadata 에 기록 (조문 구조가 없으면 2000자/300자 분할)
+        text_splitter = RegulationTextSplitter(
+            chunk_size=2000,
+            chunk_overlap=300,
+            separators=["\n\n", "\n", ".", " ", ""]
+        )
+        return text_splitter.split_documents(documents)
+
+    # ------------------------------------------------------------------
+    # 색인 갱신 훅 (벡터DB + int8 + 조문 색인, 하위 엔진은 super() 뒤에 자기 색인을 추가)
+    # ------------------------------------------------------------------
+    def _add_chunks(self, texts, ids, batch_size=1000):
+        """벡터DB에 청크 추가 (같은 ID 는 덮어씀)"""
+        if self.vectorstore is None or self.vectorstore._collection.count() == 0:
+            self._create_collection(len(texts))
+        for i in range(0, len(texts), batch_size):
+            batch = texts[i:i + batch_size]
+            self.vectorstore.add_documents(batch, ids=ids[i:i + batch_size])
+            if self.quantized_index is not None:
+                # 방금 임베딩한 벡터는 디스크 캐시에 있으므로 모델을 다시 호출하지 않음
+                vectors = self.embedding_model.embed_documents([doc.page_content for doc in batch])
+                self.quantized_index.add(ids[i:i + batch_size], vectors)
+
+    def _index_chunks(self, chunks, ids):
+        """새 청크를 모든 색인에 추가"""
+        self._add_chunks(chunks, ids)
+        self.article_index.add(chunks)
+
+    def _remove_chunks(self, chunk_ids):
+        """삭제/변경된 파일의 청크를 모든 색인에서 제거"""
+        if self.vectorstore is not None:
+            self.vectorstore.delete(ids=chunk_ids)
+        if self.quantized_index is not None:
+            self.quantized_index.delete(chunk_ids)
+        self.article_index.remove(chunk_ids)
+
+    def _clear_indexes(self):
+        """벡터DB 외 보조 색인 비우기 (전체 재인덱싱 전)"""
+        if self.quantized_index is not None:
+            self.quantized_index.clear()
+        self.article_index.clear()
+
+    def _save_indexes(self):
+        """보조 색인 디스크 반영"""
+        self.article_index.save()
+        if self.quantized_index is not None:
+            self.quantized_index.save()
+
+    def _load_indexes(self):
+        """벡터DB 를 연 뒤 보조 색인 로드"""
+        self._load_quantized_index()
+        if not self.article_index.load() and self.vectorstore._collection.count():
+            self._rebuild_article_index()
+
+    def _rebuild_article_index(self):
+        """없거나 버전이 바뀐 조문 색인을 벡터DB 에 저장된 청크 metadata 로 다시 생성"""
+        with self.startup.measure("article_rebuild"):
+            stored = self.vectorstore.get(include=["metadatas"])
+            self.article_index.add_metadata(stored["metadatas"])
+            self.article_index.save()
+        print(f"[LOG] 조문 색인 재생성: {len(self.article_index)}개 조문 청크")
+
+    def _load_quantized_index(self):
+        """int8 보조 색인 로드, 없거나 청크 수가 다르면 Chroma 저장 벡터로 재생성"""
+        if self.quantized_index is None:
+            return
+        with self.startup.measure("quantized_index"):
+            loaded = self.quantized_index.load()
+            if not loaded or len(self.quantized_index) != self.vectorstore._collection.count():
+                self.quantized_index.build_from_collection(self.vectorstore._collection)
+                print(f"[LOG] int8 벡터 색인 재생성: {len(self.quantized_index)}개 청크")
+
+    def _on_index_changed(self):
+        """인덱스가 바뀌면 이전 검색 결과/답변 캐시 무효화"""
+        self.retrieval_cache.clear()
+        self.answer_cache.clear()
+
+    # ------------------------------------------------------------------
+    # 인덱싱
+    # ------------------------------------------------------------------
+    def create_index(self, documents):
+        """전체 재인덱싱 (기존 컬렉션을 비우고 다시 생성)"""
+        if not documents:
+            print("No documents to index.")
+            return
+
+        chunks = self._split_documents(documents)
+        ids = assign_chunk_ids(chunks)
+
+        # 기존 컬렉션에 덧붙이면 청크가 중복되므로 먼저 삭제 후 청크 수에 맞는 HNSW 설정으로 다시 생성
+        if self.vectorstore is not None or self.load_index():
+            self.vectorstore.delete_collection()
+            self.vectorstore = None
+        self._clear_indexes()
+        self._index_chunks(chunks, ids)
+        self._save_indexes()
+        self._record_manifest(chunks)
+        self._on_index_changed()
+        print(f"[LOG] 전체 인덱싱 완료: {len(chunks)}개 청크")
+
+    def _record_manifest(self, chunks):
+        """
+        전체 인덱싱한 청크를 파일(metadata["path"])별로 매니페스트에 기록
+        다음 update_index()가 그 사이 삭제/변경된 파일의 청크를 지울 수 있도록 함
+        경로가 없는 문서가 있으면 파일과 청크를 대응시킬 수 없으므로 매니페스트를 지워 다음 갱신 때 전체 재인덱싱
+        """
+        by_path = {}
+        for chunk in chunks:
+            path = chunk.metadata.get("path")
+            if not path or not os.path.exists(path):
+                print("[LOG] 파일 경로가 없는 문서 포함 - 다음 update_index() 때 전체 재인덱싱")
+                self.manifest.clear()
+                return
+            by_path.setdefault(path, []).append(chunk.metadata["chunk_id"])
+        self.manifest.entries = {}
+        for path, chunk_ids in by_path.items():
+            self.manifest.record(path, file_stat(path), chunk_ids)
+        self.manifest.save()
+
+    def update_index(self, doc_paths):
+        """
+        매니페스트 기반 증분 인덱싱
+        새 파일/변경 파일만 파싱·임베딩하고, 삭제·변경된 파일의 기존 청크는 제거합니다.
+        """
+        start = time.time()
+        loaded = self.manifest.load()
+        if self.vectorstore is None:
+            self.load_index()
+        if not loaded and self.vectorstore is not None and self.vectorstore._collection.count():
+            # 매니페스트가 없거나(이전 버전으로 만든 chroma_db, 경로 없는 create_index) 청크 규칙이 바뀐 인덱스는
+            # 기존 청크를 파일과 대응시킬 수 없어 증분 갱신 불가 -> 비우고 전체 재인덱싱 (덧붙이면 청크 중복)
+            reason = "이전 버전 인덱스" if self.manifest.outdated else "매니페스트 없는 인덱스"
+            print(f"[LOG] {reason} - 전체 재인덱싱")
+            self.vectorstore.reset_collection()
+        if self.vectorstore is None or self.vectorstore._collection.count() == 0:
+            # 벡터DB가 비어 있으면 매니페스트/보조 색인을 믿을 수 없으므로 전체 재인덱싱
+            self.manifest.entries = {}
+            self._clear_indexes()
+        diff = self.manifest.scan(collect_source_files(doc_paths))
+
+        # 삭제/변경 파일의 기존 청크 제거
+        stale_ids = self.manifest.chunk_ids(diff.changed + diff.removed)
+        if stale_ids:
+            self._remove_chunks(stale_ids)
+        self.manifest.forget(diff.removed)
+
+        # 새/변경 파일만 파싱 및 임베딩
+        all_chunks = []
+        all_ids = []
+        failed = set()
+        for path, doc in self._iter_loaded(diff.to_index, failed=failed):
+            chunks = self._split_documents([doc])
+            ids = assign_chunk_ids(chunks)
+            all_chunks.extend(chunks)
+            all_ids.extend(ids)
+            self.manifest.record(path, diff.stats.pop(path), ids)
+        # 정상적으로 열었지만 텍스트가 없는 파일은 기록하여 다음 갱신 때 다시 파싱하지 않음
+        # 파싱 오류 파일은 기록하지 않음 (일시적 오류/파서 수정 후 다음 갱신 때 다시 시도)
+        for path, stat in diff.stats.items():
+            if path not in failed:
+                self.manifest.record(path, stat, [])
+        if failed:
+            self.manifest.forget(failed)
+            print(f"[LOG] 파싱 오류 {len(failed)}개 파일은 매니페스트에 기록하지 않음 (다음 갱신 때 재시도)")
+
+        if all_chunks:
+            self._index_chunks(all_chunks, all_ids)
+        if diff.has_changes():
+            self._save_indexes()
+            self._on_index_changed()
+        # 색인을 모두 저장한 뒤 기록 (중간에 실패하면 다음 갱신 때 같은 파일을 다시 처리)
+        self.manifest.save()
+
+        summary = diff.summary()
+        summary["chunks"] = len(all_chunks)
+        print(f"[LOG] 증분 인덱싱 완료 ({time.time() - start:.2f}초): "
+              f"신규 {summary['added']}, 변경 {summary['changed']}, 삭제 {summary['removed']}, "
+              f"유지 {summary['unchanged']}, 추가 청크 {summary['chunks']}")
+        return summary
+
+    def load_index(self):
+        """기존 인덱스 로드 (벡터DB 폴더가 없으면 False)"""
+        if os.path.exists(self.persist_directory):
+            self.vectorstore = self._open_vectorstore()
+            self._load_indexes()
+            self._on_index_changed()
+            return True
+        return False
+
+    def cache_stats(self):
+        """캐시별 hit/miss 통계 (모든 항목이 hits/misses/hit_rate/size 를 가짐, 재순위화를 끄면 rerank_score 없음)"""
+        stats = {
+            "query_embedding": self.embedding_model.query_cache.stats(),
+            "retrieval": self.retrieval_cache.stats(),
+            "answer": self.answer_cache.stats(),
+        }
+        if self.reranker:
+            stats["rerank_score"] = self.reranker.stats()
+        return stats
+
+    def context_stats(self):
+        """컨텍스트 압축 누적 통계 (질의 수, 압축 전/후 토큰 수, 절약한 토큰 수)"""
+        return self.context_compressor.stats()
+
+    # ------------------------------------------------------------------
+    # 검색
+    # ------------------------------------------------------------------
+    def _retrieve(self, query, k=5, filters=None):
+        """
+        검색 (top-k 결과는 LRU/TTL 캐시)
+        filters: {"department": "인사팀", "revision_date": {"$gte": 20230101}} 형식의 메타데이터 필터
+        """
+        cache_key = (query, k, filter_key(filters))
+        cached = self.retrieval_cache.get(cache_key)
+        if cached is not None:
+            self.metrics.inc("retrieval_cache_total", result="hit")
+            print(f"[LOG] 검색 결과 캐시 사용 ({len(cached)}개)")
+            return list(cached)
+        self.metrics.inc("retrieval_cache_total", result="miss")
+
+        search_start = time.time()
+        # "15조", "제5장" 처럼 번호를 묻는 질의는 조문 색인에서 바로 조회
+        with self.metrics.span("article_lookup"):
+            docs = self._article_lookup(query, k, filters)
+        if docs:
+            print(f"[LOG] 조문 색인 조회 ({time.time() - search_start:.2f}초)")
+        else:
+            # 재순위화를 쓰면 후보를 넓게 가져온 뒤 cross-encoder 로 상위 rerank_top_n 개만 남김
+            fetch_k = max(k, self.rerank_candidates) if self.reranker else k
+            docs = self._search_candidates(query, fetch_k, filters)
+            print(f"[LOG] 검색 완료 ({time.time() - search_start:.2f}초)")
+            if self.reranker:
+                with self.metrics.span("rerank"):
+                    docs = self.reranker.rerank(query, docs, top_n=min(k, self.rerank_top_n))
+        print(f"[LOG] 검색된 문서 수: {len(docs)}개")
+        if debug_enabled():
+            for i, doc in enumerate(docs, 1):
+                # 검색된 내용 미리보기 (앞 500자)
+                preview = doc.page_content[:500].replace('\n', ' ')
+                debug(f"문서 {i}: {doc.metadata.get('source', 'Unknown')} (길이: {len(doc.page_content)} 글자) {preview}...")
+
+        self.retrieval_cache.put(cache_key, docs)
+        return list(docs)
+
+    def _article_lookup(self, query, k, filters=None):
+        """
+        조문 색인 조회 결과 중 필터를 통과한 상위 k 개
+        여러 규정에 같은 번호가 있으면 질의 벡터와의 거리 순으로 정렬 (색인 등록 순서 아님)
+        """
+        chunk_ids = self.article_index.lookup(query)
+        if len(chunk_ids) > 1:
+            with self.metrics.span("embed"):
+                query_vector = self.embedding_model.embed_query(query)
+            ranked = rescore(self.vectorstore, query_vector, [(chunk_id, 0.0) for chunk_id in chunk_ids],
+                             len(chunk_ids))
+            docs = [doc for doc, _ in ranked]
+        else:
+            docs = fetch_chunks(self.vectorstore, chunk_ids)
+        return [doc for doc in docs if matches(doc.metadata, filters)][:k]
+
+    def _search_candidates(self, query, k, filters=None):
+        """유사도 검색 (관련성 우선), 가장 관련 높은 k개 (필터는 Chroma where 절로 적용)"""
+        with self.metrics.span("embed"):
+            query_vector = self.embedding_model.embed_query(query)
+        with self.metrics.span("vector_search"):
+            return [doc for doc, _ in self._vector_search(query_vector, k, filters)]
+
+    # ------------------------------------------------------------------
+    # 답변 생성 (ask / ask_stream / aask 공용 단계)
+    # ------------------------------------------------------------------
+    def _cached_answer(self, query, query_vector, docs, mode, start):
+        """비슷한 질문이 같은 청크를 검색했으면 저장된 답변 반환 (LLM 생략), 없으면 None"""
+        cached = self.answer_cache.lookup(query_vector, docs)
+        if cached is None:
+            self.metrics.inc("answer_cache_total", result="miss")
+            return None
+        self.metrics.inc("answer_cache_total", result="hit")
+        self.metrics.observe("request_seconds", time.time() - start, mode=mode)
+        print(f"[LOG] 답변 캐시 사용 ({time.time() - start:.2f}초)")
+        return dict(cached, query=query)
+
+    def _build_prompt(self, query, docs):
+        """이미 검색한 문서로 stuff 체인과 같은 프롬프트 구성 -> (프롬프트, 컨텍스트 압축 보고)"""
+        with self.metrics.span("prompt"):
+            context_docs, context_report = self.context_compressor.compress(query, docs)
+            prompt_text = self.prompt.format(
+                context="\n\n".join(doc.page_content for doc in context_docs), question=query
+            )
+        return prompt_text, context_report
+
+    def _finish_answer(self, query, query_vector, docs, answer, context_report, mode, start):
+        """요청 시간 기록 후 답변 캐시에 저장 -> 결과 dict"""
+        self.metrics.observe("request_seconds", time.time() - start, mode=mode)
+        print(f"[LOG] 전체 소요 시간: {time.time() - start:.2f}초")
+        result = {"query": query, "result": answer, "source_documents": docs, "context": context_report}
+        self.answer_cache.store(query_vector, docs, result)
+        return result
+
+    def ask(self, query, filters=None):
+        if not self.vectorstore:
+            # Try to load if not loaded
+            if not self.load_index():
+                return {"query": query, "result": NOT_INDEXED_MESSAGE, "source_documents": []}
+
+        print(f"[LOG] 질의: {query}")
+        start = time.time()
+        self.metrics.inc("queries_total", mode="ask")
+
+        docs = self._retrieve(query, k=5, filters=filters)
+        query_vector = self.embedding_model.embed_query(query)
+        cached = self._cached_answer(query, query_vector, docs, "ask", start)
+        if cached is not None:
+            return cached
+
+        prompt_text, context_report = self._build_prompt(query, docs)
+        print(f"[LOG] LLM 응답 생성 시작...")
+        llm_start = time.time()
+        message = self.llm.invoke(prompt_text)
+        self.metrics.record_llm(message, time.time() - llm_start)
+        print(f"[LOG] LLM 응답 완료 ({time.time() - llm_start:.2f}초)")
+        debug(f"LLM 답변:\n{message.content}")
+        return self._finish_answer(query, query_vector, docs, message.content, context_report, "ask", start)
+
+    def ask_stream(self, query, filters=None):
+        """
+        스트리밍 질의응답: 검색된 출처를 먼저 yield 한 뒤 LLM 토큰을 생성되는 대로 yield 합니다.
+            {"type": "sources", "source_documents": [...]}
+            {"type": "token", "content": "..."}
+            {"type": "done", "query": ..., "result": "전체 답변", "source_documents": [...]}
+        """
+        if not self.vectorstore:
+            if not self.load_index():
+                yield {"type": "sources", "source_documents": []}
+                yield {"type": "token", "content": NOT_INDEXED_MESSAGE}
+                yield {"type": "done", "query": query, "result": NOT_INDEXED_MESSAGE, "source_documents": []}
+                return
+
+        print(f"[LOG] 질의(스트리밍): {query}")
+        start = time.time()
+        self.metrics.inc("queries_total", mode="stream")
+
+        docs = self._retrieve(query, k=5, filters=filters)
+        yield {"type": "sources", "source_documents": docs}
+
+        query_vector = self.embedding_model.embed_query(query)
+        cached = self._cached_answer(query, query_vector, docs, "stream", start)
+        if cached is not None:
+            yield {"type": "token", "content": cached["result"]}
+            yield dict(cached, type="done")
+            return
+
+        prompt_text, context_report = self._build_prompt(query, docs)
+        print(f"[LOG] LLM 스트리밍 시작...")
+        llm_start = time.time()
+        first_token = None
+        last_chunk = None
+        parts = []
+        for chunk in self.llm.stream(prompt_text):
+            # 마지막 청크(내용 없음)에 Ollama 처리 시간 정보가 담김
+            last_chunk = chunk
+            if not chunk.content:
+                continue
+            if first_token is None:
+                first_token = time.time()
+                print(f"[LOG] 첫 토큰 수신 ({first_token - start:.2f}초)")
+            parts.append(chunk.content)
+            yield {"type": "token", "content": chunk.content}
+
+        self.metrics.record_llm(last_chunk, time.time() - llm_start,
+                                first_token - llm_start if first_token is not None else None)
+        print(f"[LOG] LLM 응답 완료 ({time.time() - llm_start:.2f}초)")
+        result = self._finish_answer(query, query_vector, docs, "".join(parts), context_report, "stream", start)
+        yield dict(result, type="done")
@@ -0,0 +1,170 @@
+"""
+검색 품질 평가 (LLM 호출 없음)
+(질문, 정답 문서/조문) 목록으로 벡터 검색(RagEngine 과 같은 Chroma similarity_search)과
+하이브리드 검색(HybridRagEngine._hybrid_search)의 recall@k, MRR, 지연 시간을 나란히 보고합니다.
+k, chunk_size, 결합 가중치를 바꿔 가며 더 작은 k/청크로도 정답을 찾는지 확인하는 용도입니다.
+
+평가 파일 (JSONL, 한 줄에 질문 하나):
+    {"question": "연차 휴가는 며칠이야?", "source": "취업규칙.hwp", "article": "15"}
+    {"question": "육아휴직 신청 기한", "expected": [{"source": "인사규정.hwp", "article": "30"},
+                                                   {"source": "복무규정.hwp", "article": "12의2"}]}
+    정답 필드: source(파일명 또는 경로 끝부분), article, chapter, chunk_id - 지정한 필드가 모두 같으면 정답
+
+사용 예:
+    python evaluate.py eval.jsonl --k 1,3,5,10
+    python evaluate.py eval.jsonl --persist-dir ./chroma_db_chunk1000 --fusion weighted --bm25-weight 0.5
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+from benchmark import summarize
+
+METHODS = ("vector", "bm25", "hybrid")
+MATCH_FIELDS = ("source", "article", "chapter", "chunk_id")
+
+
+def load_eval_set(path):
+    """평가 파일 로드 -> [(질문, [정답 조건 dict, ...]), ...]"""
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            expected = row.get("expected") or [{field: row[field] for field in MATCH_FIELDS if field in row}]
+            expected = [{field: str(value) for field, value in e.items() if field in MATCH_FIELDS} for e in expected]
+            if not row.get("question") or not all(expected):
+                raise ValueError(f"{path}:{line_no} question 과 정답 필드({', '.join(MATCH_FIELDS)})가 필요합니다.")
+            items.append((row["question"], expected))
+    return items
+
+
+def is_match(metadata, expected):
+    for field, value in expected.items():
+        actual = str(metadata.get(field, ""))
+        if field == "source":
+            # 파일명만 적어도 되도록 경로 끝부분 비교
+            actual = actual.replace("\\", "/")
+            if actual != value and not actual.endswith("/" + value.replace("\\", "/")):
+                return False
+        elif actual != value:
+            return False
+    return True
+
+
+def score_ranking(docs, expected, ks):
+    """검색 결과 하나의 recall@k 목록과 reciprocal rank"""
+    first_rank = {}
+    for rank, doc in enumerate(docs, 1):
+        for i, e in enumerate(expected):
+            if i not in first_rank and is_match(doc.metadata, e):
+                first_rank[i] = rank
+    recalls = {k: sum(1 for rank in first_rank.values() if rank <= k) / len(expected) for k in ks}
+    reciprocal = 1.0 / min(first_rank.values()) if first_rank else 0.0
+    return recalls, reciprocal
+
+
+def search(engine, method, query, k):
+    if method == "vector":
+        return engine.vectorstore.similarity_search(query, k=k)
+    if method == "bm25":
+        return [doc for doc, _ in engine.bm25_index.search(query, k=k)]
+    return engine._hybrid_search(query, k=k)
+
+
+def evaluate(engine, items, ks, methods=METHODS):
+    """방법별 {"recall@k": ..., "mrr": ..., "latency": {...}, "misses": [...]}"""
+    max_k = max(ks)
+    results = {}
+    for method in methods:
+        recall_sums = {k: 0.0 for k in ks}
+        rr_sum = 0.0
+        latencies = []
+        misses = []
+        for question, expected in items:
+            # 질의 임베딩 캐시를 비워 방법마다 같은 조건으로 지연 시간 측정
+            engine.embedding_model.query_cache.clear()
+            start = time.perf_counter()
+            docs = search(engine, method, question, max_k)
+            latencies.append(time.perf_counter() - start)
+            recalls, reciprocal = score_ranking(docs, expected, ks)
+            for k in ks:
+                recall_sums[k] += recalls[k]
+            rr_sum += reciprocal
+            if not reciprocal:
+                misses.append(question)
+        n = len(items)
+        results[method] = {
+            **{f"recall@{k}": round(recall_sums[k] / n, 4) for k in ks},
+            "mrr": round(rr_sum / n, 4),
+            "latency": summarize(latencies),
+            "misses": misses,
+        }
+    return results
+
+
+def print_report(results, ks):
+    header = f"{'방법':<8}" + "".join(f"{'R@' + str(k):>8}" for k in ks) + f"{'MRR':>8}{'p50(ms)':>10}{'p95(ms)':>10}"
+    print("\n" + header)
+    for method, r in results.items():
+        print(f"{method:<8}" + "".join(f"{r[f'recall@{k}']:>8.3f}" for k in ks)
+              + f"{r['mrr']:>8.3f}{r['latency']['p50_ms']:>10.2f}{r['latency']['p95_ms']:>10.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="검색 품질 평가 (recall@k / MRR / 지연 시간)")
+    parser.add_argument("eval_file", help="평가 JSONL 파일")
+    parser.add_argument("--persist-dir", default="./chroma_db")
+    parser.add_argument("--k", default="1,3,5,10", help="recall@k 를 계산할 k 목록")
+    parser.add_argument("--methods", default=",".join(METHODS), help=f"평가할 방법 ({', '.join(METHODS)})")
+    parser.add_argument("--fusion", choices=["rrf", "weighted"], default="rrf")
+    parser.add_argument("--bm25-weight", type=float, default=0.6)
+    parser.add_argument("--vector-weight", type=float, default=0.4)
+    parser.add_argument("--fusion-depth", type=int, default=20)
+    parser.add_argument("--output", help="결과 JSON 경로")
+    args = parser.parse_args(argv)
+
+    ks = sorted({int(k) for k in args.k.split(",")})
+    methods = [m for m in args.methods.split(",") if m]
+    unknown = set(methods) - set(METHODS)
+    if unknown:
+        parser.error(f"지원하지 않는 방법: {', '.join(sorted(unknown))}")
+    items = load_eval_set(args.eval_file)
+
+    from hybrid_rag_engine import HybridRagEngine
+    engine = HybridRagEngine(
+        persist_directory=args.persist_dir, fusion=args.fusion, bm25_weight=args.bm25_weight,
+        vector_weight=args.vector_weight, fusion_depth=args.fusion_depth,
+    )
+    if not os.path.exists(args.persist_dir) or not engine.load_index():
+        print(f"인덱스가 없습니다: {args.persist_dir}")
+        return 1
+    if not len(engine.bm25_index) and {"bm25", "hybrid"} & set(methods):
+        print("[LOG] BM25 색인이 비어 있어 bm25/hybrid 결과는 벡터 검색과 같거나 비어 있습니다.")
+
+    # 검색 단계 [LOG] 출력은 지연 시간 측정에서 제외
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = evaluate(engine, items, ks, methods)
+    print_report(results, ks)
+    if args.output:
+        report = {
+            "eval_file": args.eval_file,
+            "persist_directory": args.persist_dir,
+            "questions": len(items),
+            "config": {"fusion": args.fusion, "bm25_weight": args.bm25_weight,
+                       "vector_weight": args.vector_weight, "fusion_depth": args.fusion_depth},
+            "results": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n결과 저장: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+하이브리드 검색 결과 결합 (BM25 + Vector)
+각 검색기의 (Document, 점수) 목록을 chunk_id 기준으로 합쳐 하나의 순위로 만듭니다.
+
+- weighted: 검색기별 점수를 min-max 정규화한 뒤 가중합
+- rrf: Reciprocal Rank Fusion, 점수 대신 순위만 사용 (sum weight / (rrf_k + rank))
+"""
+
+FUSION_METHODS = ("rrf", "weighted")
+
+
+def doc_key(doc):
+    """중복 제거 키 (chunk_id, 없으면 Chroma ID 또는 본문)"""
+    return doc.metadata.get("chunk_id") or getattr(doc, "id", None) or doc.page_content
+
+
+def normalize_scores(scores):
+    """min-max 정규화 (모든 점수가 같으면 1.0)"""
+    if not scores:
+        return []
+    low, high = min(scores), max(scores)
+    if high == low:
+        return [1.0] * len(scores)
+    return [(score - low) / (high - low) for score in scores]
+
+
+def weighted_fusion(result_lists, weights):
+    """정규화 점수 가중합. 한쪽 결과에만 있는 청크는 다른 쪽 점수 0"""
+    fused = {}
+    docs = {}
+    for results, weight in zip(result_lists, weights):
+        normalized = normalize_scores([score for _, score in results])
+        seen = set()
+        for (doc, _), score in zip(results, normalized):
+            key = doc_key(doc)
+            if key in seen:
+                continue
+            seen.add(key)
+            docs.setdefault(key, doc)
+            fused[key] = fused.get(key, 0.0) + weight * score
+    return _ranked(fused, docs)
+
+
+def rrf_fusion(result_lists, weights, rrf_k=60):
+    """Reciprocal Rank Fusion (점수 분포가 다른 검색기도 그대로 결합 가능)"""
+    fused = {}
+    docs = {}
+    for results, weight in zip(result_lists, weights):
+        seen = set()
+        rank = 0
+        for doc, _ in results:
+            key = doc_key(doc)
+            if key in seen:
+                continue
+            seen.add(key)
+            rank += 1
+            docs.setdefault(key, doc)
+            fused[key] = fused.get(key, 0.0) + weight / (rrf_k + rank)
+    return _ranked(fused, docs)
+
+
+def _ranked(fused, docs):
+    order = sorted(fused, key=fused.get, reverse=True)
+    return [(docs[key], fused[key]) for key in order]
+
+
+def fuse(result_lists, weights, method="rrf", rrf_k=60):
+    """[(Document, 점수)] 목록들을 결합하여 점수 내림차순 [(Document, 결합 점수)] 반환"""
+    if method == "rrf":
+        return rrf_fusion(result_lists, weights, rrf_k=rrf_k)
+    if method == "weighted":
+        return weighted_fusion(result_lists, weights)
+    raise ValueError(f"지원하지 않는 결합 방식: {method} (사용 가능: {', '.join(FUSION_METHODS)})")
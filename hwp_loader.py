@@ -2,9 +2,13 @@
 HWP 파일에서 텍스트를 추출하는 모듈
 HWP 5.0 (OLE2) 및 HWPX (XML/ZIP) 지원
 """
+import codecs
+import re
 import zipfile
 import xml.etree.ElementTree as ET
 
+import numpy as np
+
 def get_hwp_text(filename):
     """
     HWP 파일에서 텍스트를 추출합니다.
@@ -12,44 +16,131 @@ def get_hwp_text(filename):
     2차: HWP 5.0 (OLE2) 시도
     3차: pyhwp 시도
     """
-    # 1차: HWPX 형식 시도
-    try:
-        text = get_hwpx_text(filename)
-        if text:
-            print(f"✓ HWPX로 추출 성공: {len(text)} 글자")
-            return text
-    except Exception as e:
-        print(f"HWPX 실패: {e}")
-
-    # 2차: HWP 5.0 (OLE2) 시도
-    try:
-        text = get_hwp5_text(filename)
-        if text:
-            print(f"✓ HWP5로 추출 성공: {len(text)} 글자")
-            return text
-    except Exception as e:
-        print(f"HWP5 실패: {e}")
-
-    # 3차: pyhwp 시도
-    try:
-        text = get_hwp_pyhwp(filename)
-        if text:
-            print(f"✓ pyhwp로 추출 성공: {len(text)} 글자")
-            return text
-    except Exception as e:
-        print(f"pyhwp 실패: {e}")
+    return extract_hwp_text(filename)[0]
+
+
+def extract_hwp_text(filename, prefer=None):
+    """
+    (텍스트, 성공한 방식 이름) 반환, 모두 실패하면 ("", None)
+    prefer: 이전에 이 파일에서 성공한 방식 ("hwpx", "hwp5", "pyhwp") - 먼저 시도
+    """
+    strategies = sorted(HWP_STRATEGIES, key=lambda item: item[0] != prefer)
+    for name, extract in strategies:
+        try:
+            text = extract(filename)
+            if text:
+                print(f"✓ {HWP_STRATEGY_LABELS[name]}로 추출 성공: {len(text)} 글자")
+                return text, name
+        except Exception as e:
+            print(f"{HWP_STRATEGY_LABELS[name]} 실패: {e}")
 
     print(f"✗ 모든 방법 실패: {filename}")
-    return ""
+    return "", None
 
 
-def get_hwpx_text(filename):
+def _local_name(tag):
+    """'{namespace}p' -> 'p'"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _section_number(name):
+    """section10.xml 이 section2.xml 뒤에 오도록 숫자 기준 정렬 키"""
+    digits = re.findall(r'\d+', name.rsplit('/', 1)[-1])
+    return (int(digits[-1]) if digits else 0, name)
+
+
+def _t_text(elem):
+    """<hp:t> 안의 텍스트 (탭/줄바꿈 등 자식 요소 뒤 tail 포함)"""
+    parts = [elem.text or '']
+    for child in elem:
+        name = _local_name(child.tag)
+        if name == 'tab':
+            parts.append('\t')
+        elif name == 'lineBreak':
+            parts.append('\n')
+        parts.append(child.tail or '')
+    return ''.join(parts)
+
+
+def _release(elem, parents):
+    """처리가 끝난 표 행/셀 요소를 비우고 부모에서 떼어냄 (큰 표도 </tbl> 까지 서브트리를 쌓지 않음)"""
+    elem.clear()
+    if parents:
+        parents[-1].remove(elem)
+
+
+def _iter_section_paragraphs(stream):
     """
-    HWPX (HWP 2014+) 파일에서 텍스트 추출
-    ZIP 파일 내부의 XML 파싱
+    section XML 하나를 iterparse 로 읽으며 문단 텍스트를 yield
+    표(tbl)는 행 단위로 셀을 ' | ' 로 이어 한 줄로 만들고, 처리한 요소는 바로 비워 메모리를 일정하게 유지합니다.
+    문단 안에 표가 있으면 표 앞 글, 표 행, 표 뒤 글을 각각 별도 줄로 문서 순서대로 내보냅니다.
+    """
+    root = None
+    parents = []     # 열린 요소 스택 (처리한 표 행/셀을 부모에서 떼어내기 위해)
+    paragraphs = []  # 중첩 문단(표 셀 안 문단) 버퍼 스택
+    tables = []      # 표 스택: 현재 행의 셀 목록과 현재 셀의 문단 목록
+    for event, elem in ET.iterparse(stream, events=('start', 'end')):
+        name = _local_name(elem.tag)
+        if event == 'start':
+            parents.append(elem)
+            if root is None:
+                root = elem
+            elif name == 'p':
+                paragraphs.append([])
+            elif name == 'tbl':
+                if paragraphs:
+                    # 표를 포함한 문단의 표 앞 글을 먼저 내보냄 (표 뒤 글은 문단 끝에서 별도 줄로)
+                    text = ''.join(paragraphs[-1]).strip()
+                    paragraphs[-1] = []
+                    if text and tables:
+                        tables[-1]['cell'].append(text)
+                    elif text:
+                        yield text
+                tables.append({'row': [], 'cell': []})
+            elif name == 'tr' and tables:
+                tables[-1]['row'] = []
+            elif name == 'tc' and tables:
+                tables[-1]['cell'] = []
+            continue
+
+        parents.pop()
+        if name == 't':
+            if paragraphs:
+                paragraphs[-1].append(_t_text(elem))
+        elif name == 'p' and paragraphs:
+            text = ''.join(paragraphs.pop()).strip()
+            if tables:
+                if text:
+                    tables[-1]['cell'].append(text)
+            elif text:
+                yield text
+            if not paragraphs and not tables:
+                # 최상위 문단 처리 완료 -> 지금까지 읽은 요소 해제
+                root.clear()
+        elif name == 'tc' and tables:
+            cell = ' '.join(tables[-1]['cell'])
+            if cell:
+                tables[-1]['row'].append(cell)
+            _release(elem, parents)
+        elif name == 'tr' and tables:
+            row = ' | '.join(tables[-1]['row'])
+            _release(elem, parents)
+            if row:
+                if len(tables) > 1:
+                    # 표 안의 표: 바깥 셀 내용으로 포함
+                    tables[-2]['cell'].append(row)
+                else:
+                    yield row
+        elif name == 'tbl' and tables:
+            tables.pop()
+            elem.clear()
+
+
+def iter_hwpx_paragraphs(filename):
+    """
+    HWPX (HWP 2014+) 파일의 문단/표 행 텍스트를 문서 순서대로 yield
+    섹션 XML 을 통째로 읽지 않고 ZIP 스트림에서 바로 파싱합니다.
     """
-    text_parts = []
-
     with zipfile.ZipFile(filename, 'r') as zf:
         file_list = zf.namelist()
         print(f"ZIP 파일 내용: {file_list[:5]}...")  # 처음 5개만
@@ -62,75 +153,135 @@ def get_hwpx_text(filename):
 
         print(f"섹션 파일: {section_files}")
 
-        for section_file in sorted(section_files):
-            xml_content = zf.read(section_file)
-            root = ET.fromstring(xml_content)
+        for section_file in sorted(section_files, key=_section_number):
+            with zf.open(section_file) as stream:
+                yield from _iter_section_paragraphs(stream)
 
-            # 모든 텍스트 노드 추출
-            for text_elem in root.iter():
-                if text_elem.text and text_elem.text.strip():
-                    text_parts.append(text_elem.text.strip())
-                if text_elem.tail and text_elem.tail.strip():
-                    text_parts.append(text_elem.tail.strip())
 
-    if not text_parts:
+def get_hwpx_text(filename):
+    """
+    HWPX (HWP 2014+) 파일에서 텍스트 추출
+    문단/표 행 경계를 줄바꿈으로 유지 (조/장 단위 청크 분할에 사용)
+    """
+    text = '\n'.join(iter_hwpx_paragraphs(filename))
+    if not text:
         raise Exception("XML에서 텍스트를 찾을 수 없음")
+    return text
 
-    return ' '.join(text_parts)
 
+# HWP 5.0 레코드 태그 (HWPTAG_BEGIN = 0x10)
+HWPTAG_BEGIN = 0x10
+HWPTAG_PARA_TEXT = HWPTAG_BEGIN + 51
 
-def get_hwp5_text(filename):
+# FileHeader 속성 비트
+HWP5_FLAG_COMPRESSED = 0x1
+HWP5_FLAG_PASSWORD = 0x2
+HWP5_FLAG_DISTRIBUTION = 0x4
+
+# 문단 텍스트 안의 제어 문자: 문자 컨트롤은 1 WCHAR, 그 외(인라인/확장 컨트롤)는 8 WCHAR 차지
+HWP5_CHAR_CONTROLS = {0: '', 10: '\n', 13: '', 24: '-', 25: ' ', 26: ' ', 27: ' ', 28: ' ', 29: ' ', 30: ' ', 31: ' '}
+HWP5_INLINE_CONTROL_SIZE = 8
+
+
+def iter_hwp5_records(data):
     """
-    HWP 5.0 (OLE2) 파일에서 텍스트 추출
+    BodyText 레코드를 (태그, 레벨, payload memoryview) 로 순회
+    레코드 헤더(32bit): 태그 10bit, 레벨 10bit, 크기 12bit (0xFFF 이면 다음 4바이트가 크기)
     """
+    view = memoryview(data)
+    pos = 0
+    end = len(view)
+    while pos + 4 <= end:
+        header = int.from_bytes(view[pos:pos + 4], 'little')
+        pos += 4
+        tag = header & 0x3FF
+        level = (header >> 10) & 0x3FF
+        size = header >> 20
+        if size == 0xFFF:
+            if pos + 4 > end:
+                break
+            size = int.from_bytes(view[pos:pos + 4], 'little')
+            pos += 4
+        yield tag, level, view[pos:pos + size]
+        pos += size
+
+
+def hwp5_para_text(payload):
+    """
+    HWPTAG_PARA_TEXT payload (UTF-16LE) -> 문단 텍스트, 컨트롤 문자는 건너뛰거나 공백/줄바꿈으로 변환
+    컨트롤 위치는 디코딩 전에 WCHAR(uint16) 단위로 찾습니다. 인라인/확장 컨트롤의 파라미터에는 임의 값
+    (서로게이트 0xD800~0xDFFF 포함)이 들어 있어, 먼저 디코딩하면 글자 수가 달라져 뒤 텍스트가 잘립니다.
+    """
+    units = np.frombuffer(payload, dtype='<u2', count=len(payload) // 2)
+    controls = np.flatnonzero(units < 32)
+    if not len(controls):
+        return codecs.decode(payload[:len(units) * 2], 'utf-16le', errors='ignore')
+    parts = []
+    pos = 0
+    for index in controls.tolist():
+        if index < pos:
+            # 앞 인라인/확장 컨트롤의 파라미터 영역
+            continue
+        parts.append(codecs.decode(payload[pos * 2:index * 2], 'utf-16le', errors='ignore'))
+        code = int(units[index])
+        if code in HWP5_CHAR_CONTROLS:
+            parts.append(HWP5_CHAR_CONTROLS[code])
+            pos = index + 1
+        else:
+            # 인라인/확장 컨트롤 (표, 그림, 각주 등의 위치 표시) - 탭만 텍스트로 유지
+            if code == 9:
+                parts.append('\t')
+            pos = index + HWP5_INLINE_CONTROL_SIZE
+    if pos < len(units):
+        parts.append(codecs.decode(payload[pos * 2:len(units) * 2], 'utf-16le', errors='ignore'))
+    return ''.join(parts)
+
+
+def iter_hwp5_paragraphs(filename):
+    """HWP 5.0 (OLE2) 파일의 문단 텍스트를 문서 순서대로 yield (표 셀 문단 포함)"""
     import olefile
     import zlib
 
-    f = olefile.OleFileIO(filename)
-    dirs = f.listdir()
-
-    print(f"OLE2 디렉토리: {dirs[:5]}...")
+    with olefile.OleFileIO(filename) as f:
+        dirs = f.listdir()
+        print(f"OLE2 디렉토리: {dirs[:5]}...")
 
-    if ["FileHeader"] not in dirs:
-        f.close()
-        raise Exception("FileHeader가 없음 - HWP 5.0 파일이 아님")
+        if ["FileHeader"] not in dirs:
+            raise Exception("FileHeader가 없음 - HWP 5.0 파일이 아님")
 
-    sections = sorted([d[1] for d in dirs if d[0] == "BodyText"])
-    print(f"BodyText 섹션: {sections}")
+        header = f.openstream("FileHeader").read()
+        flags = int.from_bytes(header[36:40], 'little')
+        if flags & HWP5_FLAG_PASSWORD:
+            raise Exception("암호가 설정된 문서")
+        if flags & HWP5_FLAG_DISTRIBUTION:
+            raise Exception("배포용 문서 (BodyText 암호화)")
 
-    if not sections:
-        f.close()
-        raise Exception("BodyText 섹션이 없음")
+        sections = sorted((d[1] for d in dirs if d[0] == "BodyText"), key=_section_number)
+        print(f"BodyText 섹션: {sections}")
 
-    text_parts = []
-
-    for section in sections:
-        bodytext = f.openstream("BodyText/" + section).read()
+        if not sections:
+            raise Exception("BodyText 섹션이 없음")
 
-        # zlib 압축 해제
-        try:
-            unpacked_data = zlib.decompress(bodytext, -15)
-        except:
-            unpacked_data = bodytext
+        for section in sections:
+            data = f.openstream("BodyText/" + section).read()
+            if flags & HWP5_FLAG_COMPRESSED:
+                data = zlib.decompress(data, -15)
+            for tag, _, payload in iter_hwp5_records(data):
+                if tag == HWPTAG_PARA_TEXT:
+                    text = hwp5_para_text(payload).strip()
+                    if text:
+                        yield text
 
-        # UTF-16LE로 디코딩
-        decoded = unpacked_data.decode('utf-16le', errors='ignore')
 
-        # 출력 가능한 문자만 추출
-        clean_text = ''.join(
-            c for c in decoded
-            if c.isprintable() or c in '\n\r\t '
-        )
-
-        if clean_text.strip():
-            text_parts.append(clean_text.strip())
-
-    f.close()
-
-    if not text_parts:
+def get_hwp5_text(filename):
+    """
+    HWP 5.0 (OLE2) 파일에서 텍스트 추출
+    레코드 헤더를 따라가며 문단 텍스트(HWPTAG_PARA_TEXT)만 읽고 문단마다 줄바꿈
+    """
+    text = '\n'.join(iter_hwp5_paragraphs(filename))
+    if not text:
         raise Exception("텍스트를 추출할 수 없음")
-
-    return '\n'.join(text_parts)
+    return text
 
 
 def get_hwp_pyhwp(filename):
@@ -158,6 +309,15 @@ def get_hwp_pyhwp(filename):
     return '\n'.join(text_parts)
 
 
+# 시도 순서: HWPX (ZIP) -> HWP 5.0 (OLE2) -> pyhwp
+HWP_STRATEGIES = (
+    ("hwpx", get_hwpx_text),
+    ("hwp5", get_hwp5_text),
+    ("pyhwp", get_hwp_pyhwp),
+)
+HWP_STRATEGY_LABELS = {"hwpx": "HWPX", "hwp5": "HWP5", "pyhwp": "pyhwp"}
+
+
 if __name__ == "__main__":
     import sys
     if len(sys.argv) > 1:
@@ -1,216 +1,15 @@
 """
 하이브리드 검색 RAG 엔진 (수동 구현)
-BM25 (키워드 60%) + Vector (의미 40%) 검색 결합
+BM25 (키워드) + Vector (의미) 검색 결과를 RRF 또는 정규화 점수 가중합으로 결합
+인덱싱/답변 생성 경로는 engine_base.BaseRagEngine 과 공유하고, BM25 색인 갱신과 후보 검색만 재정의합니다.
 """
-import os
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_ollama import ChatOllama
-from langchain_classic.chains import RetrievalQA
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
-from hwp_loader import get_hwp_text
 from langchain_core.documents import Document
-from langchain_core.prompts import PromptTemplate
-from langchain_community.retrievers import BM25Retriever
-import time
-
-class HybridRagEngine:
-    def __init__(self, persist_directory="./chroma_db"):
-        self.persist_directory = persist_directory
-        self.embedding_model = HuggingFaceEmbeddings(
-            model_name="jhgan/ko-sroberta-multitask"
-        )
-        self.llm = ChatOllama(
-            model="qwen2.5:3b",
-            temperature=0.7,
-            num_predict=512,
-            top_p=0.9,
-            repeat_penalty=1.1
-        ) 
-        self.vectorstore = None
-        self.bm25_retriever = None
-        self.all_splits = []
-
-    def load_documents(self, doc_paths):
-        """문서 로드"""
-        documents = []
-        if isinstance(doc_paths, str):
-            doc_paths = [doc_paths]
-
-        for path in doc_paths:
-            if os.path.isdir(path):
-                for root, dirs, files in os.walk(path):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        self._load_single_file(file_path, documents)
-            elif os.path.isfile(path):
-                self._load_single_file(path, documents)
-        
-        return documents
-
-    def _load_single_file(self, file_path, documents):
-        """단일 파일 로드"""
-        try:
-            text = ""
-            if file_path.lower().endswith(".docx"):
-                from docx import Document as DocxDocument
-                doc = DocxDocument(file_path)
-                text_parts = []
-                buffer = []
-                for para in doc.paragraphs:
-                    para_text = para.text.strip()
-                    if para_text:
-                        if len(para_text) <= 2:
-                            buffer.append(para_text)
-                        else:
-                            if buffer:
-                                text_parts.append(''.join(buffer))
-                                buffer = []
-                            text_parts.append(para_text)
-                if buffer:
-                    text_parts.append(''.join(buffer))
-                for table in doc.tables:
-                    for row in table.rows:
-                        row_text = []
-                        for cell in row.cells:
-                            cell_text = cell.text.strip()
-                            if cell_text:
-                                row_text.append(cell_text)
-                        if row_text:
-                            text_parts.append(' | '.join(row_text))
-                text = '\n'.join(text_parts)
-            elif file_path.lower().endswith(".txt"):
-                with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-                    text = f.read()
-            elif file_path.lower().endswith(".hwp"):
-                text = get_hwp_text(file_path)
-
-            if text.strip():
-                documents.append(Document(page_content=text, metadata={"source": os.path.basename(file_path)}))
-                print(f"Loaded: {file_path}")
-        except Exception as e:
-            print(f"Error loading {file_path}: {e}")
-
-    def create_index(self, documents):
-        """하이브리드 인덱스 생성"""
-        if not documents:
-            print("No documents to index.")
-            return
+from bm25_index import BM25Index, default_index_dir
+from korean_tokenizer import CachedTokenizer
+from fusion import fuse
+from engine_base import BaseRagEngine
 
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=2000,
-            chunk_overlap=300,
-            separators=["\n\n", "\n", ".", " ", ""]
-        )
-        self.all_splits = text_splitter.split_documents(documents)
-        
-        # 벡터 인덱스
-        self.vectorstore = Chroma.from_documents(
-            documents=self.all_splits,
-            embedding=self.embedding_model,
-            persist_directory=self.persist_directory
-        )
-        
-        # BM25 인덱스
-        self.bm25_retriever = BM25Retriever.from_documents(self.all_splits)
-        self.bm25_retriever.k = 5
-        
-        print(f"✅ Indexed {len(self.all_splits)} chunks (Hybrid: BM25 + Vector)")
-
-    def load_index(self):
-        """기존 인덱스 로드"""
-        if os.path.exists(self.persist_directory):
-            self.vectorstore = Chroma(
-                persist_directory=self.persist_directory,
-                embedding_function=self.embedding_model
-            )
-            return True
-        return False
-
-    def _hybrid_search(self, query, k=5):
-        """하이브리드 검색: BM25 + Vector 결합"""
-        # BM25 검색
-        if self.bm25_retriever and self.all_splits:
-            self.bm25_retriever = BM25Retriever.from_documents(self.all_splits)
-            self.bm25_retriever.k = k
-            bm25_docs = self.bm25_retriever.invoke(query)
-        else:
-            bm25_docs = []
-        
-        # 벡터 검색
-        vector_docs = self.vectorstore.as_retriever(
-            search_kwargs={"k": k}
-        ).invoke(query)
-        
-        # 결과 합치기 (가중치: BM25 60%, Vector 40%)
-        # 중복 제거하면서 순위 조정
-        seen_contents = set()
-        merged_docs = []
-        
-        # BM25 결과 먼저 추가 (높은 가중치)
-        for doc in bm25_docs[:3]:  # 상위 3개
-            content_hash = hash(doc.page_content)
-            if content_hash not in seen_contents:
-                seen_contents.add(content_hash)
-                merged_docs.append(doc)
-        
-        # Vector 결과 추가 (낮은 가중치)
-        for doc in vector_docs[:3]:  # 상위 3개
-            content_hash = hash(doc.page_content)
-            if content_hash not in seen_contents:
-                seen_contents.add(content_hash)
-                merged_docs.append(doc)
-        
-        # 부족하면 나머지 추가
-        for doc in bm25_docs[3:] + vector_docs[3:]:
-            if len(merged_docs) >= k:
-                break
-            content_hash = hash(doc.page_content)
-            if content_hash not in seen_contents:
-                seen_contents.add(content_hash)
-                merged_docs.append(doc)
-        
-        return merged_docs[:k]
-
-    def ask(self, query):
-        """하이브리드 검색으로 질의응답"""
-        if not self.vectorstore:
-            if not self.load_index():
-                return {"result": "문서가 인덱싱되지 않았습니다.", "source_documents": []}
-
-        print(f"[LOG] 질의: {query}")
-        start = time.time()
-
-        # 하이브리드 검색
-        if self.bm25_retriever and self.all_splits:
-            print("[LOG] 하이브리드 검색 (BM25 60% + Vector 40%)")
-            docs = self._hybrid_search(query, k=5)
-        else:
-            print("[LOG] 벡터 검색만 사용 (BM25 인덱스 없음)")
-            docs = self.vectorstore.as_retriever(
-                search_kwargs={"k": 5}
-            ).invoke(query)
-        
-        print(f"[LOG] 검색 완료 ({time.time() - start:.2f}초)")
-        print(f"[LOG] 검색된 문서 수: {len(docs)}개")
-        
-        for i, doc in enumerate(docs, 1):
-            print(f"[LOG] 문서 {i}: {doc.metadata.get('source', 'Unknown')} (길이: {len(doc.page_content)} 글자)")
-
-        # 커스텀 리트리버 래퍼
-        class CustomRetriever:
-            def __init__(self, docs):
-                self.docs = docs
-            
-            def invoke(self, query):
-                return self.docs
-            
-            def get_relevant_documents(self, query):
-                return self.docs
-
-        retriever = CustomRetriever(docs)
-
-        prompt_template = """당신은 한국의료연구원의 사내 규정 전문가입니다.
+PROMPT_TEMPLATE = """당신은 한국의료연구원의 사내 규정 전문가입니다.
 
 [중요] 질문에서 특정 장/조 번호를 요청했는데 문서에 없다면:
 "제공된 문서에 제X장(제X조)에 대한 내용이 없습니다."라고 답변하세요.
@@ -229,24 +28,126 @@ class HybridRagEngine:
 
 답변:"""
 
-        PROMPT = PromptTemplate(
-            template=prompt_template, input_variables=["context", "question"]
+class HybridRagEngine(BaseRagEngine):
+    prompt_template = PROMPT_TEMPLATE
+
+    def __init__(self, persist_directory="./chroma_db", fusion="rrf", bm25_weight=0.6, vector_weight=0.4,
+                 fusion_depth=20, rrf_k=60, bm25_tokenizer="korean", cache_size=256, **kwargs):
+        """kwargs: BaseRagEngine 설정 (parse_workers, cache_ttl, rerank, context_tokens, hnsw_*, quantize 등)"""
+        super().__init__(persist_directory, cache_size=cache_size, **kwargs)
+        # 결과 결합: "rrf"(순위 기반) 또는 "weighted"(정규화 점수 가중합)
+        # fusion_depth: 검색기별로 가져오는 후보 수 (k 보다 깊게 가져와 결합 후 상위 k 개 사용)
+        self.fusion = fusion
+        self.bm25_weight = bm25_weight
+        self.vector_weight = vector_weight
+        self.fusion_depth = fusion_depth
+        self.rrf_k = rrf_k
+        # 디스크 기반 BM25 역색인 (chroma_db 옆 chroma_db_bm25 폴더)
+        # 토크나이저: "korean"(조사 제거 + 음절 bigram) 또는 "whitespace", 색인/질의가 같은 토큰 캐시 공유
+        self.bm25_index = BM25Index(
+            default_index_dir(persist_directory),
+            tokenizer=CachedTokenizer(bm25_tokenizer, cache_size=cache_size * 16)
         )
 
-        qa_chain = RetrievalQA.from_chain_type(
-            llm=self.llm,
-            chain_type="stuff",
-            retriever=retriever,
-            return_source_documents=True,
-            chain_type_kwargs={"prompt": PROMPT}
+    def _create_llm(self):
+        from langchain_ollama import ChatOllama
+        return ChatOllama(
+            model="qwen2.5:3b",
+            temperature=0.7,
+            num_predict=512,
+            top_p=0.9,
+            repeat_penalty=1.1
         )
 
-        print(f"[LOG] LLM 응답 생성 시작...")
-        llm_start = time.time()
-
-        result = qa_chain.invoke({"query": query})
-
-        print(f"[LOG] LLM 응답 완료 ({time.time() - llm_start:.2f}초)")
-        print(f"[LOG] 전체 소요 시간: {time.time() - start:.2f}초")
-
-        return result
+    # ------------------------------------------------------------------
+    # BM25 색인 훅
+    # ------------------------------------------------------------------
+    def _index_chunks(self, chunks, ids):
+        super()._index_chunks(chunks, ids)
+        self.bm25_index.add_documents(chunks)
+
+    def _remove_chunks(self, chunk_ids):
+        super()._remove_chunks(chunk_ids)
+        self.bm25_index.delete(chunk_ids)
+
+    def _clear_indexes(self):
+        super()._clear_indexes()
+        self.bm25_index.close()
+
+    def _save_indexes(self):
+        # BM25 색인 (디스크에 저장, 재시작 후 load_index()에서 복원)
+        super()._save_indexes()
+        self.bm25_index.save()
+
+    def _load_indexes(self):
+        """
+        BM25 색인 로드. 없거나(RagEngine 으로 만든 인덱스), 버전/토크나이저가 다르거나,
+        벡터DB 와 청크 ID 가 다르면(RagEngine 으로 갱신한 인덱스) 벡터DB 청크로 재생성
+        """
+        super()._load_indexes()
+        with self.startup.measure("bm25_index"):
+            loaded = self.bm25_index.load()
+            stored_ids = set(self.vectorstore.get(include=[])["ids"])
+        if loaded and self.bm25_index.chunk_ids() == stored_ids:
+            return
+        if not stored_ids:
+            self.bm25_index.close()
+            print("[LOG] 벡터DB 가 비어 있음 - BM25 색인 없음")
+            return
+        if loaded:
+            print(f"[LOG] BM25 색인이 벡터DB 와 다름 ({len(self.bm25_index)}개 / {len(stored_ids)}개 청크)")
+        self._rebuild_bm25_index()
+
+    def _rebuild_bm25_index(self):
+        """없거나 오래된 BM25 색인을 벡터DB 에 저장된 청크로 다시 생성 (재파싱/재임베딩 없음)"""
+        with self.startup.measure("bm25_rebuild"):
+            stored = self.vectorstore.get(include=["documents", "metadatas"])
+            chunks = [
+                Document(page_content=text, metadata=meta or {})
+                for text, meta in zip(stored["documents"], stored["metadatas"])
+                if meta and meta.get("chunk_id")
+            ]
+            self.bm25_index.build(chunks)
+        print(f"[LOG] BM25 색인 재생성: {len(chunks)}개 청크 ({self.bm25_index.tokenizer_id})")
+
+    def cache_stats(self):
+        """캐시별 hit/miss 통계"""
+        return dict(super().cache_stats(), bm25_tokens=self.bm25_index.tokenizer.stats())
+
+    # ------------------------------------------------------------------
+    # 검색
+    # ------------------------------------------------------------------
+    def _search_candidates(self, query, k, filters=None):
+        """하이브리드 검색 (BM25 색인이 비어 있으면 벡터 검색만)"""
+        if not len(self.bm25_index):
+            print("[LOG] 벡터 검색만 사용 (BM25 인덱스 없음)")
+            return super()._search_candidates(query, k, filters)
+        print(f"[LOG] 하이브리드 검색 ({self.fusion}: BM25 {self.bm25_weight:.0%} + Vector {self.vector_weight:.0%})")
+        return self._hybrid_search(query, k=k, filters=filters)
+
+    def _hybrid_search(self, query, k=5, filters=None):
+        """
+        하이브리드 검색: BM25 + Vector 후보를 fusion_depth 개씩 가져와 chunk_id 기준으로 결합
+        filters 는 BM25 필드 색인과 Chroma where 절에 각각 적용되어 후보 집합 자체를 줄입니다.
+        """
+        depth = max(k, self.fusion_depth)
+
+        # BM25 검색 (매칭 posting 만 조회)
+        with self.metrics.span("bm25_search"):
+            bm25_results = self.bm25_index.search(query, k=depth, filters=filters)
+
+        # 벡터 검색 (거리가 작을수록 관련 -> 부호를 바꿔 점수로 사용, 결합 시 정규화)
+        with self.metrics.span("embed"):
+            query_vector = self.embedding_model.embed_query(query)
+        with self.metrics.span("vector_search"):
+            vector_results = [(doc, -distance) for doc, distance in self._vector_search(query_vector, depth, filters)]
+
+        with self.metrics.span("fusion"):
+            fused = fuse(
+                [bm25_results, vector_results],
+                [self.bm25_weight, self.vector_weight],
+                method=self.fusion,
+                rrf_k=self.rrf_k,
+            )
+        print(f"[LOG] 결합: BM25 {len(bm25_results)}개 + Vector {len(vector_results)}개 -> {len(fused)}개 후보")
+        return [doc for doc, _ in fused[:k]]
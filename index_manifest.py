@@ -0,0 +1,138 @@
+"""
+증분 인덱싱용 파일 매니페스트
+원본 파일별 경로, mtime, 크기, 내용 해시와 생성된 청크 ID를 JSON으로 기록합니다.
+"""
+import hashlib
+import json
+import os
+
+# 2: 조/장 단위 청크 분할 (이전 버전 인덱스는 청크 ID 가 달라 전체 재인덱싱)
+# 3: 검색 필터용 문서 메타데이터 (file_type, title, department, revision_date)
+# 4: 청크 ID 를 파일명 대신 파일 경로 기준으로 생성 (다른 폴더의 같은 이름 파일 충돌 방지)
+MANIFEST_VERSION = 4
+
+
+def default_manifest_path(persist_directory):
+    """Chroma 저장 경로 옆에 매니페스트 경로 지정 (./chroma_db -> ./chroma_db_manifest.json)"""
+    return os.path.abspath(persist_directory).rstrip("\\/") + "_manifest.json"
+
+
+def file_hash(file_path, block_size=1 << 20):
+    """파일 내용 SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_stat(path):
+    """매니페스트에 기록하는 파일 상태 (mtime, 크기, 내용 해시)"""
+    st = os.stat(path)
+    return {"mtime": st.st_mtime, "size": st.st_size, "sha256": file_hash(path)}
+
+
+class ManifestDiff:
+    """scan() 결과: 새 파일, 변경 파일, 삭제 파일, 변경 없는 파일"""
+
+    def __init__(self):
+        self.added = []
+        self.changed = []
+        self.removed = []
+        self.unchanged = []
+        # 새/변경 파일의 현재 상태 (인덱싱 성공 후 매니페스트에 기록)
+        self.stats = {}
+
+    @property
+    def to_index(self):
+        return self.added + self.changed
+
+    def has_changes(self):
+        return bool(self.added or self.changed or self.removed)
+
+    def summary(self):
+        return {
+            "added": len(self.added),
+            "changed": len(self.changed),
+            "removed": len(self.removed),
+            "unchanged": len(self.unchanged),
+        }
+
+
+class IndexManifest:
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        # 이전 버전 매니페스트가 있었는지 (청크 규칙이 바뀌어 기존 인덱스를 비워야 함)
+        self.outdated = False
+
+    def load(self):
+        self.outdated = False
+        if not os.path.exists(self.path):
+            return False
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != MANIFEST_VERSION:
+            self.outdated = True
+            return False
+        self.entries = data.get("files", {})
+        return True
+
+    def save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "files": self.entries}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        self.entries = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def scan(self, file_paths):
+        """
+        현재 파일 목록과 매니페스트를 비교합니다.
+        mtime/크기가 같으면 해시 계산 없이 변경 없음으로 판단하고,
+        다르면 내용 해시로 실제 변경 여부를 확인합니다.
+        """
+        diff = ManifestDiff()
+        current = set(file_paths)
+
+        for path in file_paths:
+            st = os.stat(path)
+            entry = self.entries.get(path)
+            if entry and entry["mtime"] == st.st_mtime and entry["size"] == st.st_size:
+                diff.unchanged.append(path)
+                continue
+
+            digest = file_hash(path)
+            if entry and entry["sha256"] == digest:
+                # 내용은 같고 mtime 만 바뀐 경우 (복사, touch 등)
+                entry["mtime"] = st.st_mtime
+                entry["size"] = st.st_size
+                diff.unchanged.append(path)
+                continue
+
+            diff.stats[path] = {"mtime": st.st_mtime, "size": st.st_size, "sha256": digest}
+            if entry:
+                diff.changed.append(path)
+            else:
+                diff.added.append(path)
+
+        diff.removed = sorted(path for path in self.entries if path not in current)
+        return diff
+
+    def chunk_ids(self, paths):
+        ids = []
+        for path in paths:
+            entry = self.entries.get(path)
+            if entry:
+                ids.extend(entry.get("chunk_ids", []))
+        return ids
+
+    def record(self, path, stat, chunk_ids):
+        self.entries[path] = dict(stat, chunk_ids=list(chunk_ids))
+
+    def forget(self, paths):
+        for path in paths:
+            self.entries.pop(path, None)
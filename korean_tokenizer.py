@@ -0,0 +1,96 @@
+"""
+BM25 키워드 색인용 한국어 토크나이저
+공백 분할은 "휴직은", "휴직을" 처럼 조사가 붙은 어절을 서로 다른 용어로 색인하므로
+어절 끝의 조사/어미를 떼어낸 어간과, 복합명사("육아휴직")용 음절 bigram 을 함께 색인합니다.
+외부 형태소 분석기 없이 동작하는 규칙 기반 분석기이며, 청크/질의 모두 같은 CachedTokenizer 를 사용합니다.
+"""
+import re
+import sys
+
+from query_cache import TTLCache
+
+# 숫자+단위 어절("15조에", "3일"), 한글 어절, 영문/숫자
+TOKEN_PATTERN = re.compile(r"[0-9]+(?:[.,][0-9]+)*[가-힣]*|[가-힣]+|[a-z][a-z0-9]*")
+
+# 어절 끝에서 떼어낼 조사/어미 (긴 것부터 비교)
+SUFFIXES = sorted({
+    # 조사
+    "은", "는", "이", "가", "을", "를", "의", "에", "도", "만", "와", "과", "로", "께",
+    "에서", "에게", "으로", "까지", "부터", "에는", "에도", "에의", "이나", "이며", "이고", "보다",
+    "처럼", "마다", "라도", "한테", "께서", "로서", "로써", "과의", "와의", "이라", "라는",
+    "에서는", "에서의", "에게는", "으로는", "으로서", "으로써", "으로의", "이라는", "까지는", "부터는",
+    # 명사에 붙는 용언 어미 ("사용한다", "지급하는", "적용된다")
+    "한", "할", "함", "된", "될", "됨",
+    "한다", "하는", "하여", "하고", "하며", "해야", "하지", "된다", "되는", "되어", "되며", "되고",
+    "합니다", "됩니다", "하여야", "하거나", "되거나",
+}, key=len, reverse=True)
+
+
+def whitespace_tokens(text):
+    """BM25Retriever 기본 전처리와 동일한 공백 기준 토크나이저"""
+    return text.split()
+
+
+def strip_suffix(word):
+    """어절 끝 조사/어미 제거 (한 글자 조사는 어간이 두 글자 이상일 때만: "휴가" 는 그대로)"""
+    for suffix in SUFFIXES:
+        if word.endswith(suffix):
+            stem = word[:-len(suffix)]
+            if len(stem) >= (2 if len(suffix) == 1 else 1):
+                return stem
+    return word
+
+
+def korean_tokens(text):
+    """
+    조사/어미를 뗀 어간 + 세 글자 이상 한글 어간의 음절 bigram
+    한 글자 조사/어미(가, 과, 도, 의, 한 ...)는 복합명사의 마지막 음절("출산휴가", "인사평가")일 수 있으므로
+    그때는 떼기 전 어절로 bigram 을 만들어 끝 명사("휴가", "평가")가 색인에서 빠지지 않게 합니다.
+    """
+    tokens = []
+    for word in TOKEN_PATTERN.findall(text.lower()):
+        if "가" <= word[0] <= "힣":
+            stem = strip_suffix(word)
+            tokens.append(stem)
+            if len(stem) >= 3:
+                source = word if len(word) - len(stem) == 1 else stem
+                tokens.extend(source[i:i + 2] for i in range(len(source) - 1))
+        elif "가" <= word[-1] <= "힣":
+            tokens.append(strip_suffix(word))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+# 이름 -> (버전, 토크나이저). 규칙을 바꾸면 버전을 올려 기존 BM25 색인을 재생성
+TOKENIZERS = {
+    "whitespace": (1, whitespace_tokens),
+    "korean": (2, korean_tokens),
+}
+
+
+class CachedTokenizer:
+    """
+    청크 원문 -> 토큰 목록 LRU 캐시를 둔 토크나이저
+    delta 색인 추가 후 병합(compaction)처럼 같은 청크를 다시 토큰화할 때와 반복 질의에서 분석을 생략합니다.
+    토큰 문자열은 intern 하여 캐시된 청크끼리 메모리를 공유합니다.
+    """
+
+    def __init__(self, name="korean", cache_size=4096):
+        if name not in TOKENIZERS:
+            raise ValueError(f"지원하지 않는 토크나이저: {name} (가능: {', '.join(TOKENIZERS)})")
+        version, self._tokenize = TOKENIZERS[name]
+        self.name = name
+        # BM25 색인 meta.json 에 기록 (다르면 색인 재생성)
+        self.id = f"{name}-{version}"
+        self.cache = TTLCache(maxsize=cache_size, ttl=float("inf"))
+
+    def __call__(self, text):
+        tokens = self.cache.get(text)
+        if tokens is None:
+            tokens = tuple(sys.intern(token) for token in self._tokenize(text))
+            self.cache.put(text, tokens)
+        return tokens
+
+    def stats(self):
+        return self.cache.stats()
@@ -0,0 +1,73 @@
+"""
+검색 메타데이터 필터
+{"department": "인사팀", "file_type": {"$in": ["hwp", "docx"]}, "revision_date": {"$gte": 20230101}}
+형식의 필터를 Chroma where 절로 변환하고, BM25/조문 색인 결과에도 같은 조건을 적용합니다.
+여러 필드는 AND 로 결합하며 연산자는 Chroma 와 같은 $eq, $ne, $in, $nin, $gt, $gte, $lt, $lte 를 지원합니다.
+"""
+import json
+
+OPERATORS = ("$eq", "$ne", "$in", "$nin", "$gt", "$gte", "$lt", "$lte")
+
+
+def normalize_filters(filters):
+    """빈 값 제거 후 {필드: {연산자: 값}} 형태로 정리 (필터가 없으면 None)"""
+    if not filters:
+        return None
+    normalized = {}
+    for field, condition in filters.items():
+        if condition is None:
+            continue
+        if isinstance(condition, dict):
+            unknown = set(condition) - set(OPERATORS)
+            if unknown:
+                raise ValueError(f"지원하지 않는 필터 연산자: {', '.join(sorted(unknown))}")
+            normalized[field] = dict(condition)
+        elif isinstance(condition, (list, tuple, set)):
+            normalized[field] = {"$in": list(condition)}
+        else:
+            normalized[field] = {"$eq": condition}
+    return normalized or None
+
+
+def filter_key(filters):
+    """캐시 키용 문자열 (필터 없으면 None)"""
+    filters = normalize_filters(filters)
+    return json.dumps(filters, ensure_ascii=False, sort_keys=True) if filters else None
+
+
+def to_chroma_where(filters):
+    """Chroma where 절 (필드가 여러 개면 $and)"""
+    filters = normalize_filters(filters)
+    if not filters:
+        return None
+    clauses = [{field: condition} for field, condition in filters.items()]
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def match_value(value, condition):
+    """값 하나가 {연산자: 기준} 조건을 모두 만족하는지"""
+    for op, expected in condition.items():
+        if op == "$eq":
+            ok = value == expected
+        elif op == "$ne":
+            ok = value != expected
+        elif op == "$in":
+            ok = value in expected
+        elif op == "$nin":
+            ok = value not in expected
+        else:
+            if value is None or isinstance(value, str) != isinstance(expected, str):
+                return False
+            ok = {"$gt": value > expected, "$gte": value >= expected,
+                  "$lt": value < expected, "$lte": value <= expected}[op]
+        if not ok:
+            return False
+    return True
+
+
+def matches(metadata, filters):
+    """청크 metadata 가 필터를 만족하는지"""
+    filters = normalize_filters(filters)
+    if not filters:
+        return True
+    return all(match_value(metadata.get(field), condition) for field, condition in filters.items())
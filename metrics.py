@@ -0,0 +1,170 @@
+"""
+단계별 지연 시간 / 카운터 / 히스토그램 수집
+질의 경로의 각 단계(embed, search, fusion, rerank, prompt, llm_prefill, llm_generate 등)를 span 으로 기록하고
+Prometheus 텍스트 형식(/metrics) 또는 JSON(snapshot)으로 내보냅니다.
+검색된 청크 미리보기 같은 상세 로그는 RAG_LOG_LEVEL=debug 일 때만 출력합니다.
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# 히스토그램 구간 (초)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# 분위수 계산용으로 보관하는 최근 측정값 수 (히스토그램별)
+RECENT_SAMPLES = 1024
+
+
+def debug_enabled():
+    return os.environ.get("RAG_LOG_LEVEL", "info").lower() == "debug"
+
+
+def debug(message):
+    """RAG_LOG_LEVEL=debug 일 때만 출력"""
+    if debug_enabled():
+        print(f"[DEBUG] {message}")
+
+
+def _percentile(sorted_values, q):
+    index = max(0, math.ceil(q / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=RECENT_SAMPLES)
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def summary(self):
+        values = sorted(self.recent)
+        summary = {"count": self.count, "sum": round(self.sum, 6),
+                   "mean": round(self.sum / self.count, 6) if self.count else 0.0}
+        for q in (50, 95, 99):
+            summary[f"p{q}"] = round(_percentile(values, q), 6) if values else 0.0
+        return summary
+
+
+class Metrics:
+    """
+    thread-safe 카운터/히스토그램 저장소
+        metrics.inc("queries_total", mode="ask")
+        with metrics.span("search"):   # stage_seconds{stage="search"} 히스토그램에 기록
+            ...
+    """
+
+    def __init__(self, namespace="rag", buckets=DEFAULT_BUCKETS):
+        self.namespace = namespace
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(self.buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, stage, **labels):
+        """블록 실행 시간을 stage_seconds{stage=...} 에 기록 (예외가 나도 기록)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - start, stage=stage, **labels)
+
+    def record_llm(self, message, seconds, first_token_seconds=None):
+        """
+        LLM 호출 시간을 prefill(프롬프트 처리)/generate(토큰 생성)로 나누어 기록
+        Ollama 응답의 prompt_eval_duration/eval_duration(ns) 이 있으면 사용하고,
+        스트리밍이면 첫 토큰까지를 prefill 로 봅니다. 둘 다 없으면 llm 전체 시간만 기록합니다.
+        """
+        meta = getattr(message, "response_metadata", None) or {}
+        if meta.get("prompt_eval_duration") is not None and meta.get("eval_duration") is not None:
+            self.observe("stage_seconds", meta["prompt_eval_duration"] / 1e9, stage="llm_prefill")
+            self.observe("stage_seconds", meta["eval_duration"] / 1e9, stage="llm_generate")
+        elif first_token_seconds is not None:
+            self.observe("stage_seconds", first_token_seconds, stage="llm_prefill")
+            self.observe("stage_seconds", seconds - first_token_seconds, stage="llm_generate")
+        self.observe("stage_seconds", seconds, stage="llm")
+        if meta.get("prompt_eval_count") is not None:
+            self.inc("llm_prompt_tokens_total", meta["prompt_eval_count"])
+        if meta.get("eval_count") is not None:
+            self.inc("llm_completion_tokens_total", meta["eval_count"])
+
+    def clear(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    # ------------------------------------------------------------------
+    # 내보내기
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _label_text(labels):
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+    @staticmethod
+    def _json_name(name, labels):
+        return name + "".join(f".{v}" for _, v in labels)
+
+    def snapshot(self):
+        """JSON 직렬화 가능한 {"counters": {...}, "histograms": {...}} (초 단위)"""
+        with self._lock:
+            return {
+                "counters": {self._json_name(n, l): v for (n, l), v in sorted(self._counters.items())},
+                "histograms": {self._json_name(n, l): h.summary() for (n, l), h in sorted(self._histograms.items())},
+            }
+
+    def prometheus(self):
+        """Prometheus text exposition 형식"""
+        lines = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                full = f"{self.namespace}_{name}"
+                if full not in typed:
+                    lines.append(f"# TYPE {full} counter")
+                    typed.add(full)
+                lines.append(f"{full}{self._label_text(labels)} {value}")
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                full = f"{self.namespace}_{name}"
+                if full not in typed:
+                    lines.append(f"# TYPE {full} histogram")
+                    typed.add(full)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{full}_bucket{self._label_text(labels + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{full}_bucket{self._label_text(labels + (('le', '+Inf'),))} {histogram.count}")
+                lines.append(f"{full}_sum{self._label_text(labels)} {histogram.sum}")
+                lines.append(f"{full}_count{self._label_text(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
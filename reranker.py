@@ -0,0 +1,77 @@
+"""
+Cross-encoder 재순위화 (선택)
+넓게 가져온 후보(예: 30개)를 질의-청크 쌍 단위로 다시 점수 매겨 상위 몇 개만 LLM 에 보냅니다.
+CPU 배치 추론, 질의당 시간 예산, (질의, chunk_id) 점수 캐시를 지원합니다.
+"""
+import time
+
+from answer_cache import chunk_key
+from query_cache import TTLCache
+from startup import StartupTimer
+
+# 다국어(한국어 포함) 소형 cross-encoder (118M, CPU 추론 가능)
+RERANK_MODEL = "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+
+
+class CrossEncoderReranker:
+    def __init__(self, model_name=RERANK_MODEL, batch_size=16, budget=1.0, max_length=512,
+                 cache_size=4096, cache_ttl=3600, startup=None):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        # 질의당 점수 계산 시간 상한 (초). 넘으면 남은 후보는 원래 검색 순서로 뒤에 붙임
+        self.budget = budget
+        self.max_length = max_length
+        self.score_cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        self.startup = startup or StartupTimer()
+        self._model = None
+
+    def _create_model(self):
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(self.model_name, max_length=self.max_length, device="cpu")
+
+    @property
+    def model(self):
+        return self.startup.lazy(self, "_model", "reranker", self._create_model)
+
+    @staticmethod
+    def _doc_id(doc):
+        return next(iter(chunk_key([doc])))
+
+    def rerank(self, query, docs, top_n=3):
+        """docs(검색 순위 순)를 cross-encoder 점수로 정렬하여 상위 top_n 개 반환"""
+        if len(docs) <= 1:
+            return list(docs[:top_n])
+
+        start = time.time()
+        scores = {}
+        pending = []
+        for i, doc in enumerate(docs):
+            score = self.score_cache.get((query, self._doc_id(doc)))
+            if score is None:
+                pending.append(i)
+            else:
+                scores[i] = score
+        cached = len(scores)
+
+        # 검색 순위가 높은 후보부터 배치로 점수 계산, 시간 예산을 넘으면 중단
+        for offset in range(0, len(pending), self.batch_size):
+            if offset and time.time() - start > self.budget:
+                print(f"[LOG] 재순위화 시간 예산 초과: {len(pending) - offset}개 후보 점수 생략")
+                break
+            batch = pending[offset:offset + self.batch_size]
+            batch_scores = self.model.predict(
+                [(query, docs[i].page_content) for i in batch], batch_size=self.batch_size
+            )
+            for i, score in zip(batch, batch_scores):
+                scores[i] = float(score)
+                self.score_cache.put((query, self._doc_id(docs[i])), float(score))
+
+        scored = sorted(scores, key=scores.get, reverse=True)
+        unscored = [i for i in range(len(docs)) if i not in scores]
+        order = scored + unscored
+        print(f"[LOG] 재순위화: 후보 {len(docs)}개 -> {min(top_n, len(order))}개 "
+              f"(캐시 {cached}개, {time.time() - start:.2f}초)")
+        return [docs[i] for i in order[:top_n]]
+
+    def stats(self):
+        return self.score_cache.stats()
@@ -0,0 +1,25 @@
+"""
+엔진 검색 함수를 LangChain 리트리버로 감싸는 어댑터
+외부 LangChain 체인이 엔진의 (캐시된) 검색 경로를 그대로 사용하도록 합니다.
+"""
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+
+class EngineRetriever(BaseRetriever):
+    """
+    search_fn(query, k, filters) 결과를 그대로 반환하는 리트리버
+    filters: 메타데이터 필터 (engine.retriever.model_copy(update={"filters": {...}}) 로 필터별 리트리버 생성)
+    """
+
+    search_fn: Callable[..., List[Document]]
+    k: int = 5
+    filters: Optional[Dict[str, Any]] = None
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.search_fn(query, k=self.k, filters=self.filters)
@@ -0,0 +1,248 @@
+"""
+검색/질의응답 HTTP 서비스
+엔진(RagEngine 또는 HybridRagEngine)을 한 번만 로드해 두고 여러 사내 도구가 공유합니다.
+
+실행:
+    python server.py --engine hybrid --port 8000
+    RAG_ENGINE=rag uvicorn server:app --port 8000
+
+엔드포인트:
+    GET  /health        - 프로세스 생존 확인 (liveness)
+    GET  /ready         - 엔진/인덱스 로드 완료 여부 (readiness, 준비 전 503)
+    POST /search        - 검색만 수행 {"query": "...", "k": 5, "filters": {"department": "인사팀"}}
+    POST /search/batch  - 여러 질의 검색 {"queries": [...], "k": 5}
+    POST /ask           - 질의응답 {"query": "...", "k": 5}
+    POST /ask/batch     - 여러 질의응답 {"queries": [...], "k": 5}
+    GET  /metrics       - 단계별 지연 시간/카운터 (Prometheus 텍스트, ?format=json 이면 JSON + 캐시/컨텍스트 압축 통계)
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
+from pydantic import BaseModel, Field, field_validator
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from metadata_filter import normalize_filters
+
+# 배치 요청 하나에 허용하는 최대 질의 수
+MAX_BATCH = 32
+
+
+class QueryOptions(BaseModel):
+    k: int = Field(default=5, ge=1, le=50)
+    # 메타데이터 필터 (file_type, title, department, revision_date, chapter, article 등)
+    filters: Optional[Dict[str, Any]] = None
+
+    @field_validator("filters")
+    @classmethod
+    def check_filters(cls, filters):
+        # 지원하지 않는 연산자는 검색 전에 422 로 거절
+        normalize_filters(filters)
+        return filters
+
+
+class SearchRequest(QueryOptions):
+    query: str
+
+
+class BatchRequest(QueryOptions):
+    queries: List[str] = Field(min_length=1, max_length=MAX_BATCH)
+
+
+def create_engine(kind):
+    if kind == "hybrid":
+        from hybrid_rag_engine import HybridRagEngine
+        return HybridRagEngine()
+    from rag_engine import RagEngine
+    return RagEngine()
+
+
+def serialize_document(doc):
+    return {
+        "chunk_id": doc.metadata.get("chunk_id"),
+        "source": doc.metadata.get("source", "Unknown"),
+        "content": doc.page_content,
+        "metadata": doc.metadata,
+    }
+
+
+def serialize_answer(result):
+    return {
+        "answer": result.get("result", ""),
+        "sources": [serialize_document(doc) for doc in result.get("source_documents", [])],
+        # 컨텍스트 압축 전후 토큰 수
+        "context": result.get("context"),
+    }
+
+
+class EngineState:
+    """엔진 로드 상태 (백그라운드에서 로드하는 동안 /health 는 응답 가능)"""
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.engine = None
+        self.indexed = False
+        self.error = None
+        self.load_seconds = None
+        self._index_lock = threading.Lock()
+
+    def load(self):
+        start = time.time()
+        try:
+            engine = create_engine(self.kind)
+            self.indexed = engine.load_index()
+            self.engine = engine
+        except Exception as e:
+            self.error = str(e)
+            print(f"[LOG] 엔진 로드 실패: {e}")
+        self.load_seconds = time.time() - start
+        print(f"[LOG] 엔진 로드 완료 ({self.load_seconds:.2f}초, 인덱스: {self.indexed})")
+
+    def refresh_index(self):
+        """
+        엔진은 로드됐지만 인덱스가 없던 경우 다시 확인 (서버 시작 후 처음 인덱싱한 경우 재시작 없이 준비 완료)
+        벡터DB 폴더가 생겼을 때만 load_index() 를 호출하므로 준비 전 요청마다 드는 비용은 경로 확인 한 번
+        """
+        engine = self.engine
+        if engine is None or self.indexed or not os.path.exists(engine.persist_directory):
+            return
+        with self._index_lock:
+            if not self.indexed:
+                self.indexed = engine.load_index()
+                if self.indexed:
+                    print("[LOG] 인덱스 생성 확인 - 준비 완료")
+
+    @property
+    def ready(self):
+        return self.engine is not None and self.indexed
+
+
+def create_app(kind=None):
+    state = EngineState(kind or os.environ.get("RAG_ENGINE", "rag"))
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # 모델 로드는 수십 초 걸리므로 백그라운드로 실행하고 /ready 로 완료 여부 노출
+        task = asyncio.create_task(asyncio.to_thread(state.load))
+        yield
+        task.cancel()
+
+    app = FastAPI(title="사내 문서 검색 API", lifespan=lifespan)
+    app.state.engine_state = state
+
+    async def get_engine():
+        if state.engine is not None and not state.indexed:
+            await asyncio.to_thread(state.refresh_index)
+        if not state.ready:
+            raise HTTPException(status_code=503, detail=state.error or "엔진 준비 중")
+        return state.engine
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    @app.get("/ready")
+    async def ready():
+        await asyncio.to_thread(state.refresh_index)
+        body = {
+            "ready": state.ready,
+            "engine": state.kind,
+            "indexed": state.indexed,
+            "load_seconds": state.load_seconds,
+            # 단계별 초기화 시간 (모델/LLM 은 첫 사용 시 로드되므로 그 이후에 나타남)
+            "startup": state.engine.startup.report() if state.engine else {},
+            "error": state.error,
+        }
+        if not state.ready:
+            raise HTTPException(status_code=503, detail=body)
+        return body
+
+    @app.get("/metrics")
+    async def metrics(format: str = "prometheus"):
+        engine = state.engine
+        if format == "json":
+            return {
+                "engine": state.kind,
+                "metrics": engine.metrics.snapshot() if engine else {},
+                "caches": engine.cache_stats() if engine else {},
+                "context": engine.context_stats() if engine else {},
+            }
+        return PlainTextResponse(engine.metrics.prometheus() if engine else "",
+                                 media_type="text/plain; version=0.0.4")
+
+    @app.post("/search")
+    async def search(request: SearchRequest):
+        engine = await get_engine()
+        start = time.time()
+        docs = await engine.asearch(request.query, k=request.k, filters=request.filters)
+        return {
+            "query": request.query,
+            "results": [serialize_document(doc) for doc in docs],
+            "elapsed": time.time() - start,
+        }
+
+    @app.post("/search/batch")
+    async def search_batch(request: BatchRequest):
+        engine = await get_engine()
+        start = time.time()
+        # 질의 임베딩을 한 번의 모델 호출로 계산 (질의 캐시에 채워짐)
+        await engine.aembed_queries(request.queries)
+        results = await asyncio.gather(
+            *(engine.asearch(query, k=request.k, filters=request.filters) for query in request.queries)
+        )
+        return {
+            "results": [
+                {"query": query, "results": [serialize_document(doc) for doc in docs]}
+                for query, docs in zip(request.queries, results)
+            ],
+            "elapsed": time.time() - start,
+        }
+
+    @app.post("/ask")
+    async def ask(request: SearchRequest):
+        engine = await get_engine()
+        start = time.time()
+        result = await engine.aask(request.query, k=request.k, filters=request.filters)
+        return dict(serialize_answer(result), query=request.query, elapsed=time.time() - start)
+
+    @app.post("/ask/batch")
+    async def ask_batch(request: BatchRequest):
+        engine = await get_engine()
+        start = time.time()
+        await engine.aembed_queries(request.queries)
+        # LLM 동시 호출 수는 엔진의 max_concurrent_llm 으로 제한됨
+        results = await asyncio.gather(
+            *(engine.aask(query, k=request.k, filters=request.filters) for query in request.queries)
+        )
+        return {
+            "results": [
+                dict(serialize_answer(result), query=query)
+                for query, result in zip(request.queries, results)
+            ],
+            "elapsed": time.time() - start,
+        }
+
+    return app
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="사내 문서 검색 HTTP 서비스")
+    parser.add_argument("--engine", choices=["rag", "hybrid"], default=os.environ.get("RAG_ENGINE", "rag"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.engine), host=args.host, port=args.port)
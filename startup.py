@@ -0,0 +1,39 @@
+"""
+엔진 시작 시간 측정 및 지연 초기화 도우미
+임베딩 모델, LLM, 벡터DB 등은 처음 사용할 때 생성하고 단계별 소요 시간을 기록합니다.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupTimer:
+    def __init__(self):
+        self.timings = {}
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def measure(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+            print(f"[LOG] 초기화: {name} ({elapsed:.2f}초)")
+
+    def lazy(self, owner, attr, name, factory):
+        """owner.attr 가 None 이면 factory() 로 한 번만 생성 (스레드 안전)"""
+        value = getattr(owner, attr)
+        if value is None:
+            with self._lock:
+                value = getattr(owner, attr)
+                if value is None:
+                    with self.measure(name):
+                        value = factory()
+                    setattr(owner, attr, value)
+        return value
+
+    def report(self):
+        """단계별 초기화 시간 (초)"""
+        return {name: round(seconds, 3) for name, seconds in self.timings.items()}
@@ -0,0 +1,5 @@
+"""pytest 공용 설정: 저장소 루트의 평면 모듈(bm25_index, hwp_loader 등)을 import 할 수 있게 경로 추가"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,149 @@
+"""BM25Index: delta 세그먼트, tombstone 삭제, 병합(compaction), 재로드"""
+import json
+import os
+
+from langchain_core.documents import Document
+
+from bm25_index import BM25Index
+
+
+def make_doc(chunk_id, text, **metadata):
+    return Document(page_content=text, metadata=dict(metadata, chunk_id=chunk_id))
+
+
+def ids_of(index, query, k=10, filters=None):
+    return [doc.metadata["chunk_id"] for doc, _ in index.search(query, k=k, filters=filters)]
+
+
+def base_docs(n=10):
+    return [make_doc(f"c{i}", f"공통 문서{i} 본문", department="인사팀" if i % 2 else "총무팀") for i in range(n)]
+
+
+def test_build_and_reload(tmp_path):
+    index = BM25Index(str(tmp_path))
+    index.build(base_docs())
+    assert len(index) == 10
+    assert ids_of(index, "문서3") == ["c3"]
+
+    reloaded = BM25Index(str(tmp_path))
+    assert reloaded.load()
+    assert len(reloaded) == 10
+    assert ids_of(reloaded, "문서3") == ["c3"]
+    assert set(ids_of(reloaded, "공통", filters={"department": "인사팀"})) == {"c1", "c3", "c5", "c7", "c9"}
+
+
+def test_delta_segment_survives_reload(tmp_path):
+    index = BM25Index(str(tmp_path))
+    index.build(base_docs())
+    index.add_documents([make_doc("new", "새 조문 추가")])
+    index.save()
+    # 임계값(본 세그먼트의 20%) 이하이므로 병합 없이 delta 파일에 기록
+    assert os.path.getsize(tmp_path / "delta.jsonl") > 0
+    assert index._n_main == 10
+
+    reloaded = BM25Index(str(tmp_path))
+    assert reloaded.load()
+    assert "new" in reloaded
+    assert ids_of(reloaded, "조문") == ["new"]
+
+
+def test_tombstone_survives_reload(tmp_path):
+    index = BM25Index(str(tmp_path))
+    index.build(base_docs())
+    index.delete(["c3"])
+    assert "c3" not in index
+    assert ids_of(index, "문서3") == []
+    index.save()
+    with open(tmp_path / "meta.json", encoding="utf-8") as f:
+        assert json.load(f)["deleted"] == [3]
+
+    reloaded = BM25Index(str(tmp_path))
+    assert reloaded.load()
+    assert len(reloaded) == 9
+    assert ids_of(reloaded, "문서3") == []
+
+
+def test_replace_same_chunk_id(tmp_path):
+    index = BM25Index(str(tmp_path))
+    index.build(base_docs())
+    index.add_documents([make_doc("c1", "바뀐 내용")])
+    assert len(index) == 10
+    assert ids_of(index, "문서1") == []
+    assert ids_of(index, "바뀐") == ["c1"]
+
+
+def test_compaction_merges_delta_and_tombstones(tmp_path):
+    index = BM25Index(str(tmp_path))
+    index.build(base_docs())
+    index.delete(["c0", "c1", "c2"])
+    index.add_documents([make_doc(f"d{i}", f"추가 청크{i}") for i in range(3)])
+    index.save()
+    # 삭제/추가가 임계값을 넘으면 본 세그먼트로 병합: tombstone 과 delta 가 모두 사라짐
+    assert index._n_main == 10
+    assert not index._deleted
+    assert not index._delta_records
+
+    reloaded = BM25Index(str(tmp_path))
+    assert reloaded.load()
+    assert len(reloaded) == 10
+    assert "c0" not in reloaded and "d2" in reloaded
+    assert ids_of(reloaded, "청크2") == ["d2"]
+    assert set(ids_of(reloaded, "공통")) == {f"c{i}" for i in range(3, 10)}
+
+
+def test_tokenizer_mismatch_marks_outdated(tmp_path):
+    BM25Index(str(tmp_path)).build(base_docs())
+
+    def other_tokenizer(text):
+        return list(text)
+    other_tokenizer.id = "chars-1"
+
+    index = BM25Index(str(tmp_path), tokenizer=other_tokenizer)
+    assert not index.load()
+    assert index.outdated
+
+
+def brute_force_bm25(docs, query, tokenizer, k1=1.5, b=0.75):
+    """살아 있는 청크만으로 계산한 BM25 점수 {chunk_id: 점수}"""
+    import math
+    from collections import Counter
+    tokens = {chunk_id: tokenizer(text) for chunk_id, text in docs.items()}
+    avgdl = sum(len(t) for t in tokens.values()) / len(tokens)
+    scores = {}
+    for term in set(tokenizer(query)):
+        df = sum(term in t for t in tokens.values())
+        if not df:
+            continue
+        idf = math.log(1.0 + (len(docs) - df + 0.5) / (df + 0.5))
+        for chunk_id, t in tokens.items():
+            tf = Counter(t)[term]
+            if tf:
+                norm = k1 * (1.0 - b + b * len(t) / avgdl)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (k1 + 1.0) / (tf + norm)
+    return scores
+
+
+def test_replaced_chunk_does_not_count_in_document_frequency(tmp_path):
+    index = BM25Index(str(tmp_path))
+    index.build([make_doc("a", "규정 휴가"), make_doc("b", "규정 출장")])
+    index.add_documents([make_doc("a", "규정 휴가 연차")])
+    results = {doc.metadata["chunk_id"]: score for doc, score in index.search("규정 휴가", k=10)}
+    assert all(score > 0 for score in results.values())
+    expected = brute_force_bm25({"a": "규정 휴가 연차", "b": "규정 출장"}, "규정 휴가", index.tokenizer)
+    assert results.keys() == expected.keys()
+    for chunk_id, score in expected.items():
+        assert abs(results[chunk_id] - score) < 1e-4
+
+
+def test_scores_after_tombstones_match_brute_force(tmp_path):
+    index = BM25Index(str(tmp_path))
+    index.build(base_docs())
+    index.delete(["c1", "c2", "c3", "c4"])
+    index.add_documents([make_doc("c5", "공통 바뀐 본문"), make_doc("e", "공통 추가")])
+    live = {f"c{i}": f"공통 문서{i} 본문" for i in (0, 6, 7, 8, 9)}
+    live.update({"c5": "공통 바뀐 본문", "e": "공통 추가"})
+    results = {doc.metadata["chunk_id"]: score for doc, score in index.search("공통 본문", k=10)}
+    expected = brute_force_bm25(live, "공통 본문", index.tokenizer)
+    assert results.keys() == expected.keys()
+    for chunk_id, score in expected.items():
+        assert abs(results[chunk_id] - score) < 1e-4
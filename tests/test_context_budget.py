@@ -0,0 +1,52 @@
+"""ContextCompressor: 예산 안이면 그대로, 넘으면 관련 문장 우선 + 남은 예산은 문서 순서대로 채움"""
+from langchain_core.documents import Document
+
+from context_budget import ContextCompressor, estimate_tokens, split_sentences
+
+ARTICLE_15 = ("제15조(연차휴가)\n"
+              "① 1년간 80퍼센트 이상 출근한 직원에게 15일의 유급휴가를 준다.\n"
+              "② 계속 근로 기간이 1년 미만인 직원에게는 1개월 개근 시 1일을 준다.\n"
+              "③ 휴가는 직원이 청구한 시기에 주어야 한다.")
+
+
+def test_under_budget_keeps_whole_article():
+    compressor = ContextCompressor(max_tokens=1500)
+    doc = Document(page_content=ARTICLE_15, metadata={"source": "취업규칙.hwp"})
+    compressed, report = compressor.compress("15조 알려줘", [doc])
+    assert compressed[0].page_content == ARTICLE_15
+    assert report["tokens_saved"] == 0
+
+
+def test_over_budget_prefers_relevant_then_fills_in_document_order():
+    doc = Document(page_content=ARTICLE_15, metadata={"source": "취업규칙.hwp"})
+    title, first, second, third = split_sentences(ARTICLE_15)
+    # 제목 + ①(질의와 겹침)을 넣고 남은 예산에 ② 까지만 들어감
+    budget = sum(estimate_tokens(line) for line in (title, first, second))
+    compressor = ContextCompressor(max_tokens=budget)
+    compressed, report = compressor.compress("80퍼센트 출근", [doc])
+    assert compressed[0].page_content.split("\n") == [title, first, second]
+    assert report["tokens_after"] <= budget < report["tokens_before"]
+
+
+def test_filler_does_not_displace_relevant_sentence():
+    doc = Document(page_content=ARTICLE_15, metadata={"source": "취업규칙.hwp"})
+    title, first, second, third = split_sentences(ARTICLE_15)
+    # ③ 만 질의와 겹침: 앞 문장(②)보다 먼저 예산을 차지
+    budget = sum(estimate_tokens(line) for line in (title, third))
+    compressed, _ = ContextCompressor(max_tokens=budget).compress("청구한 시기", [doc])
+    assert compressed[0].page_content.split("\n") == [title, third]
+
+
+def test_overlapping_sentences_from_same_file_are_dropped():
+    first = Document(page_content="가나다 휴가 규정.\n공통 문장입니다.", metadata={"source": "a.hwp"})
+    second = Document(page_content="공통 문장입니다.\n라마바 휴가.", metadata={"source": "a.hwp"})
+    compressor = ContextCompressor(max_tokens=estimate_tokens(first.page_content + second.page_content) - 1)
+    compressed, _ = compressor.compress("휴가", [first, second])
+    text = "\n".join(doc.page_content for doc in compressed)
+    assert text.count("공통 문장입니다.") == 1
+
+
+def test_stats_accumulate():
+    compressor = ContextCompressor(max_tokens=None)
+    compressor.compress("질의", [Document(page_content="본문")])
+    assert compressor.stats()["queries"] == 1
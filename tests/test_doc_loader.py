@@ -0,0 +1,70 @@
+"""doc_loader: 파일 시그니처 판별과 확장자가 다른 문서 수집/로드"""
+import zipfile
+
+import pytest
+
+from doc_loader import collect_source_files, load_file, resolve_loader, sniff_format
+
+SECTION_XML = ('<hs:sec xmlns:hs="s" xmlns:hp="p"><hp:p><hp:run><hp:t>제1조(목적) 시그니처로 찾은 문서</hp:t>'
+               '</hp:run></hp:p></hs:sec>')
+
+
+def write_zip(path, files):
+    with zipfile.ZipFile(path, "w") as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+    return str(path)
+
+
+def write_hwpx(path):
+    return write_zip(path, {"mimetype": "application/hwp+zip", "Contents/section0.xml": SECTION_XML})
+
+
+def test_sniff_zip_containers(tmp_path):
+    assert sniff_format(write_hwpx(tmp_path / "a.bin")) == "hwpx"
+    assert sniff_format(write_zip(tmp_path / "b.bin", {"word/document.xml": "<w/>"})) == "docx"
+    assert sniff_format(write_zip(tmp_path / "c.bin", {"xl/workbook.xml": "<x/>"})) == "zip"
+
+
+def test_sniff_other_formats(tmp_path):
+    pdf = tmp_path / "a.dat"
+    pdf.write_bytes(b"%PDF-1.4\n")
+    assert sniff_format(str(pdf)) == "pdf"
+    text = tmp_path / "b.dat"
+    text.write_text("본문", encoding="utf-8")
+    assert sniff_format(str(text)) is None
+
+
+def test_resolve_loader_prefers_extension_then_signature(tmp_path):
+    assert resolve_loader(str(tmp_path / "규정.txt")).name == "txt"
+    assert resolve_loader(write_hwpx(tmp_path / "규정_사본")).name == "hwp"
+    assert resolve_loader(write_zip(tmp_path / "표.xlsx", {"xl/workbook.xml": "<x/>"})) is None
+
+
+def test_collect_includes_sniffable_files_only(tmp_path):
+    docs = tmp_path / "doc"
+    docs.mkdir()
+    (docs / "a.txt").write_text("본문", encoding="utf-8")
+    hwpx = write_hwpx(docs / "규정.bak")
+    write_zip(docs / "표.xlsx", {"xl/workbook.xml": "<x/>"})
+    (docs / "image.png").write_bytes(b"\x89PNG\r\n\x1a\n")
+    assert [p.rsplit("/", 1)[-1] for p in collect_source_files([str(docs)])] == ["a.txt", "규정.bak"]
+    # 확장자를 직접 지정하면 시그니처로 추가하지 않음
+    assert collect_source_files([str(docs)], extensions=(".txt",)) == [str(docs / "a.txt")]
+    assert hwpx in collect_source_files([hwpx])
+
+
+def test_sniffed_file_loads_with_real_format(tmp_path):
+    doc = load_file(write_hwpx(tmp_path / "규정.bak"))
+    assert "시그니처로 찾은 문서" in doc.page_content
+    assert doc.metadata["file_type"] == "hwp"
+
+
+def test_docx_without_extension(tmp_path):
+    docx = pytest.importorskip("docx")
+    document = docx.Document()
+    document.add_paragraph("제2조(정의) 워드 문서 본문")
+    path = tmp_path / "규정_docx"
+    document.save(str(path))
+    assert sniff_format(str(path)) == "docx"
+    assert "워드 문서 본문" in load_file(str(path)).page_content
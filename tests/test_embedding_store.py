@@ -0,0 +1,40 @@
+"""EmbeddingStore.flush(): 여러 저장소 인스턴스(프로세스)가 같은 캐시에 추가해도 키/벡터 행이 맞는지"""
+import numpy as np
+
+from embedding_store import EmbeddingStore, text_key
+
+
+def vector(value, dim=4):
+    return np.full(dim, value, dtype=np.float32)
+
+
+def test_two_writers_share_cache(tmp_path):
+    first = EmbeddingStore(str(tmp_path), "m")
+    second = EmbeddingStore(str(tmp_path), "m")
+    first.put(text_key("가"), vector(1))
+    second.put(text_key("나"), vector(2))
+    # 다른 인스턴스가 이미 기록한 키는 다시 추가하지 않음
+    second.put(text_key("가"), vector(1))
+    first.flush()
+    second.flush()
+
+    store = EmbeddingStore(str(tmp_path), "m")
+    assert len(store) == 2
+    assert store.get(text_key("가"))[0] == 1
+    assert store.get(text_key("나"))[0] == 2
+
+
+def test_torn_row_is_truncated_before_append(tmp_path):
+    store = EmbeddingStore(str(tmp_path), "m")
+    store.put(text_key("가"), vector(1))
+    store.flush()
+    # 벡터만 쓰고 키를 쓰기 전에 중단된 상황
+    with open(tmp_path / "vectors.f32", "ab") as f:
+        vector(9).tofile(f)
+
+    store.put(text_key("나"), vector(2))
+    store.flush()
+    reloaded = EmbeddingStore(str(tmp_path), "m")
+    assert len(reloaded) == 2
+    assert reloaded.get(text_key("나"))[0] == 2
+    assert (tmp_path / "vectors.f32").stat().st_size == 2 * 4 * 4
@@ -0,0 +1,58 @@
+"""fuse(): RRF / 정규화 점수 가중합 결합, chunk_id 기준 중복 제거"""
+import pytest
+from langchain_core.documents import Document
+
+from fusion import fuse, normalize_scores
+
+
+def doc(chunk_id):
+    return Document(page_content=f"본문 {chunk_id}", metadata={"chunk_id": chunk_id})
+
+
+def ranked_ids(fused):
+    return [d.metadata["chunk_id"] for d, _ in fused]
+
+
+BM25 = [(doc("a"), 12.0), (doc("b"), 8.0), (doc("c"), 2.0)]
+VECTOR = [(doc("c"), -0.1), (doc("a"), -0.4), (doc("d"), -0.9)]
+
+
+def test_rrf_scores_by_rank():
+    fused = fuse([BM25, VECTOR], [0.6, 0.4], method="rrf", rrf_k=60)
+    scores = {d.metadata["chunk_id"]: score for d, score in fused}
+    assert scores["a"] == pytest.approx(0.6 / 61 + 0.4 / 62)
+    assert scores["c"] == pytest.approx(0.6 / 63 + 0.4 / 61)
+    assert scores["d"] == pytest.approx(0.4 / 63)
+    assert ranked_ids(fused) == ["a", "c", "b", "d"]
+
+
+def test_weighted_normalizes_each_retriever():
+    fused = fuse([BM25, VECTOR], [0.5, 0.5], method="weighted")
+    scores = {d.metadata["chunk_id"]: score for d, score in fused}
+    # BM25: a=1.0, b=0.6, c=0.0 / Vector: c=1.0, a=0.625, d=0.0
+    assert scores["a"] == pytest.approx(0.5 * 1.0 + 0.5 * 0.625)
+    assert scores["b"] == pytest.approx(0.5 * 0.6)
+    assert scores["c"] == pytest.approx(0.5 * 1.0)
+    assert scores["d"] == pytest.approx(0.0)
+    assert ranked_ids(fused)[:3] == ["a", "c", "b"]
+
+
+def test_duplicates_within_one_list_count_once():
+    duplicated = [(doc("a"), 5.0), (doc("a"), 4.0), (doc("b"), 3.0)]
+    fused = fuse([duplicated], [1.0], method="rrf", rrf_k=0)
+    # 두 번째 a 는 건너뛰고 b 가 2위
+    assert [(d.metadata["chunk_id"], score) for d, score in fused] == [("a", 1.0), ("b", 0.5)]
+
+
+def test_empty_lists():
+    assert fuse([[], []], [0.5, 0.5]) == []
+    assert ranked_ids(fuse([[], VECTOR], [0.5, 0.5], method="weighted")) == ["c", "a", "d"]
+
+
+def test_equal_scores_normalize_to_one():
+    assert normalize_scores([3.0, 3.0]) == [1.0, 1.0]
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        fuse([BM25], [1.0], method="max")
@@ -0,0 +1,112 @@
+"""hwp_loader: HWP 5.0 레코드/문단 텍스트 컨트롤 처리, HWPX 섹션 XML 문단/표 순서"""
+import io
+import struct
+
+from hwp_loader import HWPTAG_PARA_TEXT, _iter_section_paragraphs, hwp5_para_text, iter_hwp5_records
+
+
+def record(tag, payload, level=0):
+    """HWP 5.0 레코드: 32bit 헤더 (태그 10bit, 레벨 10bit, 크기 12bit, 0xFFF 면 뒤에 4바이트 크기)"""
+    if len(payload) < 0xFFF:
+        return struct.pack("<I", tag | (level << 10) | (len(payload) << 20)) + payload
+    return struct.pack("<II", tag | (level << 10) | (0xFFF << 20), len(payload)) + payload
+
+
+def wchars(*units):
+    return struct.pack(f"<{len(units)}H", *units)
+
+
+def text(value):
+    return value.encode("utf-16le")
+
+
+def extended_control(code, *params):
+    """인라인/확장 컨트롤: 코드 1 WCHAR + 파라미터 6 WCHAR + 코드 1 WCHAR = 8 WCHAR"""
+    params = (list(params) + [0] * 6)[:6]
+    return wchars(code, *params, code)
+
+
+def test_iter_records_reads_header_fields_and_long_size():
+    long_payload = b"x" * 5000
+    data = record(HWPTAG_PARA_TEXT, text("가나"), level=1) + record(0x10, long_payload, level=2)
+    records = [(tag, level, bytes(payload)) for tag, level, payload in iter_hwp5_records(data)]
+    assert records == [(HWPTAG_PARA_TEXT, 1, text("가나")), (0x10, 2, long_payload)]
+
+
+def test_iter_records_stops_at_truncated_header():
+    data = record(HWPTAG_PARA_TEXT, text("가")) + b"\x01\x02"
+    assert len(list(iter_hwp5_records(data))) == 1
+
+
+def test_plain_text():
+    assert hwp5_para_text(memoryview(text("제1조(목적)"))) == "제1조(목적)"
+
+
+def test_char_controls():
+    payload = text("가") + wchars(10) + text("나") + wchars(24) + text("다") + wchars(30) + text("라") + wchars(13)
+    assert hwp5_para_text(payload) == "가\n나-다 라"
+
+
+def test_inline_controls_are_skipped_and_tab_kept():
+    payload = text("표") + extended_control(11, 0x6274, 0x6C62) + text("앞") + extended_control(9) + text("뒤")
+    assert hwp5_para_text(payload) == "표앞\t뒤"
+
+
+def test_surrogate_in_control_parameters_does_not_shift_text():
+    payload = text("앞") + extended_control(11, 0xD800) + text("뒤 텍스트")
+    assert hwp5_para_text(memoryview(payload)) == "앞뒤 텍스트"
+
+
+def test_surrogate_pair_in_text_is_kept():
+    payload = text("😀") + wchars(10) + text("끝")
+    assert hwp5_para_text(payload) == "😀\n끝"
+
+
+def section_lines(body):
+    xml = f'<hs:sec xmlns:hs="s" xmlns:hp="p">{body}</hs:sec>'
+    return list(_iter_section_paragraphs(io.BytesIO(xml.encode("utf-8"))))
+
+
+def cell(text):
+    return f"<hp:tc><hp:subList><hp:p><hp:run><hp:t>{text}</hp:t></hp:run></hp:p></hp:subList></hp:tc>"
+
+
+def test_paragraphs_in_order():
+    body = "<hp:p><hp:run><hp:t>제1조(목적)</hp:t></hp:run></hp:p><hp:p><hp:run><hp:t>본문</hp:t></hp:run></hp:p>"
+    assert section_lines(body) == ["제1조(목적)", "본문"]
+
+
+def test_table_inside_paragraph_keeps_document_order():
+    table = f"<hp:tbl><hp:tr>{cell('A')}{cell('B')}</hp:tr><hp:tr>{cell('C')}{cell('D')}</hp:tr></hp:tbl>"
+    body = f"<hp:p><hp:run><hp:t>표 앞 글</hp:t>{table}<hp:t>표 뒤 글</hp:t></hp:run></hp:p>"
+    assert section_lines(body) == ["표 앞 글", "A | B", "C | D", "표 뒤 글"]
+
+
+def test_nested_table_text_stays_in_outer_cell():
+    inner = f"<hp:tbl><hp:tr>{cell('x')}{cell('y')}</hp:tr></hp:tbl>"
+    outer_cell = f"<hp:tc><hp:subList><hp:p><hp:run><hp:t>앞</hp:t>{inner}</hp:run></hp:p></hp:subList></hp:tc>"
+    body = f"<hp:p><hp:run><hp:tbl><hp:tr>{cell('A')}{outer_cell}</hp:tr></hp:tbl></hp:run></hp:p>"
+    assert section_lines(body) == ["A | 앞 x | y"]
+
+
+def test_large_table_rows_are_released(monkeypatch):
+    import hwp_loader
+
+    rows = "".join(f"<hp:tr>{cell(f'a{i}')}{cell(f'b{i}')}</hp:tr>" for i in range(3000))
+    body = f"<hp:p><hp:run><hp:tbl>{rows}</hp:tbl></hp:run></hp:p>"
+    iterparse = hwp_loader.ET.iterparse
+    retained = []
+
+    def counting_iterparse(*args, **kwargs):
+        root = None
+        for event, elem in iterparse(*args, **kwargs):
+            root = elem if root is None else root
+            if event == "end" and elem.tag.endswith("tr"):
+                retained.append(sum(1 for _ in root.iter()))
+            yield event, elem
+
+    monkeypatch.setattr(hwp_loader.ET, "iterparse", counting_iterparse)
+    lines = section_lines(body)
+    assert len(lines) == 3000 and lines[-1] == "a2999 | b2999"
+    # 처리한 행/셀은 떼어내므로 남는 요소 수는 파서 버퍼 크기 정도로 일정 (표 전체는 3000 x 13개)
+    assert max(retained) < 5000
@@ -0,0 +1,83 @@
+"""IndexManifest.scan() 의 ManifestDiff: 신규/변경/삭제/유지 분류와 저장·재로드"""
+import json
+import os
+
+from index_manifest import MANIFEST_VERSION, IndexManifest
+
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def scan_and_record(manifest, paths):
+    diff = manifest.scan(paths)
+    for path in diff.to_index:
+        manifest.record(path, diff.stats[path], [f"{os.path.basename(path)}-0"])
+    manifest.forget(diff.removed)
+    return diff
+
+
+def test_new_files_are_added(tmp_path):
+    a = write(tmp_path / "a.txt", "가")
+    b = write(tmp_path / "b.txt", "나")
+    manifest = IndexManifest(str(tmp_path / "manifest.json"))
+    diff = manifest.scan([a, b])
+    assert sorted(diff.added) == [a, b]
+    assert diff.changed == diff.removed == diff.unchanged == []
+    assert set(diff.stats) == {a, b}
+    assert diff.has_changes()
+
+
+def test_changed_removed_and_unchanged(tmp_path):
+    a = write(tmp_path / "a.txt", "가")
+    b = write(tmp_path / "b.txt", "나")
+    c = write(tmp_path / "c.txt", "다")
+    manifest = IndexManifest(str(tmp_path / "manifest.json"))
+    scan_and_record(manifest, [a, b, c])
+
+    write(tmp_path / "a.txt", "가나다라")
+    os.remove(c)
+    diff = manifest.scan([a, b])
+    assert diff.changed == [a]
+    assert diff.unchanged == [b]
+    assert diff.removed == [c]
+    assert diff.added == []
+    assert diff.summary() == {"added": 0, "changed": 1, "removed": 1, "unchanged": 1}
+    # 변경/삭제 파일의 이전 청크 ID 로 기존 청크를 지움
+    assert manifest.chunk_ids(diff.changed + diff.removed) == ["a.txt-0", "c.txt-0"]
+
+
+def test_touched_file_with_same_content_is_unchanged(tmp_path):
+    a = write(tmp_path / "a.txt", "가")
+    manifest = IndexManifest(str(tmp_path / "manifest.json"))
+    scan_and_record(manifest, [a])
+
+    st = os.stat(a)
+    os.utime(a, (st.st_atime, st.st_mtime + 100))
+    diff = manifest.scan([a])
+    assert diff.unchanged == [a]
+    assert not diff.has_changes()
+    # 해시가 같으면 새 mtime 을 기록해 다음 scan 은 해시 계산 없이 통과
+    assert manifest.entries[a]["mtime"] == os.stat(a).st_mtime
+
+
+def test_save_and_reload(tmp_path):
+    a = write(tmp_path / "a.txt", "가")
+    path = str(tmp_path / "manifest.json")
+    manifest = IndexManifest(path)
+    scan_and_record(manifest, [a])
+    manifest.save()
+
+    reloaded = IndexManifest(path)
+    assert reloaded.load()
+    assert reloaded.chunk_ids([a]) == ["a.txt-0"]
+    assert reloaded.scan([a]).unchanged == [a]
+
+
+def test_old_version_is_outdated(tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps({"version": MANIFEST_VERSION - 1, "files": {}}), encoding="utf-8")
+    manifest = IndexManifest(str(path))
+    assert not manifest.load()
+    assert manifest.outdated
@@ -0,0 +1,47 @@
+"""korean_tokens: 조사/어미 제거, 복합명사 bigram, CachedTokenizer 버전/캐시"""
+import pytest
+
+from korean_tokenizer import CachedTokenizer, korean_tokens, strip_suffix
+
+
+def test_particles_are_stripped():
+    assert korean_tokens("휴직은 휴직을 휴직에서") == ["휴직", "휴직", "휴직"]
+    assert korean_tokens("지급한다 사용하는") == ["지급", "사용"]
+
+
+def test_two_syllable_word_is_kept():
+    # 한 글자 조사는 어간이 두 글자 이상일 때만 뗌
+    assert korean_tokens("휴가") == ["휴가"]
+    assert strip_suffix("평가") == "평가"
+
+
+def test_compound_noun_keeps_head_noun_bigram():
+    assert "휴가" in korean_tokens("출산휴가")
+    assert "평가" in korean_tokens("인사평가")
+    assert "휴가" in korean_tokens("제2조(연차휴가)")
+
+
+def test_heading_and_body_share_bigrams():
+    heading = set(korean_tokens("제2조(연차휴가)"))
+    body = set(korean_tokens("연차휴가는 15일로 한다"))
+    assert {"연차", "차휴", "휴가"} <= heading & body
+
+
+def test_long_suffix_is_not_in_bigrams():
+    tokens = korean_tokens("육아휴직에서는")
+    assert tokens[0] == "육아휴직"
+    assert tokens[1:] == ["육아", "아휴", "휴직"]
+
+
+def test_numbers_and_latin():
+    assert korean_tokens("15조에 HWP 파일") == ["15조", "hwp", "파일"]
+
+
+def test_cached_tokenizer():
+    tokenizer = CachedTokenizer("korean", cache_size=4)
+    assert tokenizer.id == "korean-2"
+    assert tokenizer("출산휴가") == tuple(korean_tokens("출산휴가"))
+    tokenizer("출산휴가")
+    assert tokenizer.stats()["hits"] == 1
+    with pytest.raises(ValueError):
+        CachedTokenizer("unknown")
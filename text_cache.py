@@ -0,0 +1,79 @@
+"""
+추출 텍스트 디스크 캐시
+원본 파일 내용 해시(SHA-256) + 파서 버전을 키로 HWP/DOCX 등에서 뽑은 본문을 저장하여
+변경되지 않은 문서는 재인덱싱 때 다시 파싱하지 않습니다.
+파일별로 성공한 HWP 추출 방식(hwpx/hwp5/pyhwp)도 기록해 다음 파싱 때 먼저 시도합니다.
+"""
+import json
+import os
+
+
+def default_text_cache_dir(persist_directory):
+    """./chroma_db -> ./text_cache (엔진/임베딩 모델과 무관하므로 공유)"""
+    parent = os.path.dirname(os.path.abspath(persist_directory).rstrip("\\/"))
+    return os.path.join(parent, "text_cache")
+
+
+class TextCache:
+    """
+    디렉토리 구성:
+        ab/abcdef....json - {"version", "parser", "text"} (해시 앞 2글자로 하위 폴더 분산)
+        strategies.json   - 파일 경로 -> 마지막으로 성공한 추출 방식
+    항목 파일은 임시 파일 교체로 기록하므로 여러 파싱 프로세스에서 동시에 써도 안전합니다.
+    """
+
+    def __init__(self, cache_dir, version):
+        self.cache_dir = cache_dir
+        self.version = version
+        self.strategies = {}
+        self._strategies_dirty = False
+
+    def _entry_path(self, digest):
+        return os.path.join(self.cache_dir, digest[:2], digest + ".json")
+
+    def get(self, digest):
+        """캐시된 {"parser", "text"} 또는 None (파서 버전이 다르면 None)"""
+        path = self._entry_path(digest)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("version") != self.version:
+            return None
+        return entry
+
+    def put(self, digest, text, parser):
+        path = self._entry_path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "parser": parser, "text": text}, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    # ------------------------------------------------------------------
+    # 파일별 추출 방식 (메인 프로세스에서만 갱신)
+    # ------------------------------------------------------------------
+    def load_strategies(self):
+        path = os.path.join(self.cache_dir, "strategies.json")
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.strategies = json.load(f)
+        return self.strategies
+
+    def remember(self, file_path, parser):
+        if parser and self.strategies.get(file_path) != parser:
+            self.strategies[file_path] = parser
+            self._strategies_dirty = True
+
+    def save_strategies(self):
+        if not self._strategies_dirty:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, "strategies.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.strategies, f, ensure_ascii=False, indent=1)
+        os.replace(path + ".tmp", path)
+        self._strategies_dirty = False
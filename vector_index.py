@@ -0,0 +1,225 @@
+"""
+벡터 검색 색인 설정
+- Chroma HNSW 파라미터(M, ef_construction, ef_search)를 코퍼스 크기별 기본값 또는 엔진 설정으로 지정
+- 선택(실험적): int8 스칼라 양자화 보조 색인
+  모든 코드를 선형 탐색(brute-force)해 근사 거리로 후보를 넉넉히 고른 뒤 Chroma 에 저장된 원본 벡터로 정확한 거리를
+  다시 계산합니다. Chroma 의 float32 HNSW 색인은 그대로 메모리에 올라가므로 메모리는 int8 코드만큼 늘어나며,
+  질의 비용이 청크 수에 비례해 대규모 코퍼스에서는 HNSW 보다 느립니다 (100k x 768 에서 질의당 약 57ms + rescore).
+
+보조 색인 디렉토리 (./chroma_db -> ./chroma_db_int8):
+    meta.json - 청크 ID 목록, 차원
+    codes.npy - 청크별 int8 코드 (n x dim)
+    norms.npy - 원본 벡터 제곱 노름 (L2 거리 계산용)
+    quant.npy - 차원별 [offset, scale]
+"""
+import json
+import os
+
+import numpy as np
+from langchain_core.documents import Document
+
+QUANTIZED_INDEX_VERSION = 1
+# 근사 거리 계산 시 한 번에 float32 로 변환하는 행 수 (임시 메모리 = 행 수 x dim x 4 바이트)
+SEARCH_BLOCK = 8192
+
+# (최대 청크 수, M, ef_construction, ef_search) - 큰 코퍼스일수록 그래프 연결/탐색 폭을 늘려 recall 유지
+HNSW_PRESETS = (
+    (10_000, 16, 100, 100),
+    (100_000, 24, 200, 128),
+    (None, 32, 256, 192),
+)
+
+
+def hnsw_params(n_chunks=0, m=None, ef_construction=None, ef_search=None):
+    """코퍼스 크기별 기본값에 명시한 값을 덮어쓴 Chroma hnsw 설정"""
+    for limit, preset_m, preset_efc, preset_efs in HNSW_PRESETS:
+        if limit is None or n_chunks <= limit:
+            break
+    return {
+        "max_neighbors": m or preset_m,
+        "ef_construction": ef_construction or preset_efc,
+        "ef_search": ef_search or preset_efs,
+    }
+
+
+def tune_collection(collection, params):
+    """
+    기존 컬렉션에 ef_search 적용 (검색 시 파라미터라 바로 변경 가능)
+    M / ef_construction 은 생성 시에만 정해지므로 다르면 재인덱싱(create_index)이 필요하다고 알림
+    """
+    current = (collection.configuration or {}).get("hnsw") or {}
+    if current.get("ef_search") != params["ef_search"]:
+        collection.modify(configuration={"hnsw": {"ef_search": params["ef_search"]}})
+    fixed = [name for name in ("max_neighbors", "ef_construction")
+             if current.get(name) is not None and current[name] != params[name]]
+    if fixed:
+        print(f"[LOG] HNSW {', '.join(f'{n}={current[n]}' for n in fixed)} 로 생성된 컬렉션 "
+              f"(설정값 {', '.join(f'{n}={params[n]}' for n in fixed)} 은 create_index 재인덱싱 시 적용)")
+
+
+def default_quantized_dir(persist_directory):
+    """./chroma_db -> ./chroma_db_int8"""
+    return os.path.abspath(persist_directory).rstrip("\\/") + "_int8"
+
+
+class QuantizedIndex:
+    """
+    int8 스칼라 양자화 벡터 색인 (L2 거리, 선형 탐색 - 실험적)
+    차원별 offset/scale 은 처음 추가한 벡터 묶음의 최소/최대값(여유 10%)으로 정하고,
+    이후 범위를 벗어나는 값은 잘라서 저장합니다 (정확한 순위는 rescore 에서 원본 벡터로 계산).
+    """
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self.clear(remove_files=False)
+
+    def clear(self, remove_files=True):
+        self.ids = []
+        self._slot_of = {}
+        self._deleted = set()
+        self._blocks = []
+        self._norm_blocks = []
+        self._codes = None
+        self._norms = None
+        self.offset = None
+        self.scale = None
+        if remove_files:
+            for name in ("meta.json", "codes.npy", "norms.npy", "quant.npy"):
+                path = os.path.join(self.index_dir, name)
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def __len__(self):
+        return len(self._slot_of)
+
+    def _path(self, name):
+        return os.path.join(self.index_dir, name)
+
+    def load(self):
+        """저장된 색인 로드 (없거나 버전이 다르면 False)"""
+        if not os.path.exists(self._path("meta.json")):
+            return False
+        with open(self._path("meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != QUANTIZED_INDEX_VERSION:
+            return False
+        self.clear(remove_files=False)
+        self.ids = meta["ids"]
+        self._slot_of = {chunk_id: slot for slot, chunk_id in enumerate(self.ids)}
+        if self.ids:
+            self._codes = np.load(self._path("codes.npy"), mmap_mode="r")
+            self._norms = np.load(self._path("norms.npy"))
+            self.offset, self.scale = np.load(self._path("quant.npy"))
+        print(f"[LOG] int8 벡터 색인 로드: {len(self)}개 청크")
+        return True
+
+    def save(self):
+        """살아있는 청크만 다시 기록 (삭제 표시된 행은 이때 제거)"""
+        os.makedirs(self.index_dir, exist_ok=True)
+        codes, norms = self._matrix()
+        live = [slot for slot in range(len(self.ids)) if slot not in self._deleted]
+        ids = [self.ids[slot] for slot in live]
+        codes = np.ascontiguousarray(codes[live])
+        norms = norms[live]
+        # mmap 을 닫은 뒤 교체 (Windows)
+        self._codes = None
+        for name, array in (("codes.npy", codes), ("norms.npy", norms)):
+            with open(self._path(name + ".tmp"), "wb") as f:
+                np.save(f, array)
+        if self.offset is not None:
+            with open(self._path("quant.npy.tmp"), "wb") as f:
+                np.save(f, np.stack([self.offset, self.scale]))
+            os.replace(self._path("quant.npy.tmp"), self._path("quant.npy"))
+        os.replace(self._path("codes.npy.tmp"), self._path("codes.npy"))
+        os.replace(self._path("norms.npy.tmp"), self._path("norms.npy"))
+        with open(self._path("meta.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump({"version": QUANTIZED_INDEX_VERSION, "dim": int(codes.shape[1]) if len(ids) else None,
+                       "ids": ids}, f, ensure_ascii=False)
+        os.replace(self._path("meta.json.tmp"), self._path("meta.json"))
+        self.load()
+
+    def _matrix(self):
+        """(int8 코드 행렬, 제곱 노름) - 추가된 묶음을 합쳐 캐시"""
+        if self._blocks:
+            codes = [self._codes] if self._codes is not None else []
+            norms = [self._norms] if self._norms is not None else []
+            self._codes = np.concatenate(codes + self._blocks)
+            self._norms = np.concatenate(norms + self._norm_blocks)
+            self._blocks = []
+            self._norm_blocks = []
+        if self._codes is None:
+            return np.zeros((0, 0), dtype=np.int8), np.zeros(0, dtype=np.float32)
+        return self._codes, self._norms
+
+    def add(self, ids, vectors):
+        """청크 벡터 추가 (같은 ID 가 있으면 교체)"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(vectors) == 0:
+            return
+        if self.offset is None:
+            low, high = vectors.min(axis=0), vectors.max(axis=0)
+            margin = (high - low) * 0.1
+            self.offset = (low - margin).astype(np.float32)
+            self.scale = np.maximum((high - low + 2 * margin) / 255.0, 1e-12).astype(np.float32)
+        self.delete(ids)
+        codes = np.clip(np.rint((vectors - self.offset) / self.scale), 0, 255) - 128
+        self._blocks.append(codes.astype(np.int8))
+        self._norm_blocks.append(np.einsum("ij,ij->i", vectors, vectors).astype(np.float32))
+        for chunk_id in ids:
+            self._slot_of[chunk_id] = len(self.ids)
+            self.ids.append(chunk_id)
+
+    def delete(self, chunk_ids):
+        for chunk_id in chunk_ids:
+            slot = self._slot_of.pop(chunk_id, None)
+            if slot is not None:
+                self._deleted.add(slot)
+
+    def build_from_collection(self, collection, page_size=5000):
+        """Chroma 컬렉션에 저장된 벡터로 색인 재생성 (재임베딩 없음)"""
+        self.clear()
+        total = collection.count()
+        for offset in range(0, total, page_size):
+            page = collection.get(include=["embeddings"], limit=page_size, offset=offset)
+            self.add(page["ids"], page["embeddings"])
+        self.save()
+
+    def search(self, query_vector, k):
+        """근사 L2 거리 상위 k 개 (청크 ID, 거리). 전체 코드를 블록 단위로 선형 탐색"""
+        codes, norms = self._matrix()
+        if not len(self):
+            return []
+        q = np.asarray(query_vector, dtype=np.float32)
+        # x ~= (code + 128) * scale + offset  ->  x.q = code.(q*scale) + (128*scale + offset).q
+        q_scaled = q * self.scale
+        base = float(np.dot(128.0 * self.scale + self.offset, q))
+        distances = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SEARCH_BLOCK):
+            block = codes[start:start + SEARCH_BLOCK].astype(np.float32)
+            distances[start:start + len(block)] = norms[start:start + len(block)] - 2.0 * (block @ q_scaled + base)
+        distances += float(np.dot(q, q))
+        if self._deleted:
+            distances[np.fromiter(self._deleted, dtype=np.int64)] = np.inf
+        k = min(k, len(self))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top])]
+        return [(self.ids[i], float(distances[i])) for i in top]
+
+
+def rescore(vectorstore, query_vector, candidates, k):
+    """근사 후보를 Chroma 원본 벡터로 정확한 L2 거리 재계산 -> (Document, 거리) 상위 k 개"""
+    if not candidates:
+        return []
+    ids = [chunk_id for chunk_id, _ in candidates]
+    result = vectorstore.get(ids=ids, include=["embeddings", "documents", "metadatas"])
+    if not len(result["ids"]):
+        return []
+    vectors = np.asarray(result["embeddings"], dtype=np.float32)
+    diff = vectors - np.asarray(query_vector, dtype=np.float32)
+    distances = np.einsum("ij,ij->i", diff, diff)
+    order = np.argsort(distances)[:k]
+    return [
+        (Document(page_content=result["documents"][i], metadata=result["metadatas"][i] or {}, id=result["ids"][i]),
+         float(distances[i]))
+        for i in order
+    ]